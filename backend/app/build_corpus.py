@@ -0,0 +1,73 @@
+"""Build a corpus artifact offline, or bulk-import one into Milvus.
+
+    build   extract and embed a CSV (artist,song) with the ingest pipeline,
+            model cache and concurrency settings, and write a versioned
+            artifact directory: manifest.json, vectors.npy (float32, memory-
+            mappable) and tracks.arrow (Arrow IPC, memory-mappable)
+    import  upsert an artifact into a library (--library, default "default")
+            of the collection at MUSIC_MILVUS_URI without calling any model;
+            tracks already stored unchanged are skipped
+
+The server imports an artifact at startup when CORPUS_ARTIFACT_PATH points
+to it. Models, prompt version and EMBEDDING_DIM must match the deployment.
+
+Usage (from backend/):
+    python -m app.build_corpus build ../sample_music_library.csv --out ./corpus_artifact
+    python -m app.build_corpus import ./corpus_artifact
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+
+from dotenv import load_dotenv
+
+from .services.libraries import DEFAULT_LIBRARY
+from .services.music_analyzer import MusicAnalyzer
+
+
+def print_progress(processed: int, failed: int, total: int):
+    print(f"\r{processed} built, {failed} failed of ~{total}", end="", file=sys.stderr, flush=True)
+
+
+async def build(args) -> dict:
+    analyzer = MusicAnalyzer()
+    try:
+        result = await analyzer.build_artifact(args.csv, args.out, progress=print_progress)
+    finally:
+        await analyzer.cleanup()
+    print(file=sys.stderr)
+    return result
+
+
+async def import_artifact(args) -> dict:
+    analyzer = MusicAnalyzer()
+    analyzer.settings.corpus_artifact_path = ""
+    try:
+        await analyzer.initialize()
+        return await analyzer.import_artifact(args.artifact, library_id=args.library)
+    finally:
+        await analyzer.cleanup()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="Extract and embed a CSV into an artifact")
+    build_parser.add_argument("csv")
+    build_parser.add_argument("--out", default="./corpus_artifact")
+    import_parser = commands.add_parser("import", help="Upsert an artifact into Milvus")
+    import_parser.add_argument("artifact")
+    import_parser.add_argument("--library", default=DEFAULT_LIBRARY, help="library (tenant) id to import into")
+    args = parser.parse_args()
+
+    # Keep stdout for the JSON result; the analyzer logs with print()
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(build(args) if args.command == "build" else import_artifact(args))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+@dataclass
+class Settings:
+    """Runtime settings for the analyzer, overridable through environment variables"""
+    # Extraction/embedding backend: gemini, local (CPU-only, offline) or fake (benchmarks)
+    model_provider: str = "gemini"
+    fake_latency_ms: float = 50.0  # simulated latency per fake model request
+    # Ingest pipeline
+    csv_chunk_size: int = 1000  # rows read, processed and upserted at a time
+    ingest_concurrency: int = 8
+    ingest_max_jobs: int = 4  # background ingest jobs running at once across all libraries
+    extract_rate_limit: float = 0.0  # requests per second, 0 disables limiting
+    embed_rate_limit: float = 0.0
+    max_retries: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 8.0
+    extract_batch_size: int = 20  # tracks per LangExtract call, 1 disables multi-track prompts
+    embed_batch_size: int = 100
+    embed_batch_max_wait: float = 0.5  # seconds to wait for a batch to fill
+    # Thread pools for blocking model and vector-store calls
+    model_pool_size: int = 16
+    query_pool_size: int = 4
+    store_pool_size: int = 4
+    # In-memory caches for /chat query embeddings and full results (seconds for TTLs)
+    query_cache_size: int = 1024
+    query_cache_ttl: float = 3600.0
+    result_cache_size: int = 1024
+    result_cache_ttl: float = 300.0
+    # Vector storage: lower dimensions and int8/binary codes trade recall for memory and speed
+    milvus_uri: str = "./milvus_music.db"
+    num_partitions: int = 64  # physical partitions libraries are hashed into by the library_id partition key
+    embedding_dim: int = 3072
+    vector_storage: str = "float"  # float, int8 or binary; quantized modes need a Milvus server
+    rescore_factor: int = 4  # quantized searches fetch top_k * rescore_factor candidates to re-rank
+    full_vectors_path: str = "./full_vectors.db"  # float32 copies used for re-ranking
+    # Vector index and default search parameters; requests may override top_k, nprobe and ef
+    index_type: str = "AUTOINDEX"  # FLAT, IVF_FLAT, HNSW or (Milvus server only) IVF_PQ for float vectors
+    index_params: str = ""  # JSON build parameters merged over the defaults, e.g. {"nlist": 1024}
+    search_top_k: int = 5
+    search_nprobe: int = 16  # IVF clusters probed per query
+    search_ef: int = 64  # HNSW candidate list size
+    # Materialized genre/mood/artist counts served by /stats, kept next to the collection
+    stats_path: str = "./library_stats.json"
+    # Prebuilt corpus (python -m app.build_corpus) bulk-imported at startup, empty to skip
+    corpus_artifact_path: str = ""
+    # Persistent extraction/embedding cache, an empty path disables it
+    cache_path: str = "./model_cache.db"
+    cache_max_entries: int = 200_000
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from the current environment"""
+        return cls(
+            model_provider=os.getenv("MODEL_PROVIDER", cls.model_provider),
+            fake_latency_ms=_env_float("FAKE_MODEL_LATENCY_MS", cls.fake_latency_ms),
+            csv_chunk_size=_env_int("CSV_CHUNK_SIZE", cls.csv_chunk_size),
+            ingest_concurrency=_env_int("INGEST_CONCURRENCY", cls.ingest_concurrency),
+            ingest_max_jobs=_env_int("INGEST_MAX_JOBS", cls.ingest_max_jobs),
+            extract_rate_limit=_env_float("EXTRACT_RATE_LIMIT", cls.extract_rate_limit),
+            embed_rate_limit=_env_float("EMBED_RATE_LIMIT", cls.embed_rate_limit),
+            max_retries=_env_int("INGEST_MAX_RETRIES", cls.max_retries),
+            retry_base_delay=_env_float("INGEST_RETRY_BASE_DELAY", cls.retry_base_delay),
+            retry_max_delay=_env_float("INGEST_RETRY_MAX_DELAY", cls.retry_max_delay),
+            extract_batch_size=_env_int("EXTRACT_BATCH_SIZE", cls.extract_batch_size),
+            embed_batch_size=_env_int("EMBED_BATCH_SIZE", cls.embed_batch_size),
+            embed_batch_max_wait=_env_float("EMBED_BATCH_MAX_WAIT", cls.embed_batch_max_wait),
+            model_pool_size=_env_int("MODEL_POOL_SIZE", cls.model_pool_size),
+            query_pool_size=_env_int("QUERY_POOL_SIZE", cls.query_pool_size),
+            store_pool_size=_env_int("VECTOR_STORE_POOL_SIZE", cls.store_pool_size),
+            query_cache_size=_env_int("QUERY_CACHE_SIZE", cls.query_cache_size),
+            query_cache_ttl=_env_float("QUERY_CACHE_TTL", cls.query_cache_ttl),
+            result_cache_size=_env_int("RESULT_CACHE_SIZE", cls.result_cache_size),
+            result_cache_ttl=_env_float("RESULT_CACHE_TTL", cls.result_cache_ttl),
+            milvus_uri=os.getenv("MUSIC_MILVUS_URI", cls.milvus_uri),
+            num_partitions=_env_int("MILVUS_NUM_PARTITIONS", cls.num_partitions),
+            embedding_dim=_env_int("EMBEDDING_DIM", cls.embedding_dim),
+            vector_storage=os.getenv("VECTOR_STORAGE", cls.vector_storage),
+            rescore_factor=_env_int("RESCORE_FACTOR", cls.rescore_factor),
+            full_vectors_path=os.getenv("FULL_VECTORS_PATH", cls.full_vectors_path),
+            index_type=os.getenv("INDEX_TYPE", cls.index_type),
+            index_params=os.getenv("INDEX_PARAMS", cls.index_params),
+            search_top_k=_env_int("SEARCH_TOP_K", cls.search_top_k),
+            search_nprobe=_env_int("SEARCH_NPROBE", cls.search_nprobe),
+            search_ef=_env_int("SEARCH_EF", cls.search_ef),
+            stats_path=os.getenv("LIBRARY_STATS_PATH", cls.stats_path),
+            corpus_artifact_path=os.getenv("CORPUS_ARTIFACT_PATH", cls.corpus_artifact_path),
+            cache_path=os.getenv("MODEL_CACHE_PATH", cls.cache_path),
+            cache_max_entries=_env_int("MODEL_CACHE_MAX_ENTRIES", cls.cache_max_entries),
+        )
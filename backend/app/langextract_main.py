@@ -1,16 +1,33 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any
-import langextract as lx
-import textwrap
-from google import genai
-from google.genai.types import EmbedContentConfig
-from pymilvus import MilvusClient, DataType
-import uuid
+from pymilvus import MilvusClient
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import os
+import json
+import time
+import asyncio
+import functools
 from dotenv import load_dotenv
 
+from .services.embedding_batcher import EmbeddingBatcher
+from .services.ingest_pipeline import IngestPipeline
+from .services.model_cache import ModelCache
+from .services.executors import Executors
+from .services.query_parser import ArtistMatcher, parse_query
+from .services.providers import PROMPT_VERSION, create_provider
+from .services.corpus_snapshot import SNAPSHOT_FIELDS, save_snapshot, load_snapshot
+from .services.libraries import DEFAULT_LIBRARY, library_filter
+from .services.metrics import (
+    COLLECTION_TRACKS, CACHE_HIT_RATIO, CACHE_ENTRIES, set_gauge, stage, timed,
+)
+from .services.collection import (
+    ensure_collection, resolve_index, search_params, track_id, content_hash, fetch_rows, fetch_content_hashes,
+    upsert_rows,
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -26,13 +43,38 @@ app.add_middleware(
 )
 
 # Configuration
-genai_client = genai.Client()
 COLLECTION_NAME = "music_extractions"
-EMBEDDING_MODEL = "gemini-embedding-001"
-EMBEDDING_DIM = 3072
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "3072"))  # gemini-embedding-001 also serves 1536, 768, ...
+# Extraction/embedding backend: gemini, local (CPU-only, offline) or fake (benchmarks)
+model_provider = create_provider(
+    os.getenv("MODEL_PROVIDER", "gemini"), EMBEDDING_DIM, fake_latency_ms=float(os.getenv("FAKE_MODEL_LATENCY_MS", "50"))
+)
+EMBEDDING_MODEL = model_provider.embedding_model
+EXTRACTION_MODEL = model_provider.extraction_model
+MILVUS_URI = os.getenv("MUSIC_MILVUS_URI", "./milvus_music.db")
+INDEX_TYPE, INDEX_PARAMS = resolve_index(
+    "float", os.getenv("INDEX_TYPE", "AUTOINDEX"), EMBEDDING_DIM, json.loads(os.getenv("INDEX_PARAMS") or "{}"),
+    uri=MILVUS_URI,
+)
+EXTRACT_BATCH_SIZE = max(1, int(os.getenv("EXTRACT_BATCH_SIZE", "20")))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+
+# Persistent extraction/embedding cache so restarts do not re-run the models
+MODEL_CACHE_PATH = os.getenv("MODEL_CACHE_PATH", "./model_cache.db")
+model_cache = ModelCache(MODEL_CACHE_PATH, int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "200000"))) if MODEL_CACHE_PATH else None
+
+# Extracted attributes and embeddings of the corpus, loaded at startup instead of re-running the models
+CORPUS_SNAPSHOT_PATH = os.getenv("CORPUS_SNAPSHOT_PATH", "./corpus_snapshot")
 
 # Initialize Milvus client
-milvus_client = MilvusClient(uri="./milvus_music.db")
+milvus_client = MilvusClient(uri=MILVUS_URI)
+
+# Thread pools so blocking SDK calls do not stall the event loop
+executors = Executors(
+    model_workers=int(os.getenv("MODEL_POOL_SIZE", "16")),
+    query_workers=int(os.getenv("QUERY_POOL_SIZE", "4")),
+    store_workers=int(os.getenv("VECTOR_STORE_POOL_SIZE", "4")),
+)
 
 # Your Spotify corpus
 SPOTIFY_CORPUS = [
@@ -105,8 +147,36 @@ SPOTIFY_CORPUS = [
     {"artist": "Big Red Machine", "song": "Phoenix"}
 ]
 
+CORPUS_ARTISTS = ArtistMatcher(track["artist"] for track in SPOTIFY_CORPUS)
+
+# Progress of the background corpus load, served by /health/ready
+corpus_state: Dict[str, Any] = {
+    "status": "starting",  # starting -> loading -> building (no usable snapshot) -> ready, or failed
+    "source": None,  # "snapshot" or "build"
+    "tracks": 0,
+    "seconds": None,
+    "error": None,
+}
+collection_ready = False
+corpus_task = None
+
+def cache_metrics(field: str) -> Dict[tuple, float]:
+    """One field of the model cache stats per cache label, for the metrics gauges"""
+    if not model_cache:
+        return {}
+    stats = model_cache.stats()
+    values = {("models",): stats[field]} if field in stats else {}
+    for kind in ModelCache.KINDS:
+        if field in stats[kind]:
+            values[(f"models_{kind}",)] = stats[kind][field]
+    return values
+
+
 class ChatRequest(BaseModel):
     query: str
+    top_k: int = Field(5, ge=1, le=100)
+    nprobe: int = Field(16, ge=1, le=65536)
+    ef: int = Field(64, ge=1, le=32768)
 
 class TrackInfo(BaseModel):
     artist: str
@@ -121,205 +191,218 @@ class ChatResponse(BaseModel):
     insights: List[str] = []
 
 def setup_milvus_collection():
-    """Set up Milvus collection with proper schema"""
-    # Drop existing collection if it exists
-    if milvus_client.has_collection(collection_name=COLLECTION_NAME):
-        milvus_client.drop_collection(collection_name=COLLECTION_NAME)
-    
-    # Create collection schema
-    schema = milvus_client.create_schema(
-        auto_id=False,
-        enable_dynamic_field=True,
-        description="Music track extraction results and vector storage",
-    )
+    """Set up Milvus collection with proper schema, keeping existing data"""
+    with stage("load_collection"):
+        ensure_collection(milvus_client, COLLECTION_NAME, EMBEDDING_DIM, "float", INDEX_TYPE, INDEX_PARAMS)
+
+def embed_documents(texts: List[str]) -> List[List[float]]:
+    """Generate retrieval embeddings for a batch of tracks in one request"""
+    return model_provider.embed_documents(texts)
+
+def embed_query(query: str) -> List[float]:
+    """Generate a retrieval embedding for a chat query"""
+    return model_provider.embed_query(query)
+
+def corpus_tracks() -> List[Dict[str, Any]]:
+    """SPOTIFY_CORPUS with ids, track text and content hashes"""
+    tracks = []
+    for track in SPOTIFY_CORPUS:
+        track_text = f"Artist: {track['artist']}, Song: {track['song']}"
+        tracks.append({
+            **track,
+            "id": track_id(track["artist"], track["song"]),
+            "track_text": track_text,
+            "content_hash": content_hash(track_text, EXTRACTION_MODEL, PROMPT_VERSION, EMBEDDING_MODEL, EMBEDDING_DIM),
+        })
+    return tracks
+
+def corpus_tag(tracks: List[Dict[str, Any]]) -> str:
+    """Identifies the corpus contents, models, prompt and dimension a snapshot was built from"""
+    return content_hash(*(track["content_hash"] for track in tracks))
+
+def load_corpus_snapshot(tracks: List[Dict[str, Any]]):
+    """Upsert the corpus from a matching snapshot; returns the track count, or None without one"""
+    snapshot = load_snapshot(CORPUS_SNAPSHOT_PATH, corpus_tag(tracks))
+    if snapshot is None:
+        return None
     
-    # Add fields
-    schema.add_field(
-        field_name="id", datatype=DataType.VARCHAR, max_length=100, is_primary=True
-    )
-    schema.add_field(
-        field_name="track_info", datatype=DataType.VARCHAR, max_length=1000
-    )
-    schema.add_field(
-        field_name="embedding", datatype=DataType.FLOAT_VECTOR, dim=EMBEDDING_DIM
-    )
-    schema.add_field(
-        field_name="artist", datatype=DataType.VARCHAR, max_length=200
-    )
-    schema.add_field(
-        field_name="song", datatype=DataType.VARCHAR, max_length=200
+    # A persistent collection usually has them already; only fill in what is missing or stale
+    upserted = 0
+    for rows in snapshot.batches():
+        stored = fetch_content_hashes(milvus_client, COLLECTION_NAME, [row["id"] for row in rows])
+        missing = [{**row, "library_id": DEFAULT_LIBRARY} for row in rows if stored.get(row["id"]) != row["content_hash"]]
+        if missing:
+            with stage("upsert", len(missing)):
+                upsert_rows(milvus_client, COLLECTION_NAME, missing)
+            upserted += len(missing)
+    if upserted:
+        with stage("load_collection"):
+            milvus_client.load_collection(collection_name=COLLECTION_NAME)
+    print(f"Loaded {len(snapshot)} corpus tracks from {CORPUS_SNAPSHOT_PATH} ({upserted} upserted)")
+    return len(snapshot)
+
+def save_corpus_snapshot(tracks: List[Dict[str, Any]]):
+    """Snapshot the stored corpus, if every track made it through extraction and embedding"""
+    rows = fetch_rows(milvus_client, COLLECTION_NAME, [track["id"] for track in tracks], SNAPSHOT_FIELDS + ["embedding"])
+    if any(rows.get(track["id"], {}).get("content_hash") != track["content_hash"] for track in tracks):
+        print("Corpus is incomplete, not writing a snapshot")
+        return
+    save_snapshot(
+        CORPUS_SNAPSHOT_PATH,
+        [rows[track["id"]] for track in tracks],
+        corpus_tag(tracks),
+        extraction_model=EXTRACTION_MODEL,
+        prompt_version=PROMPT_VERSION,
+        embedding_model=EMBEDDING_MODEL,
     )
+    print(f"Wrote corpus snapshot to {CORPUS_SNAPSHOT_PATH}")
+
+async def process_music_corpus(tracks: List[Dict[str, Any]] = None):
+    """Process the Spotify corpus using LangExtract and store in Milvus"""
+    print("Processing music corpus with LangExtract...")
     
-    # Create collection
-    milvus_client.create_collection(collection_name=COLLECTION_NAME, schema=schema)
-    
-    # Create vector index
-    index_params = milvus_client.prepare_index_params()
-    index_params.add_index(
-        field_name="embedding",
-        index_type="AUTOINDEX",
-        metric_type="COSINE",
-    )
-    milvus_client.create_index(collection_name=COLLECTION_NAME, index_params=index_params)
-
-def get_langextract_examples():
-    """Define examples for LangExtract to guide music analysis"""
-    return [
-        lx.data.ExampleData(
-            text="Artist: Coldplay, Song: Yellow",
-            extractions=[
-                lx.data.Extraction(
-                    extraction_class="music_analysis",
-                    extraction_text="Coldplay - Yellow",
-                    attributes={"primary_genre": "pop-rock", "mood": "melancholic"},
-                )
-            ],
-        ),
-        lx.data.ExampleData(
-            text="Artist: Morgan Wallen, Song: Last Night",
-            extractions=[
-                lx.data.Extraction(
-                    extraction_class="music_analysis",
-                    extraction_text="Morgan Wallen - Last Night",
-                    attributes={"primary_genre": "country", "mood": "nostalgic"},
-                )
-            ],
-        ),
-        lx.data.ExampleData(
-            text="Artist: Kygo, Song: Stole the Show",
-            extractions=[
-                lx.data.Extraction(
-                    extraction_class="music_analysis",
-                    extraction_text="Kygo - Stole the Show",
-                    attributes={"primary_genre": "electronic", "mood": "upbeat"},
-                )
-            ],
-        ),
-    ]
-
-def get_langextract_prompt():
-    """Define the extraction prompt for music analysis"""
-    return textwrap.dedent("""
-    Analyze music tracks and extract the primary genre and mood from "Artist: X, Song: Y" format.
-    Focus on the most representative genre and dominant emotional tone based on the artist's style and song characteristics.
+    if tracks is None:
+        tracks = corpus_tracks()
     
-    Use these exact attribute values based on the user's personal music taste:
+    # Tracks already stored with the same content are left alone
+    with stage("fetch_stored", len(tracks)):
+        stored = await executors.run_store(
+            fetch_content_hashes, milvus_client, COLLECTION_NAME, [track["id"] for track in tracks]
+        )
+    tracks = [track for track in tracks if stored.get(track["id"]) != track["content_hash"]]
+    if not tracks:
+        print(f"All {len(SPOTIFY_CORPUS)} corpus tracks are already stored")
+        return len(SPOTIFY_CORPUS)
     
-    primary_genre: ["pop-rock", "indie-folk", "country", "electronic", "alternative", "bollywood"]
-    mood: ["melancholic", "upbeat", "chill", "nostalgic", "romantic", "energetic"]
+    batcher = EmbeddingBatcher(timed(embed_documents, "embed"), batch_size=EMBED_BATCH_SIZE)
+    extract_fn = timed(model_provider.extract, "extract")
+    embed_fn = batcher.embed
+    if model_cache:
+        extract_fn = model_cache.cached_extract(extract_fn, EXTRACTION_MODEL, PROMPT_VERSION)
+        embed_fn = model_cache.cached_embed(embed_fn, EMBEDDING_MODEL, EMBEDDING_DIM)
     
-    Consider the artist's typical style and the song's characteristics. This is a personal music library
-    with mainstream pop-rock (Coldplay, OneRepublic), country (Morgan Wallen, Chris Stapleton), 
-    electronic (Kygo), and some international tracks.
-    """)
-
-def process_music_corpus():
-    """Process the Spotify corpus using LangExtract and store in Milvus"""
-    print("Processing music corpus with LangExtract...")
+    # Extract attributes and generate embeddings one request per batch, retrying failures
+    pipeline = IngestPipeline(
+        extract_fn=extract_fn,
+        embed_fn=embed_fn,
+        extract_batch_size=EXTRACT_BATCH_SIZE,
+        embed_batch_size=EMBED_BATCH_SIZE,
+        executor=executors.model,
+    )
+    result = await pipeline.run(tracks)
     
-    examples = get_langextract_examples()
-    prompt = get_langextract_prompt()
     processed_data = []
+    for entry in result.entries:
+        print(f"Processed: {entry['artist']} - {entry['song']} -> {entry['primary_genre']}, {entry['mood']}")
+        processed_data.append({
+            "id": entry["id"],
+            "library_id": DEFAULT_LIBRARY,
+            "track_info": entry["track_text"],
+            "content_hash": entry["content_hash"],
+            "artist": entry["artist"],
+            "song": entry["song"],
+            "primary_genre": entry["primary_genre"][:50],
+            "mood": entry["mood"][:50],
+            "embedding": entry["embedding"],
+        })
     
-    for track in SPOTIFY_CORPUS:
-        artist = track["artist"]
-        song = track["song"]
-        track_text = f"Artist: {artist}, Song: {song}"
-        
-        try:
-            # Extract using LangExtract
-            result = lx.extract(
-                text_or_documents=track_text,
-                prompt_description=prompt,
-                examples=examples,
-                model_id="gemini-2.0-flash",
-            )
-            
-            # Generate embedding
-            embedding_response = genai_client.models.embed_content(
-                model=EMBEDDING_MODEL,
-                contents=[track_text],
-                config=EmbedContentConfig(
-                    task_type="RETRIEVAL_DOCUMENT",
-                    output_dimensionality=EMBEDDING_DIM,
-                ),
-            )
-            embedding = embedding_response.embeddings[0].values
-            
-            # Process extraction results
-            primary_genre = "alternative"  # default
-            mood = "chill"  # default
-            
-            for extraction in result.extractions:
-                if extraction.extraction_class == "music_analysis":
-                    attrs = extraction.attributes or {}
-                    primary_genre = attrs.get("primary_genre", "alternative")
-                    mood = attrs.get("mood", "chill")
-                    break
-            
-            # Prepare data entry
-            data_entry = {
-                "id": f"track_{uuid.uuid4().hex[:8]}",
-                "track_info": track_text,
-                "embedding": embedding,
-                "artist": artist,
-                "song": song,
-                "primary_genre": primary_genre,
-                "mood": mood,
-            }
-            
-            processed_data.append(data_entry)
-            print(f"Processed: {artist} - {song} -> {primary_genre}, {mood}")
-            
-        except Exception as e:
-            print(f"Error processing {artist} - {song}: {e}")
-            continue
-    
-    # Insert into Milvus
+    # Upsert into Milvus
     if processed_data:
-        milvus_client.insert(collection_name=COLLECTION_NAME, data=processed_data)
-        milvus_client.load_collection(collection_name=COLLECTION_NAME)
-        print(f"Successfully processed and stored {len(processed_data)} tracks")
+        with stage("upsert", len(processed_data)):
+            await executors.run_store(upsert_rows, milvus_client, COLLECTION_NAME, processed_data)
+        with stage("load_collection"):
+            await executors.run_store(milvus_client.load_collection, collection_name=COLLECTION_NAME)
+        print(f"Successfully processed and stored {len(processed_data)} tracks ({batcher.requests} embedding requests)")
+    if model_cache:
+        print(f"Model cache: {model_cache.stats()}")
     
-    return len(processed_data)
+    return len(SPOTIFY_CORPUS) - len(tracks) + len(processed_data)
+
+async def load_corpus():
+    """Set up the collection and load the corpus from its snapshot, or build it, off the request path"""
+    global collection_ready
+    start = time.perf_counter()
+    try:
+        await executors.run_store(setup_milvus_collection)
+        collection_ready = True
+        corpus_state["status"] = "loading"
+        tracks = corpus_tracks()
+        count = await executors.run_store(load_corpus_snapshot, tracks)
+        source = "snapshot"
+        if count is None:
+            # Chat already works on whatever is stored while the rest is extracted and embedded
+            corpus_state["status"] = "building"
+            count = await process_music_corpus(tracks)
+            await executors.run_store(save_corpus_snapshot, tracks)
+            source = "build"
+        corpus_state.update(status="ready", source=source, tracks=count)
+    except Exception as e:
+        print(f"Error loading corpus: {e}")
+        corpus_state.update(status="failed", error=str(e))
+    corpus_state["seconds"] = round(time.perf_counter() - start, 3)
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the system on startup"""
-    if not os.getenv("GEMINI_API_KEY"):
-        raise ValueError("GEMINI_API_KEY environment variable is required")
-    
-    setup_milvus_collection()
-    process_music_corpus()
+    """Start loading the corpus in the background so the server accepts traffic right away"""
+    global corpus_task
+    corpus_task = asyncio.create_task(load_corpus())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop a corpus load that is still running"""
+    if corpus_task and not corpus_task.done():
+        corpus_task.cancel()
 
 @app.get("/")
 async def root():
     return {"message": "Music Taste Analyzer - LangExtract + Milvus Integration"}
 
+@app.get("/health/ready")
+async def readiness():
+    """Corpus load status; 503 until every corpus track is searchable"""
+    if corpus_state["status"] != "ready":
+        return JSONResponse(status_code=503, content=corpus_state)
+    return corpus_state
+
+@app.get("/metrics")
+async def metrics():
+    """Per-stage latency, throughput, failures and retries, corpus size and cache hit rates for Prometheus"""
+    set_gauge(COLLECTION_TRACKS, {(DEFAULT_LIBRARY,): corpus_state["tracks"]})
+    set_gauge(CACHE_HIT_RATIO, cache_metrics("hit_rate"))
+    set_gauge(CACHE_ENTRIES, cache_metrics("entries"))
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_query(request: ChatRequest):
     """Process natural language queries using semantic search"""
+    if not collection_ready:
+        raise HTTPException(status_code=503, detail=f"Corpus is not loaded yet ({corpus_state['status']})")
+    with stage("chat", 1):
+        return await answer_chat(request)
+
+async def answer_chat(request: ChatRequest) -> ChatResponse:
+    """Embed the query, search the corpus and answer from the matching tracks"""
     try:
         # Generate query embedding
-        query_embedding_response = genai_client.models.embed_content(
-            model=EMBEDDING_MODEL,
-            contents=[request.query],
-            config=EmbedContentConfig(
-                task_type="RETRIEVAL_QUERY",
-                output_dimensionality=EMBEDDING_DIM,
-            ),
-        )
-        query_embedding = query_embedding_response.embeddings[0].values
+        with stage("query_embed", 1):
+            query_embedding = await executors.run_query(embed_query, request.query)
         
-        # Semantic search in Milvus
-        search_results = milvus_client.search(
+        # Semantic search over the corpus library, restricted to the genres/moods/artists the query names
+        constraints = parse_query(request.query, CORPUS_ARTISTS).to_filter()
+        search = functools.partial(
+            milvus_client.search,
             collection_name=COLLECTION_NAME,
             data=[query_embedding],
             anns_field="embedding",
-            limit=5,
+            limit=request.top_k,
             output_fields=["track_info", "artist", "song", "primary_genre", "mood"],
-            search_params={"metric_type": "COSINE"},
+            search_params=search_params(INDEX_TYPE, "COSINE", request.top_k, nprobe=request.nprobe, ef=request.ef),
         )
+        with stage("search", 1):
+            search_results = await executors.run_store(search, filter=library_filter(DEFAULT_LIBRARY, constraints))
+        if constraints and not (search_results and search_results[0]):
+            with stage("search", 1):
+                search_results = await executors.run_store(search, filter=library_filter(DEFAULT_LIBRARY))
         
         relevant_tracks = []
         if search_results and search_results[0]:
@@ -1,12 +1,25 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi.responses import Response, StreamingResponse
+from typing import List, AsyncIterator, Optional
 import os
+import io
+import csv
+import json
+import shutil
+import asyncio
+import tempfile
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from .services.music_analyzer import MusicAnalyzer
-from .models.schemas import ChatRequest, ChatResponse, IngestResponse, StatsResponse
+from .services.ingest_jobs import IngestJobManager
+from .services.libraries import DEFAULT_LIBRARY, LIBRARY_ID_PATTERN
+from .services.metrics import stage
+from .models.schemas import (
+    ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchResponse, IngestResponse, StatsResponse, TracksPage,
+    IngestJobResponse, IngestJobStatus,
+)
 
 # Load environment variables
 load_dotenv()
@@ -24,6 +37,7 @@ app.add_middleware(
 
 # Initialize music analyzer
 music_analyzer = MusicAnalyzer()
+ingest_jobs = IngestJobManager(max_concurrent=music_analyzer.settings.ingest_max_jobs)
 
 @app.on_event("startup")
 async def startup_event():
@@ -33,31 +47,74 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up resources on shutdown"""
+    await ingest_jobs.shutdown()
     await music_analyzer.cleanup()
 
+def library_query():
+    """``library_id`` query parameter naming the library (tenant) a request reads or writes"""
+    return Query(DEFAULT_LIBRARY, pattern=LIBRARY_ID_PATTERN, description="Library (tenant) id")
+
+def save_upload(upload) -> str:
+    """Copy an uploaded file to a temporary path in chunks so it outlives the request"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+        shutil.copyfileobj(upload, tmp, length=1024 * 1024)
+        return tmp.name
+
 @app.get("/")
 async def root():
     return {"message": "Music Taste Analyzer API"}
 
-@app.post("/ingest", response_model=IngestResponse)
-async def ingest_music(file: UploadFile = File(...)):
+@app.post("/ingest", response_model=IngestJobResponse, status_code=202)
+async def ingest_music(file: UploadFile = File(...), prune: bool = False, library_id: str = library_query()):
     """
-    Upload and process music library CSV file.
+    Upload a music library CSV file into a library and process it in the background.
     Expected format: artist,song
+    Only new or changed tracks are processed; with prune=true, tracks missing
+    from the file are deleted from the library. Poll the returned status URL
+    or follow the events URL for progress.
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
-    try:
-        content = await file.read()
-        result = await music_analyzer.ingest_csv(content)
-        return IngestResponse(
-            message="Music library processed successfully",
-            processed_tracks=result["processed_tracks"],
-            total_tracks=result["total_tracks"]
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+    path = await asyncio.to_thread(save_upload, file.file)
+    
+    async def work(progress):
+        result = await music_analyzer.ingest_csv(path, prune=prune, progress=progress, library_id=library_id)
+        return IngestResponse(message="Music library processed successfully", **result).model_dump()
+    
+    job = ingest_jobs.submit(work, on_done=lambda: os.unlink(path))
+    return IngestJobResponse(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/ingest/{job.id}",
+        events_url=f"/ingest/{job.id}/events",
+    )
+
+@app.get("/ingest/{job_id}", response_model=IngestJobStatus)
+async def get_ingest_job(job_id: str):
+    """
+    Get the status and progress of a background ingest job
+    """
+    job = ingest_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return IngestJobStatus(**job.snapshot())
+
+@app.get("/ingest/{job_id}/events")
+async def stream_ingest_job(job_id: str):
+    """
+    Stream ingest progress as server-sent events until the job finishes
+    """
+    job = ingest_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    
+    async def events():
+        async for snapshot in job.updates():
+            event = snapshot["status"] if snapshot["status"] in ("completed", "failed", "cancelled") else "progress"
+            yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_query(request: ChatRequest):
@@ -65,7 +122,10 @@ async def chat_query(request: ChatRequest):
     Process natural language queries about music taste
     """
     try:
-        result = await music_analyzer.query_music_taste(request.query)
+        with stage("chat", 1):
+            result = await music_analyzer.query_music_taste(
+                request.query, top_k=request.top_k, nprobe=request.nprobe, ef=request.ef, library_id=request.library_id
+            )
         return ChatResponse(
             response=result["response"],
             relevant_tracks=result["relevant_tracks"],
@@ -74,17 +134,149 @@ async def chat_query(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Stream a chat answer as server-sent events: tracks as soon as the search returns, then response, insights and done
+    """
+    async def events():
+        try:
+            async for event, data in music_analyzer.stream_music_taste(
+                request.query, top_k=request.top_k, nprobe=request.nprobe, ef=request.ef, library_id=request.library_id
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            # Headers are already sent, so failures are reported in the stream instead of as a 500
+            yield f"event: error\ndata: {json.dumps({'detail': f'Query error: {str(e)}'})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(request: ChatBatchRequest):
+    """
+    Answer many queries with one embedding request and shared multi-vector searches
+    """
+    try:
+        with stage("chat_batch", len(request.queries)):
+            results = await music_analyzer.query_music_taste_batch(
+                request.queries, top_k=request.top_k, nprobe=request.nprobe, ef=request.ef, library_id=request.library_id
+            )
+        return ChatBatchResponse(results=[ChatResponse(**result) for result in results])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
+
 @app.get("/stats", response_model=StatsResponse)
-async def get_stats():
+async def get_stats(library_id: str = library_query()):
+    """
+    Get statistics about a music library
     """
-    Get statistics about the music library
+    try:
+        stats = await music_analyzer.get_library_stats(library_id)
+        return StatsResponse(**stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Stats error: {str(e)}")
+
+@app.post("/stats/rebuild", response_model=StatsResponse)
+async def rebuild_stats(library_id: str = library_query()):
+    """
+    Recount a library's statistics from the collection (waits for a running ingest into it)
     """
     try:
-        stats = await music_analyzer.get_library_stats()
+        stats = await music_analyzer.rebuild_stats(library_id)
         return StatsResponse(**stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Stats error: {str(e)}")
 
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+@app.get("/tracks", response_model=TracksPage)
+async def list_tracks(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. artist,song"),
+    genre: Optional[str] = None,
+    mood: Optional[str] = None,
+    artist: Optional[str] = None,
+    library_id: str = library_query(),
+):
+    """
+    Page through a library in id order with cursor pagination
+    """
+    try:
+        page = await music_analyzer.list_tracks(
+            cursor=cursor,
+            limit=limit,
+            fields=parse_fields(fields),
+            expression=music_analyzer.track_filter(genre, mood, artist),
+            library_id=library_id,
+        )
+        return TracksPage(**page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Tracks error: {str(e)}")
+
+@app.get("/tracks/export")
+async def export_tracks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. artist,song"),
+    genre: Optional[str] = None,
+    mood: Optional[str] = None,
+    artist: Optional[str] = None,
+    library_id: str = library_query(),
+):
+    """
+    Stream a whole library (or a filtered part) as NDJSON or CSV, one page in memory at a time
+    """
+    try:
+        projection = music_analyzer.track_projection(parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    batches = music_analyzer.iter_tracks(
+        fields=projection, expression=music_analyzer.track_filter(genre, mood, artist), library_id=library_id
+    )
+
+    async def ndjson() -> AsyncIterator[str]:
+        async for rows in batches:
+            yield "".join(json.dumps(row) + "\n" for row in rows)
+
+    async def csv_rows() -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=projection, extrasaction="ignore")
+        writer.writeheader()
+        async for rows in batches:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    if format == "csv":
+        return StreamingResponse(
+            csv_rows(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="music_library.csv"'},
+        )
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get hit rates for the query embedding, chat result and model caches
+    """
+    return music_analyzer.cache_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Per-stage latency histograms, throughput, failure and retry counters, collection size and cache hit rates
+    in the Prometheus text format
+    """
+    music_analyzer.update_metrics()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
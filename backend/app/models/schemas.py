@@ -1,8 +1,24 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
+from ..services.libraries import DEFAULT_LIBRARY, LIBRARY_ID_PATTERN
+
 class ChatRequest(BaseModel):
     query: str
+    # Library (tenant) to search; every library is stored in its own partition
+    library_id: str = Field(DEFAULT_LIBRARY, pattern=LIBRARY_ID_PATTERN)
+    # Search tuning; unset values use the deployment defaults
+    top_k: Optional[int] = Field(None, ge=1, le=100)
+    nprobe: Optional[int] = Field(None, ge=1, le=65536)
+    ef: Optional[int] = Field(None, ge=1, le=32768)
+
+class ChatBatchRequest(BaseModel):
+    # Embedded in one request and searched together; the same tuning and library apply to every query
+    queries: List[str] = Field(..., min_length=1, max_length=100)
+    top_k: Optional[int] = Field(None, ge=1, le=100)
+    nprobe: Optional[int] = Field(None, ge=1, le=65536)
+    ef: Optional[int] = Field(None, ge=1, le=32768)
+    library_id: str = Field(DEFAULT_LIBRARY, pattern=LIBRARY_ID_PATTERN)
 
 class TrackInfo(BaseModel):
     artist: str
@@ -16,13 +32,45 @@ class ChatResponse(BaseModel):
     relevant_tracks: List[TrackInfo]
     insights: List[str] = []
 
+class ChatBatchResponse(BaseModel):
+    results: List[ChatResponse]  # one per query, in request order
+
 class IngestResponse(BaseModel):
     message: str
     processed_tracks: int
     total_tracks: int
+    new_tracks: int = 0
+    updated_tracks: int = 0
+    unchanged_tracks: int = 0
+    deleted_tracks: int = 0
+    duplicate_tracks: int = 0
+    blank_rows: int = 0
 
 class StatsResponse(BaseModel):
     total_tracks: int
     genres: Dict[str, int]
     moods: Dict[str, int]
     top_artists: List[Dict[str, Any]]
+
+class TracksPage(BaseModel):
+    tracks: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page; None on the last page
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    status: str
+    total_tracks: int
+    processed_tracks: int
+    failed_tracks: int
+    batches: int
+    elapsed_seconds: float
+    tracks_per_second: float
+    eta_seconds: Optional[float] = None
+    result: Optional[IngestResponse] = None
+    error: Optional[str] = None
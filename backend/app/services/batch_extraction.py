@@ -0,0 +1,73 @@
+import re
+from bisect import bisect_right
+from typing import List, Dict, Any, Optional, Tuple
+
+from .model_cache import normalize_text
+
+_TRACK_LINE = re.compile(r"^\s*artist:\s*(?P<artist>.*?),\s*song:\s*(?P<song>.*?)\s*$", re.IGNORECASE)
+
+
+def track_key(artist: str, song: str) -> str:
+    """Normalized "artist - song" key used to match extractions back to rows"""
+    return f"{normalize_text(artist)} - {normalize_text(song)}"
+
+
+def _key_from_extraction_text(text: str) -> Optional[str]:
+    """Parse either "Artist - Song" or "Artist: X, Song: Y" into a track key"""
+    match = _TRACK_LINE.match(text)
+    if match:
+        return track_key(match.group("artist"), match.group("song"))
+    if " - " in text:
+        artist, song = text.split(" - ", 1)
+        return track_key(artist, song)
+    return None
+
+
+def pack_tracks(tracks: List[Dict[str, Any]]) -> Tuple[str, List[int]]:
+    """Join track lines into one document and return it with each line's start offset"""
+    offsets = []
+    position = 0
+    for track in tracks:
+        offsets.append(position)
+        position += len(track["track_text"]) + 1
+    return "\n".join(track["track_text"] for track in tracks), offsets
+
+
+def match_extractions(
+    extractions: List[Any],
+    tracks: List[Dict[str, Any]],
+    offsets: List[int],
+) -> List[Optional[Dict[str, str]]]:
+    """Assign each ``music_analysis`` extraction to its source row.
+
+    Rows are matched on ``extraction_text`` first; extractions whose text does
+    not identify a row fall back to the line their char interval points at.
+    Rows that receive no extraction stay ``None``.
+    """
+    rows_by_key: Dict[str, List[int]] = {}
+    for index, track in enumerate(tracks):
+        rows_by_key.setdefault(track_key(track["artist"], track["song"]), []).append(index)
+
+    matched: List[Optional[Dict[str, str]]] = [None] * len(tracks)
+    for extraction in extractions:
+        if extraction.extraction_class != "music_analysis":
+            continue
+        attrs = extraction.attributes or {}
+        result = {
+            "primary_genre": attrs.get("primary_genre", "unknown"),
+            "mood": attrs.get("mood", "unknown"),
+        }
+
+        key = _key_from_extraction_text(extraction.extraction_text or "")
+        indexes = [i for i in rows_by_key.get(key, []) if matched[i] is None]
+        if not indexes:
+            interval = getattr(extraction, "char_interval", None)
+            start = getattr(interval, "start_pos", None)
+            if start is not None:
+                line = bisect_right(offsets, start) - 1
+                if 0 <= line < len(tracks) and matched[line] is None:
+                    indexes = [line]
+        for index in indexes:
+            matched[index] = result
+
+    return matched
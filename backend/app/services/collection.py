@@ -0,0 +1,331 @@
+import hashlib
+import json
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
+
+from pymilvus import MilvusClient, DataType
+
+from .batch_extraction import track_key
+from .libraries import DEFAULT_LIBRARY
+
+# Bump whenever the fields or index below change; older collections are rebuilt on startup
+SCHEMA_VERSION = "4"
+SCHEMA_VERSION_PROPERTY = "music.schema_version"
+VECTOR_STORAGE_PROPERTY = "music.vector_storage"
+# The vector index can be swapped in place, so it is tracked separately from the schema version
+INDEX_PROPERTY = "music.index"
+
+# Milvus field type and metric for each embedding storage mode
+VECTOR_FIELDS = {
+    "float": (DataType.FLOAT_VECTOR, "COSINE"),
+    "int8": (DataType.INT8_VECTOR, "COSINE"),
+    "binary": (DataType.BINARY_VECTOR, "HAMMING"),
+}
+# Index types each storage mode supports; AUTOINDEX on a quantized field means the first one
+INDEX_TYPES = {
+    "float": ("AUTOINDEX", "FLAT", "IVF_FLAT", "IVF_PQ", "HNSW"),
+    "int8": ("HNSW",),
+    "binary": ("BIN_IVF_FLAT", "BIN_FLAT"),
+}
+IVF_INDEX_TYPES = ("IVF_FLAT", "IVF_PQ", "BIN_IVF_FLAT")
+# Float index types Milvus Lite cannot build; they need a Milvus server
+SERVER_ONLY_INDEX_TYPES = ("IVF_PQ",)
+SCALAR_INDEX_FIELDS = ("artist", "primary_genre", "mood")
+
+# Physical partitions the library_id partition key hashes libraries into
+DEFAULT_NUM_PARTITIONS = 64
+
+# Milvus caps the number of rows a single query may return
+QUERY_PAGE_SIZE = 1000
+# Smaller write batches let concurrent searches interleave with a large ingest
+UPSERT_BATCH_SIZE = 256
+
+
+def track_id(artist: str, song: str, library_id: str = DEFAULT_LIBRARY) -> str:
+    """Deterministic primary key so re-uploading a track updates it instead of duplicating it"""
+    return track_id_for_key(track_key(artist, song), library_id)
+
+
+def track_id_for_key(key: str, library_id: str = DEFAULT_LIBRARY) -> str:
+    """track_id() from an already normalized track key; the same track gets a distinct id in every library"""
+    if library_id != DEFAULT_LIBRARY:
+        key = f"{library_id}\x1f{key}"
+    return "track_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+def content_hash(*parts: Any) -> str:
+    """Fingerprint of everything that determines a stored row (text, models, prompt, dimension)"""
+    return hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest m that divides dim with sub-vectors of at least 16 dimensions"""
+    for m in range(max(1, dim // 16), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def default_index_params(index_type: str, embedding_dim: int) -> Dict[str, Any]:
+    """Build parameters used when the deployment does not override them"""
+    if index_type in ("IVF_FLAT", "BIN_IVF_FLAT"):
+        return {"nlist": 128}
+    if index_type == "IVF_PQ":
+        return {"nlist": 128, "m": _pq_subquantizers(embedding_dim), "nbits": 8}
+    if index_type == "HNSW":
+        return {"M": 16, "efConstruction": 200}
+    return {}
+
+
+def is_milvus_lite(uri: str) -> bool:
+    """pymilvus opens URIs ending in .db as a local Milvus Lite file"""
+    return uri.endswith(".db")
+
+
+def resolve_index(
+    storage: str,
+    index_type: str,
+    embedding_dim: int,
+    overrides: Optional[Dict[str, Any]] = None,
+    uri: str = "",
+) -> Tuple[str, Dict[str, Any]]:
+    """Validate an index type for the storage mode and the Milvus at ``uri``, and merge build parameters over the defaults"""
+    index_type = index_type.upper()
+    allowed = INDEX_TYPES[storage]
+    if index_type == "AUTOINDEX" and storage != "float":
+        index_type = allowed[0]
+    if index_type not in allowed:
+        raise ValueError(f"INDEX_TYPE for {storage} vectors must be one of {', '.join(allowed)}")
+    if index_type in SERVER_ONLY_INDEX_TYPES and is_milvus_lite(uri):
+        lite_types = [name for name in allowed if name not in SERVER_ONLY_INDEX_TYPES]
+        raise ValueError(
+            f"INDEX_TYPE={index_type} needs a Milvus server; Milvus Lite ({uri}) supports {', '.join(lite_types)}"
+        )
+    return index_type, {**default_index_params(index_type, embedding_dim), **(overrides or {})}
+
+
+def search_params(
+    index_type: str, metric_type: str, limit: int, nprobe: Optional[int] = None, ef: Optional[int] = None
+) -> Dict[str, Any]:
+    """Search parameters for the index in use; HNSW needs ef >= limit"""
+    params: Dict[str, Any] = {}
+    if index_type in IVF_INDEX_TYPES and nprobe:
+        params["nprobe"] = nprobe
+    if index_type == "HNSW" and ef:
+        params["ef"] = max(ef, limit)
+    return {"metric_type": metric_type, "params": params}
+
+
+def _collection_is_current(
+    client: MilvusClient, collection_name: str, embedding_dim: int, storage: str
+) -> bool:
+    description = client.describe_collection(collection_name=collection_name)
+    properties = description.get("properties", {})
+    if properties.get(SCHEMA_VERSION_PROPERTY) != SCHEMA_VERSION:
+        return False
+    if properties.get(VECTOR_STORAGE_PROPERTY, "float") != storage:
+        return False
+    for field in description.get("fields", []):
+        if field["name"] == "embedding":
+            return int(field.get("params", {}).get("dim", 0)) == embedding_dim
+    return False
+
+
+def ensure_index(
+    client: MilvusClient, collection_name: str, storage: str, index_type: str, index_params: Dict[str, Any]
+) -> bool:
+    """Build the configured vector index, replacing a different one in place; returns True if (re)built"""
+    spec = json.dumps({"index_type": index_type, "params": index_params}, sort_keys=True)
+    description = client.describe_collection(collection_name=collection_name)
+    if description.get("properties", {}).get(INDEX_PROPERTY) == spec:
+        return False
+
+    if "embedding" in client.list_indexes(collection_name=collection_name):
+        print(f"Rebuilding {collection_name} vector index as {index_type} {index_params}")
+        client.release_collection(collection_name=collection_name)
+        client.drop_index(collection_name=collection_name, index_name="embedding")
+
+    index = client.prepare_index_params()
+    index.add_index(
+        field_name="embedding",
+        index_name="embedding",
+        index_type=index_type,
+        metric_type=VECTOR_FIELDS[storage][1],
+        params=index_params,
+    )
+    client.create_index(collection_name=collection_name, index_params=index)
+    client.alter_collection_properties(collection_name=collection_name, properties={INDEX_PROPERTY: spec})
+    return True
+
+
+def ensure_collection(
+    client: MilvusClient,
+    collection_name: str,
+    embedding_dim: int,
+    storage: str = "float",
+    index_type: str = "AUTOINDEX",
+    index_params: Optional[Dict[str, Any]] = None,
+    num_partitions: int = DEFAULT_NUM_PARTITIONS,
+) -> bool:
+    """Create the collection unless a current-schema one already exists; returns True if created"""
+    vector_type = VECTOR_FIELDS[storage][0]
+    index_type, index_params = resolve_index(storage, index_type, embedding_dim, index_params)
+    if client.has_collection(collection_name=collection_name):
+        if _collection_is_current(client, collection_name, embedding_dim, storage):
+            ensure_index(client, collection_name, storage, index_type, index_params)
+            client.load_collection(collection_name=collection_name)
+            return False
+        print(f"Collection {collection_name} does not match schema v{SCHEMA_VERSION} ({storage}, dim {embedding_dim}), rebuilding it")
+        client.drop_collection(collection_name=collection_name)
+
+    # Create collection schema
+    schema = client.create_schema(
+        auto_id=False,
+        enable_dynamic_field=True,
+        description="Music track extraction results and vector storage",
+    )
+
+    # Add fields
+    schema.add_field(
+        field_name="id", datatype=DataType.VARCHAR, max_length=100, is_primary=True
+    )
+    # Every library's rows share the collection; filtering on the partition key searches only its partition
+    schema.add_field(
+        field_name="library_id", datatype=DataType.VARCHAR, max_length=64, is_partition_key=True
+    )
+    schema.add_field(
+        field_name="track_info", datatype=DataType.VARCHAR, max_length=1000
+    )
+    schema.add_field(
+        field_name="embedding", datatype=vector_type, dim=embedding_dim
+    )
+    schema.add_field(
+        field_name="artist", datatype=DataType.VARCHAR, max_length=200
+    )
+    schema.add_field(
+        field_name="song", datatype=DataType.VARCHAR, max_length=200
+    )
+    schema.add_field(
+        field_name="primary_genre", datatype=DataType.VARCHAR, max_length=50
+    )
+    schema.add_field(
+        field_name="mood", datatype=DataType.VARCHAR, max_length=50
+    )
+    schema.add_field(
+        field_name="content_hash", datatype=DataType.VARCHAR, max_length=64
+    )
+
+    # Create collection
+    client.create_collection(
+        collection_name=collection_name,
+        schema=schema,
+        num_partitions=num_partitions,
+        properties={SCHEMA_VERSION_PROPERTY: SCHEMA_VERSION, VECTOR_STORAGE_PROPERTY: storage},
+    )
+
+    # Inverted indexes let genre/mood/artist filters prune candidates inside the vector search
+    scalar_indexes = client.prepare_index_params()
+    for field_name in SCALAR_INDEX_FIELDS:
+        scalar_indexes.add_index(field_name=field_name, index_name=field_name, index_type="INVERTED")
+    client.create_index(collection_name=collection_name, index_params=scalar_indexes)
+    ensure_index(client, collection_name, storage, index_type, index_params)
+    client.load_collection(collection_name=collection_name)
+    return True
+
+
+def _quote_ids(ids: Iterable[str]) -> str:
+    return ", ".join('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in ids)
+
+
+def fetch_rows(
+    client: MilvusClient, collection_name: str, ids: List[str], output_fields: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Return ``output_fields`` for each of ``ids`` that already exists, keyed by id"""
+    found: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(ids), QUERY_PAGE_SIZE):
+        chunk = ids[start:start + QUERY_PAGE_SIZE]
+        rows = client.query(
+            collection_name=collection_name,
+            filter=f"id in [{_quote_ids(chunk)}]",
+            output_fields=output_fields,
+        )
+        found.update({row["id"]: row for row in rows})
+    return found
+
+
+def fetch_content_hashes(client: MilvusClient, collection_name: str, ids: List[str]) -> Dict[str, str]:
+    """Return the stored content hash for each of ``ids`` that already exists"""
+    rows = fetch_rows(client, collection_name, ids, ["content_hash"])
+    return {row_id: row.get("content_hash", "") for row_id, row in rows.items()}
+
+
+def iterate_rows(
+    client: MilvusClient,
+    collection_name: str,
+    output_fields: List[str],
+    batch_size: int = QUERY_PAGE_SIZE,
+    expression: str = "",
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield every matching row in batches, keeping one batch in memory at a time"""
+    iterator = client.query_iterator(
+        collection_name=collection_name,
+        batch_size=batch_size,
+        filter=expression,
+        output_fields=output_fields,
+    )
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            yield rows
+    finally:
+        iterator.close()
+
+
+def query_page(
+    client: MilvusClient,
+    collection_name: str,
+    output_fields: List[str],
+    after: Optional[str] = None,
+    limit: int = QUERY_PAGE_SIZE,
+    expression: str = "",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of rows in primary-key order after the ``after`` cursor, plus the cursor for the next page.
+
+    Stateless, unlike query_iterator, so a page can be requested in one HTTP
+    call and the next one in another. Uses the same ordered-reduce query
+    options the iterator relies on.
+    """
+    clauses = [f"id > {_quote_ids([after])}"] if after else []
+    if expression:
+        clauses.append(f"({expression})")
+    rows = client.query(
+        collection_name=collection_name,
+        filter=" and ".join(clauses) or 'id != ""',
+        output_fields=output_fields,
+        limit=limit,
+        iterator="True",
+        reduce_stop_for_best="True",
+    )
+    rows = sorted(rows, key=lambda row: row["id"])
+    return rows, rows[-1]["id"] if len(rows) == limit else None
+
+
+def fetch_all_ids(client: MilvusClient, collection_name: str, expression: str = "") -> Set[str]:
+    """Return every primary key in the collection (or matching ``expression``), paging through it"""
+    ids: Set[str] = set()
+    for rows in iterate_rows(client, collection_name, ["id"], expression=expression):
+        ids.update(row["id"] for row in rows)
+    return ids
+
+
+def upsert_rows(client: MilvusClient, collection_name: str, rows: List[Dict[str, Any]]):
+    """Upsert rows in batches"""
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        client.upsert(collection_name=collection_name, data=rows[start:start + UPSERT_BATCH_SIZE])
+
+
+def delete_ids(client: MilvusClient, collection_name: str, ids: List[str]):
+    """Delete rows by primary key in pages"""
+    for start in range(0, len(ids), QUERY_PAGE_SIZE):
+        client.delete(collection_name=collection_name, ids=ids[start:start + QUERY_PAGE_SIZE])
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import time
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+
+# Bump when the files below change; older snapshots are ignored and rebuilt
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_FIELDS = ["id", "track_info", "artist", "song", "primary_genre", "mood", "content_hash"]
+SNAPSHOT_SCHEMA = pa.schema([(field, pa.string()) for field in SNAPSHOT_FIELDS])
+
+MANIFEST_FILE = "manifest.json"
+TRACKS_FILE = "tracks.arrow"
+VECTORS_FILE = "vectors.npy"
+RAW_VECTORS_FILE = "vectors.f32"
+
+
+class SnapshotWriter:
+    """Streams extracted tracks and their embeddings into a snapshot directory.
+
+    Tracks go to an uncompressed Arrow IPC file and vectors to a float32
+    ``.npy``, so both can be memory-mapped when the snapshot is opened.
+    Everything is written under ``<path>.tmp`` and swapped in by ``close()``;
+    an unfinished build never replaces a good snapshot.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self.count = 0
+        self.tmp_path = f"{path}.tmp"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self._tracks = pa.ipc.new_file(os.path.join(self.tmp_path, TRACKS_FILE), SNAPSHOT_SCHEMA)
+        self._vectors = open(os.path.join(self.tmp_path, RAW_VECTORS_FILE), "wb")
+
+    def write(self, rows: Sequence[Dict[str, Any]], vectors: Any):
+        """Append rows (SNAPSHOT_FIELDS) with their (rows, dim) embeddings"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(rows):
+            raise ValueError("Each snapshot row needs exactly one vector")
+        if not rows:
+            return
+        self._tracks.write_batch(pa.RecordBatch.from_pylist(
+            [{field: row[field] for field in SNAPSHOT_FIELDS} for row in rows], schema=SNAPSHOT_SCHEMA
+        ))
+        self._vectors.write(vectors.tobytes())
+        self.count += len(rows)
+
+    def close(self, tag: str, **metadata: Any) -> Dict[str, Any]:
+        """Finish the files, write the manifest and replace ``path``; returns the manifest"""
+        self._tracks.close()
+        self._vectors.close()
+        raw_path = os.path.join(self.tmp_path, RAW_VECTORS_FILE)
+        raw = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(self.count, self.dim)) if self.count else None
+        vectors = np.lib.format.open_memmap(
+            os.path.join(self.tmp_path, VECTORS_FILE), mode="w+", dtype=np.float32, shape=(self.count, self.dim)
+        )
+        if raw is not None:
+            vectors[:] = raw
+        vectors.flush()
+        del raw, vectors
+        os.unlink(raw_path)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "tag": tag,
+            "count": self.count,
+            "dim": self.dim,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **metadata,
+        }
+        # Written last: a directory without a manifest is never loaded
+        with open(os.path.join(self.tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        old_path = f"{self.path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return manifest
+
+    def abort(self):
+        self._tracks.close()
+        self._vectors.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+class CorpusSnapshot:
+    """A snapshot opened without copying: Arrow table and vectors are views of memory-mapped files"""
+
+    def __init__(self, path: str, manifest: Dict[str, Any], tracks: pa.Table, vectors: np.ndarray):
+        self.path = path
+        self.manifest = manifest
+        self.tracks = tracks
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return self.tracks.num_rows
+
+    def batches(self, size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Rows with their ``embedding`` as float lists, ``size`` at a time, ready for upsert_rows()"""
+        for start in range(0, len(self), size):
+            rows = self.tracks.slice(start, size).to_pylist()
+            for row, vector in zip(rows, self.vectors[start:start + size].tolist()):
+                row["embedding"] = vector
+            yield rows
+
+
+def save_snapshot(path: str, rows: List[Dict[str, Any]], tag: str, **metadata: Any) -> Dict[str, Any]:
+    """Write rows that carry their ``embedding`` as a snapshot in one go"""
+    dim = len(rows[0]["embedding"]) if rows else 0
+    writer = SnapshotWriter(path, dim)
+    try:
+        writer.write(rows, [row["embedding"] for row in rows])
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close(tag, **metadata)
+
+
+def open_snapshot(path: str) -> Optional[CorpusSnapshot]:
+    """Memory-map the snapshot at ``path``, or None if it is missing, unfinished or in an older format"""
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != SNAPSHOT_FORMAT_VERSION:
+            return None
+        source = pa.memory_map(os.path.join(path, TRACKS_FILE), "r")
+        tracks = pa.ipc.open_file(source).read_all()
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+    if tracks.num_rows != manifest["count"] or len(vectors) != tracks.num_rows:
+        return None
+    return CorpusSnapshot(path, manifest, tracks, vectors)
+
+
+def load_snapshot(path: str, tag: str) -> Optional[CorpusSnapshot]:
+    """The snapshot at ``path`` if it was built from exactly what ``tag`` identifies"""
+    snapshot = open_snapshot(path)
+    if snapshot is None or snapshot.manifest.get("tag") != tag:
+        return None
+    return snapshot
@@ -0,0 +1,32 @@
+from typing import List, Callable, Sequence
+
+EmbedBatchFn = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+class EmbeddingBatcher:
+    """Embeds many texts with one request per batch and maps vectors back to their rows.
+
+    A failed request raises: retries, backoff and splitting a failing batch
+    are left to ``IngestPipeline``, which sends every request, including the
+    halves of a split batch, through the stage's rate limiter.
+    """
+
+    def __init__(self, embed_batch_fn: EmbedBatchFn, batch_size: int = 100):
+        self.embed_batch_fn = embed_batch_fn
+        self.batch_size = max(1, batch_size)
+        self.requests = 0
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        """Send one embedding request and check that every text got a vector"""
+        self.requests += 1
+        vectors = list(self.embed_batch_fn(texts))
+        if len(vectors) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        return [list(vector) for vector in vectors]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches; the result is aligned with ``texts``"""
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._request(texts[start:start + self.batch_size]))
+        return vectors
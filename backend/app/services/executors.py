@@ -0,0 +1,41 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class Executors:
+    """Dedicated thread pools that keep blocking SDK calls off the event loop.
+
+    Bulk model calls (LangExtract, document embeddings), request-path model
+    calls (query embeddings) and vector-store calls (Milvus) get separate
+    pools, so a long ingest saturating the model pool cannot starve the work
+    behind ``/chat`` and ``/stats``.
+    """
+
+    def __init__(self, model_workers: int = 16, query_workers: int = 4, store_workers: int = 4):
+        self.model = ThreadPoolExecutor(max_workers=model_workers, thread_name_prefix="model")
+        self.query = ThreadPoolExecutor(max_workers=query_workers, thread_name_prefix="query")
+        self.store = ThreadPoolExecutor(max_workers=store_workers, thread_name_prefix="store")
+
+    @staticmethod
+    async def _run(executor: ThreadPoolExecutor, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+    async def run_model(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking model call on the model pool"""
+        return await self._run(self.model, fn, *args, **kwargs)
+
+    async def run_query(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a latency-sensitive model call from the request path on the query pool"""
+        return await self._run(self.query, fn, *args, **kwargs)
+
+    async def run_store(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking vector-store call on the store pool"""
+        return await self._run(self.store, fn, *args, **kwargs)
+
+    def shutdown(self):
+        self.model.shutdown(wait=False)
+        self.query.shutdown(wait=False)
+        self.store.shutdown(wait=False)
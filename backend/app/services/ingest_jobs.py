@@ -0,0 +1,152 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Optional
+
+ProgressCallback = Callable[[int, int, int], None]
+
+
+class IngestJob:
+    """State of one background ingest, observable through snapshots and change notifications"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.total_tracks = 0
+        self.processed_tracks = 0
+        self.failed_tracks = 0
+        self.batches = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def _notify(self):
+        # Wake everyone waiting on the current event, then arm a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def update_progress(self, processed: int, failed: int, total: int):
+        """Record running totals after a finished batch"""
+        if processed + failed > self.processed_tracks + self.failed_tracks:
+            self.batches += 1
+        self.processed_tracks = processed
+        self.failed_tracks = failed
+        self.total_tracks = total
+        self._notify()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current status with elapsed time, throughput and ETA"""
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        done = self.processed_tracks + self.failed_tracks
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total_tracks - done)
+        eta = remaining / throughput if throughput > 0 and not self.done else None
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total_tracks": self.total_tracks,
+            "processed_tracks": self.processed_tracks,
+            "failed_tracks": self.failed_tracks,
+            "batches": self.batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "tracks_per_second": round(throughput, 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+    async def updates(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a snapshot now and after every change until the job finishes"""
+        while True:
+            changed = self._changed
+            yield self.snapshot()
+            if self.done:
+                return
+            await changed.wait()
+
+
+class IngestJobManager:
+    """Runs ingests as background tasks and keeps recent jobs for status queries.
+
+    At most ``max_concurrent`` jobs run at once across all libraries; jobs
+    into the same library are serialized by the analyzer's per-library lock,
+    so one library's large upload does not hold up the others.
+    """
+
+    def __init__(self, max_jobs: int = 100, max_concurrent: int = 4):
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max(1, max_concurrent))
+        self._tasks = set()
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
+
+    def submit(
+        self,
+        work: Callable[[ProgressCallback], Awaitable[Dict[str, Any]]],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> IngestJob:
+        """Schedule ``work(progress)`` in the background and return its job right away.
+
+        ``on_done()`` runs once the job ends for any reason, including being
+        cancelled before it started, e.g. to delete the uploaded file.
+        """
+        job = IngestJob()
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        task = asyncio.create_task(self._run(job, work, on_done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(
+        self,
+        job: IngestJob,
+        work: Callable[[ProgressCallback], Awaitable[Dict[str, Any]]],
+        on_done: Optional[Callable[[], None]],
+    ):
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                job._notify()
+                job.result = await work(job.update_progress)
+                job.status = "completed"
+        except asyncio.CancelledError:
+            job.error = "Ingest was cancelled"
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            print(f"Ingest job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job._notify()
+            if on_done:
+                try:
+                    on_done()
+                except Exception as e:
+                    print(f"Cleanup of ingest job {job.id} failed: {e}")
+
+    def _forget_old_jobs(self):
+        while len(self.jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if not oldest.done:
+                break
+            del self.jobs[oldest_id]
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,246 @@
+import asyncio
+import random
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Callable, Optional
+
+from .metrics import STAGE_FAILURES, STAGE_RETRIES
+
+
+class RateLimiter:
+    """Async token bucket limiting how many calls a stage may start per second"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and consume it"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def call_with_retry(
+    fn: Callable[..., Any],
+    *args,
+    executor: Optional[Executor] = None,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    on_retry: Optional[Callable[[], None]] = None,
+) -> Any:
+    """Run a blocking call in an executor, retrying failures with jittered exponential backoff"""
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    while True:
+        if limiter:
+            await limiter.acquire()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except Exception:
+            if attempt >= max_retries:
+                raise
+            if on_retry:
+                on_retry()
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+@dataclass
+class PipelineResult:
+    entries: List[Dict[str, Any]] = field(default_factory=list)
+    failed: int = 0
+
+
+class IngestPipeline:
+    """Runs extraction and embedding as concurrent, bounded stages connected by queues.
+
+    ``extract_fn(tracks)`` receives up to ``extract_batch_size`` track dicts
+    and must return a list of attribute dicts aligned with them, and
+    ``embed_fn(texts)`` a list of vectors aligned with ``texts``; either may
+    return ``None`` for rows it could not process. Both are blocking and are
+    executed on ``executor``. The embedding stage groups up to
+    ``embed_batch_size`` tracks per call, waiting at most
+    ``embed_batch_max_wait`` seconds to fill a batch. An embedding batch that
+    still fails after its retries is split in half and each half is sent
+    once more, down to single texts, so a bad row only loses its own vector.
+    """
+
+    def __init__(
+        self,
+        extract_fn: Callable[[List[Dict[str, Any]]], List[Optional[Dict[str, Any]]]],
+        embed_fn: Callable[[List[str]], List[Optional[List[float]]]],
+        concurrency: int = 8,
+        extract_batch_size: int = 1,
+        embed_batch_size: int = 100,
+        embed_batch_max_wait: float = 0.5,
+        extract_rate: float = 0.0,
+        embed_rate: float = 0.0,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 8.0,
+        executor: Optional[Executor] = None,
+    ):
+        self.extract_fn = extract_fn
+        self.embed_fn = embed_fn
+        self.concurrency = max(1, concurrency)
+        self.extract_batch_size = max(1, extract_batch_size)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.embed_batch_max_wait = embed_batch_max_wait
+        self.extract_limiter = RateLimiter(extract_rate)
+        self.embed_limiter = RateLimiter(embed_rate)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.executor = executor
+
+    async def _call(self, fn, arg, limiter: RateLimiter, stage: str, retry: bool = True):
+        return await call_with_retry(
+            fn,
+            arg,
+            executor=self.executor,
+            limiter=limiter,
+            max_retries=self.max_retries if retry else 0,
+            base_delay=self.retry_base_delay,
+            max_delay=self.retry_max_delay,
+            on_retry=STAGE_RETRIES.labels(stage=stage).inc,
+        )
+
+    async def _embed_or_split(self, texts: List[str], retry: bool = True) -> List[Optional[List[float]]]:
+        """Embed texts, splitting a batch that keeps failing; unembeddable texts get ``None``"""
+        try:
+            return await self._call(self.embed_fn, texts, self.embed_limiter, "embed", retry)
+        except Exception as e:
+            if len(texts) == 1:
+                print(f"Error embedding {texts[0]}: {e}")
+                return [None]
+        # The whole batch already failed its retries, so the halves are only tried once each
+        middle = len(texts) // 2
+        return await self._embed_or_split(texts[:middle], False) + await self._embed_or_split(texts[middle:], False)
+
+    async def run(
+        self,
+        tracks: List[Dict[str, Any]],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> PipelineResult:
+        """Extract and embed every track; each track needs a ``track_text`` key.
+
+        ``on_progress(succeeded, failed)`` is called with running totals after
+        every finished batch.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tracks)
+        counts = {"succeeded": 0, "failed": 0}
+
+        def report(succeeded: int, failed: int, stage: str = ""):
+            if failed:
+                STAGE_FAILURES.labels(stage=stage).inc(failed)
+            counts["succeeded"] += succeeded
+            counts["failed"] += failed
+            if on_progress:
+                on_progress(counts["succeeded"], counts["failed"])
+        extract_queue: asyncio.Queue = asyncio.Queue()
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.embed_batch_size * 2)
+
+        indexed = list(enumerate(tracks))
+        for start in range(0, len(indexed), self.extract_batch_size):
+            extract_queue.put_nowait(indexed[start:start + self.extract_batch_size])
+
+        async def extract_worker():
+            while True:
+                try:
+                    batch = extract_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    attrs_list = await self._call(
+                        self.extract_fn, [track for _, track in batch], self.extract_limiter, "extract"
+                    )
+                except Exception as e:
+                    print(f"Error extracting batch of {len(batch)} tracks: {e}")
+                    report(0, len(batch), "extract")
+                    continue
+                missed = 0
+                for (index, track), attrs in zip(batch, attrs_list):
+                    if attrs is None:
+                        missed += 1
+                    else:
+                        await embed_queue.put((index, {**track, **attrs}))
+                if missed:
+                    report(0, missed, "extract")
+
+        async def next_batch():
+            """Collect up to embed_batch_size entries; the flag is False once the stage is done"""
+            batch = []
+            item = await embed_queue.get()
+            if item is None:
+                return batch, False
+            batch.append(item)
+            deadline = time.monotonic() + self.embed_batch_max_wait
+            while len(batch) < self.embed_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(embed_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    return batch, False
+                batch.append(item)
+            return batch, True
+
+        embed_slots = asyncio.Semaphore(self.concurrency)
+
+        async def embed_batch(batch):
+            async with embed_slots:
+                vectors = await self._embed_or_split([entry["track_text"] for _, entry in batch])
+            succeeded = 0
+            for (index, entry), vector in zip(batch, vectors):
+                if vector is not None:
+                    entry["embedding"] = vector
+                    results[index] = entry
+                    succeeded += 1
+            report(succeeded, len(batch) - succeeded, "embed")
+
+        async def batch_collector():
+            # A single collector fills batches; the embedding calls themselves run concurrently
+            pending = []
+            try:
+                running = True
+                while running:
+                    batch, running = await next_batch()
+                    if batch:
+                        pending.append(asyncio.create_task(embed_batch(batch)))
+                await asyncio.gather(*pending)
+            finally:
+                # On failure or cancellation, stop embedding calls (and their retries) still in flight
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        collector = asyncio.create_task(batch_collector())
+        try:
+            await asyncio.gather(*(extract_worker() for _ in range(self.concurrency)))
+            await embed_queue.put(None)
+            await collector
+        finally:
+            collector.cancel()
+            await asyncio.gather(collector, return_exceptions=True)
+
+        entries = [entry for entry in results if entry is not None]
+        return PipelineResult(entries=entries, failed=len(tracks) - len(entries))
@@ -0,0 +1,19 @@
+import re
+
+# Library used when a request names none; its track ids match the single-library layout
+DEFAULT_LIBRARY = "default"
+LIBRARY_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+_LIBRARY_ID = re.compile(LIBRARY_ID_PATTERN)
+
+
+def check_library_id(library_id: str) -> str:
+    """Return ``library_id`` if it is a valid library id, so it is safe to put in a filter expression"""
+    if not _LIBRARY_ID.match(library_id or ""):
+        raise ValueError("library_id must be 1-64 letters, digits, '-' or '_'")
+    return library_id
+
+
+def library_filter(library_id: str, expression: str = "") -> str:
+    """Milvus expression scoping ``expression`` to one library; the partition key prunes the search to its partition"""
+    clause = f'library_id == "{check_library_id(library_id)}"'
+    return f"{clause} and ({expression})" if expression else clause
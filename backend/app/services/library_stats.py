@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+
+from .libraries import DEFAULT_LIBRARY
+from .query_parser import ArtistMatcher
+
+# Bump when the persisted layout changes; older files are rebuilt from the collection
+STATS_FORMAT_VERSION = 2
+
+
+class LibraryStats:
+    """Genre, mood and artist counts kept in step with the stored tracks.
+
+    Ingest applies every insert, update and delete through ``add``/``remove``,
+    so ``/stats`` never scans the collection. The response is built once per
+    change and then served as is, and the artist matcher used to parse chat
+    queries once per change to the set of artists.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.genres: Counter = Counter()
+        self.moods: Counter = Counter()
+        self.artists: Counter = Counter()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._artist_matcher: Optional[ArtistMatcher] = None
+
+    def add(self, rows: Iterable[Dict[str, Any]]):
+        """Count newly stored rows"""
+        for row in rows:
+            self.total += 1
+            self.genres[row.get("primary_genre") or "unknown"] += 1
+            self.moods[row.get("mood") or "unknown"] += 1
+            artist = row.get("artist") or "Unknown"
+            if artist not in self.artists:
+                self._artist_matcher = None
+            self.artists[artist] += 1
+        self._snapshot = None
+
+    def remove(self, rows: Iterable[Dict[str, Any]]):
+        """Uncount rows that were deleted or are about to be overwritten"""
+        for row in rows:
+            self.total -= 1
+            for counter, key in (
+                (self.genres, row.get("primary_genre") or "unknown"),
+                (self.moods, row.get("mood") or "unknown"),
+                (self.artists, row.get("artist") or "Unknown"),
+            ):
+                counter[key] -= 1
+                if counter[key] <= 0:
+                    del counter[key]
+                    if counter is self.artists:
+                        self._artist_matcher = None
+        self._snapshot = None
+
+    @property
+    def artist_matcher(self) -> ArtistMatcher:
+        """Matcher over the library's artist names, rebuilt only after an artist appears or disappears"""
+        if self._artist_matcher is None:
+            self._artist_matcher = ArtistMatcher(self.artists)
+        return self._artist_matcher
+
+    def snapshot(self, top_artists: int = 10) -> Dict[str, Any]:
+        """Statistics in the /stats response shape"""
+        if self._snapshot is None:
+            self._snapshot = {
+                "total_tracks": self.total,
+                "genres": dict(self.genres),
+                "moods": dict(self.moods),
+                "top_artists": [
+                    {"artist": artist, "count": count} for artist, count in self.artists.most_common(top_artists)
+                ],
+            }
+        return self._snapshot
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"total": self.total, "genres": dict(self.genres), "moods": dict(self.moods), "artists": dict(self.artists)}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "LibraryStats":
+        stats = cls()
+        stats.total = payload["total"]
+        stats.genres = Counter(payload["genres"])
+        stats.moods = Counter(payload["moods"])
+        stats.artists = Counter(payload["artists"])
+        return stats
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "LibraryStats":
+        stats = cls()
+        stats.add(rows)
+        return stats
+
+    @classmethod
+    def from_batches(cls, batches: Iterable[List[Dict[str, Any]]]) -> "LibraryStats":
+        stats = cls()
+        for batch in batches:
+            stats.add(batch)
+        return stats
+
+
+class LibraryStatsSet:
+    """LibraryStats for every library in the collection, persisted together in one file.
+
+    Libraries with an ingest in progress are saved as inconsistent, so after
+    a crash only their counts are recounted from the collection.
+    """
+
+    def __init__(self):
+        self.libraries: Dict[str, LibraryStats] = {}
+        self.ingesting: Set[str] = set()
+        self._sequence = 0
+        self._written = 0
+        self._write_lock = threading.Lock()
+
+    def get(self, library_id: str) -> LibraryStats:
+        """Counts of one library, created empty on first write"""
+        return self.libraries.setdefault(library_id, LibraryStats())
+
+    def snapshot(self, library_id: str) -> Dict[str, Any]:
+        """/stats for one library; an unknown library is empty"""
+        return (self.libraries.get(library_id) or LibraryStats()).snapshot()
+
+    def payload(self, tag: str) -> Dict[str, Any]:
+        """Everything save() writes, copied so it can be written off the event loop while counts change"""
+        self._sequence += 1
+        return {
+            "format": STATS_FORMAT_VERSION,
+            "tag": tag,
+            "sequence": self._sequence,
+            "libraries": {
+                library_id: {**stats.to_dict(), "consistent": library_id not in self.ingesting}
+                for library_id, stats in self.libraries.items()
+            },
+        }
+
+    def save(self, path: str, payload: Dict[str, Any]):
+        """Write a payload() atomically, unless a newer one was already written"""
+        with self._write_lock:
+            if payload["sequence"] < self._written:
+                return
+            self._written = payload["sequence"]
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, tag: str) -> Optional[Tuple["LibraryStatsSet", List[str]]]:
+        """Counts saved for the collection identified by ``tag`` and the libraries that must be recounted,
+        or None if the file cannot be trusted at all"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload.get("format") != STATS_FORMAT_VERSION or payload.get("tag") != tag:
+            return None
+        stats = cls()
+        stale = []
+        for library_id, counts in payload["libraries"].items():
+            if counts.get("consistent"):
+                stats.libraries[library_id] = LibraryStats.from_dict(counts)
+            else:
+                stale.append(library_id)
+        return stats, stale
+
+    @classmethod
+    def from_batches(cls, batches: Iterable[List[Dict[str, Any]]]) -> "LibraryStatsSet":
+        """Count rows grouped by their library_id"""
+        stats = cls()
+        for batch in batches:
+            by_library: Dict[str, List[Dict[str, Any]]] = {}
+            for row in batch:
+                by_library.setdefault(row.get("library_id") or DEFAULT_LIBRARY, []).append(row)
+            for library_id, rows in by_library.items():
+                stats.get(library_id).add(rows)
+        return stats
@@ -0,0 +1,59 @@
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Seconds; model calls run from tens of milliseconds to tens of seconds under rate limits and retries
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Registered in prometheus_client's default registry, shared by all three apps so their stages
+# and caches are reported under the same names
+STAGE_SECONDS = Histogram(
+    "music_stage_duration_seconds", "Time spent in each ingest and query stage, per call", ["stage"],
+    buckets=DEFAULT_BUCKETS,
+)
+STAGE_ITEMS = Counter(
+    "music_stage_items_total", "Rows, tracks or queries handled by each stage", ["stage"]
+)
+STAGE_FAILURES = Counter(
+    "music_stage_failures_total", "Rows a stage gave up on after its retries", ["stage"]
+)
+STAGE_RETRIES = Counter(
+    "music_stage_retries_total", "Calls retried after a failure, per stage", ["stage"]
+)
+COLLECTION_TRACKS = Gauge(
+    "music_collection_tracks", "Tracks stored per library", ["library_id"]
+)
+CACHE_HIT_RATIO = Gauge(
+    "music_cache_hit_ratio", "Fraction of lookups answered by each cache since startup", ["cache"]
+)
+CACHE_ENTRIES = Gauge(
+    "music_cache_entries", "Entries currently held by each cache", ["cache"]
+)
+
+
+def set_gauge(gauge: Gauge, values: Dict[Tuple[str, ...], float]):
+    """Replace every series of a labelled gauge with ``values`` (label values -> value), dropping the rest"""
+    gauge.clear()
+    for labels, value in values.items():
+        gauge.labels(*labels).set(value)
+
+
+@contextmanager
+def stage(name: str, items: int = 0) -> Iterator[None]:
+    """Time a block as one call of stage ``name`` handling ``items`` rows"""
+    with STAGE_SECONDS.labels(stage=name).time():
+        yield
+    if items:
+        STAGE_ITEMS.labels(stage=name).inc(items)
+
+
+def timed(fn: Callable[..., Any], name: str) -> Callable[..., Any]:
+    """Wrap a batch call so each call is timed as stage ``name`` and its first argument's length counted"""
+    @functools.wraps(fn)
+    def wrapper(batch, *args, **kwargs):
+        with stage(name, len(batch)):
+            return fn(batch, *args, **kwargs)
+    return wrapper
+
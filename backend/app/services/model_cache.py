@@ -0,0 +1,175 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so trivially different rows share a key"""
+    return _NON_WORD.sub(" ", str(text).lower()).strip()
+
+
+def normalize_column(values: pd.Series) -> pd.Series:
+    """normalize_text() over a whole column (Python regex semantics, so keys match row by row)"""
+    return values.astype(object).str.lower().str.replace(_NON_WORD, " ", regex=True).str.strip()
+
+
+class ModelCache:
+    """Persistent, content-addressed cache for extracted attributes and embeddings.
+
+    Entries live in a SQLite file. Extraction keys cover the normalized track
+    text, the model id and the prompt version; embedding keys cover the text,
+    the model id and the output dimension. The least recently used entries are
+    evicted once ``max_entries`` is exceeded.
+    """
+
+    KINDS = ("extraction", "embedding")
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = {kind: 0 for kind in self.KINDS}
+        self.misses = {kind: 0 for kind in self.KINDS}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, kind TEXT NOT NULL, payload BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _key(kind: str, text: str, *parts: Any) -> str:
+        raw = "|".join([kind, *map(str, parts), normalize_text(text)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_many(self, kind: str, keys: List[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, payload FROM entries WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits[kind] += sum(1 for key in keys if key in found)
+            self.misses[kind] += sum(1 for key in keys if key not in found)
+        return found
+
+    def _put_many(self, kind: str, items: List[Tuple[str, bytes]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, kind, payload, last_access) VALUES (?, ?, ?, ?)",
+                [(key, kind, payload, now) for key, payload in items],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+
+    def get_attributes(self, texts: List[str], model_id: str, prompt_version: str) -> List[Optional[Dict[str, str]]]:
+        keys = [self._key("extraction", text, model_id, prompt_version) for text in texts]
+        found = self._get_many("extraction", keys)
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def put_attributes(self, texts: List[str], attributes: List[Dict[str, str]], model_id: str, prompt_version: str):
+        self._put_many("extraction", [
+            (self._key("extraction", text, model_id, prompt_version), json.dumps(attrs).encode("utf-8"))
+            for text, attrs in zip(texts, attributes)
+        ])
+
+    def get_embeddings(self, texts: List[str], model_id: str, dim: int) -> List[Optional[List[float]]]:
+        keys = [self._key("embedding", text, model_id, dim) for text in texts]
+        found = self._get_many("embedding", keys)
+        return [np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None for key in keys]
+
+    def put_embeddings(self, texts: List[str], vectors: List[Sequence[float]], model_id: str, dim: int):
+        self._put_many("embedding", [
+            (self._key("embedding", text, model_id, dim), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ])
+
+    def cached_extract(
+        self,
+        extract_fn: Callable[[List[Dict[str, Any]]], List[Optional[Dict[str, str]]]],
+        model_id: str,
+        prompt_version: str,
+    ) -> Callable[[List[Dict[str, Any]]], List[Optional[Dict[str, str]]]]:
+        """Wrap a batched extraction function so only uncached tracks reach the model"""
+        def wrapper(tracks: List[Dict[str, Any]]) -> List[Optional[Dict[str, str]]]:
+            texts = [track["track_text"] for track in tracks]
+            results = self.get_attributes(texts, model_id, prompt_version)
+            missing = [i for i, attrs in enumerate(results) if attrs is None]
+            if missing:
+                extracted = extract_fn([tracks[i] for i in missing])
+                fresh = [(i, attrs) for i, attrs in zip(missing, extracted) if attrs is not None]
+                for i, attrs in fresh:
+                    results[i] = attrs
+                self.put_attributes([texts[i] for i, _ in fresh], [attrs for _, attrs in fresh], model_id, prompt_version)
+            return results
+        return wrapper
+
+    def cached_embed(
+        self,
+        embed_fn: Callable[[List[str]], List[Optional[List[float]]]],
+        model_id: str,
+        dim: int,
+    ) -> Callable[[List[str]], List[Optional[List[float]]]]:
+        """Wrap a batched embedding function so only uncached texts reach the model"""
+        def wrapper(texts: List[str]) -> List[Optional[List[float]]]:
+            results = self.get_embeddings(texts, model_id, dim)
+            missing = [i for i, vector in enumerate(results) if vector is None]
+            if missing:
+                embedded = embed_fn([texts[i] for i in missing])
+                fresh = [(i, vector) for i, vector in zip(missing, embedded) if vector is not None]
+                for i, vector in fresh:
+                    results[i] = vector
+                self.put_embeddings([texts[i] for i, _ in fresh], [vector for _, vector in fresh], model_id, dim)
+            return results
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per kind and the current number of stored entries"""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        stats: Dict[str, Any] = {"entries": entries, "max_entries": self.max_entries}
+        for kind in self.KINDS:
+            lookups = self.hits[kind] + self.misses[kind]
+            stats[kind] = {
+                "hits": self.hits[kind],
+                "misses": self.misses[kind],
+                "hit_rate": self.hits[kind] / lookups if lookups else 0.0,
+            }
+        return stats
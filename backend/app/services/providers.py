@@ -0,0 +1,311 @@
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import random
+import re
+import time
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import langextract as lx
+import numpy as np
+from google import genai
+from google.genai.types import EmbedContentConfig
+
+from .batch_extraction import pack_tracks, match_extractions
+from .model_cache import normalize_text
+from .query_parser import parse_query
+from .track_rules import GENRE_LABELS, MOOD_LABELS, classify_track
+
+MODEL_PROVIDERS = ("gemini", "local", "fake")
+# Bump whenever the extraction prompt or examples change so cached attributes are not reused
+PROMPT_VERSION = "2"
+
+_TRACK_TEXT = re.compile(r"^Artist: (?P<artist>.*), Song: (?P<song>.*)$", re.DOTALL)
+
+
+class ModelProvider(ABC):
+    """Backend for the two model calls ingest and chat make: extract attributes and embed texts.
+
+    ``extraction_model`` and ``embedding_model`` name what produced a row;
+    they go into content hashes and cache keys, so switching providers
+    re-processes tracks instead of mixing vectors from different models.
+    """
+    name = ""
+    extraction_model = ""
+    embedding_model = ""
+
+    def __init__(self, embedding_dim: int):
+        self.embedding_dim = embedding_dim
+
+    @abstractmethod
+    def extract(self, tracks: List[Dict[str, Any]]) -> List[Optional[Dict[str, str]]]:
+        """Genre and mood for each track (artist, song, track_text), None where extraction failed"""
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Retrieval embeddings for a batch of track texts"""
+
+    @abstractmethod
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Retrieval embeddings for a batch of chat queries, in one request where the backend allows it"""
+
+    def embed_query(self, query: str) -> List[float]:
+        """Retrieval embedding for a chat query"""
+        return self.embed_queries([query])[0]
+
+
+class GeminiProvider(ModelProvider):
+    """LangExtract on Gemini for attributes and gemini-embedding-001 for vectors"""
+    name = "gemini"
+    extraction_model = "gemini-2.0-flash"
+    embedding_model = "gemini-embedding-001"
+
+    def __init__(self, embedding_dim: int):
+        super().__init__(embedding_dim)
+        if not os.getenv("GEMINI_API_KEY"):
+            raise ValueError("GEMINI_API_KEY environment variable is required (or set MODEL_PROVIDER=local)")
+        self.client = genai.Client()
+
+    def _get_extraction_examples(self):
+        """Define examples for LangExtract to guide music genre and mood extraction"""
+        return [
+            lx.data.ExampleData(
+                text="Artist: Coldplay, Song: Yellow",
+                extractions=[
+                    lx.data.Extraction(
+                        extraction_class="music_analysis",
+                        extraction_text="Coldplay - Yellow",
+                        attributes={"primary_genre": "pop-rock", "mood": "melancholic"},
+                    )
+                ],
+            ),
+            lx.data.ExampleData(
+                text="Artist: Morgan Wallen, Song: Last Night",
+                extractions=[
+                    lx.data.Extraction(
+                        extraction_class="music_analysis",
+                        extraction_text="Morgan Wallen - Last Night",
+                        attributes={"primary_genre": "country", "mood": "nostalgic"},
+                    )
+                ],
+            ),
+            lx.data.ExampleData(
+                text="Artist: Kygo, Song: Stole the Show",
+                extractions=[
+                    lx.data.Extraction(
+                        extraction_class="music_analysis",
+                        extraction_text="Kygo - Stole the Show",
+                        attributes={"primary_genre": "electronic", "mood": "upbeat"},
+                    )
+                ],
+            ),
+        ]
+
+    def _get_batch_extraction_examples(self):
+        """Combine the single-track examples into one multi-track example for batched extraction"""
+        examples = self._get_extraction_examples()
+        return [
+            lx.data.ExampleData(
+                text="\n".join(example.text for example in examples),
+                extractions=[extraction for example in examples for extraction in example.extractions],
+            )
+        ]
+
+    def _get_extraction_prompt(self):
+        """Define the extraction prompt for music analysis"""
+        return """
+        Analyze music tracks and extract the primary genre and mood from "Artist: X, Song: Y" format.
+        Focus on the most representative genre and dominant emotional tone.
+        The text may list several tracks, one per line; return one music_analysis extraction for every track.
+        
+        Use these exact attribute values based on the user's music taste:
+        
+        primary_genre: ["pop-rock", "indie-folk", "country", "electronic", "alternative", "bollywood"]
+        mood: ["melancholic", "upbeat", "chill", "nostalgic", "romantic", "energetic"]
+        
+        Consider the artist's typical style and the song's characteristics. This is a personal music library
+        with mainstream pop-rock (Coldplay, OneRepublic), country (Morgan Wallen, Chris Stapleton), 
+        electronic (Kygo), and some international tracks.
+        """
+
+    def _extract_track(self, track_text: str) -> Dict[str, str]:
+        """Run LangExtract on a single track and return its genre and mood"""
+        result = lx.extract(
+            text_or_documents=track_text,
+            prompt_description=self._get_extraction_prompt(),
+            examples=self._get_extraction_examples(),
+            model_id=self.extraction_model,
+        )
+
+        primary_genre = "unknown"
+        mood = "unknown"
+
+        for extraction in result.extractions:
+            if extraction.extraction_class == "music_analysis":
+                attrs = extraction.attributes or {}
+                primary_genre = attrs.get("primary_genre", "unknown")
+                mood = attrs.get("mood", "unknown")
+                break
+
+        return {"primary_genre": primary_genre, "mood": mood}
+
+    def extract(self, tracks: List[Dict[str, Any]]) -> List[Optional[Dict[str, str]]]:
+        """Classify many tracks with one LangExtract call, re-running missed rows one by one"""
+        if len(tracks) == 1:
+            return [self._extract_track(tracks[0]["track_text"])]
+
+        document, offsets = pack_tracks(tracks)
+        result = lx.extract(
+            text_or_documents=document,
+            prompt_description=self._get_extraction_prompt(),
+            examples=self._get_batch_extraction_examples(),
+            model_id=self.extraction_model,
+            max_char_buffer=len(document) + 1,
+        )
+        matched = match_extractions(result.extractions, tracks, offsets)
+
+        # Fall back to single-track extraction for rows the batch missed
+        for index, attrs in enumerate(matched):
+            if attrs is not None:
+                continue
+            try:
+                matched[index] = self._extract_track(tracks[index]["track_text"])
+            except Exception as e:
+                print(f"Error processing {tracks[index]['track_text']}: {e}")
+
+        return matched
+
+    def _embed(self, texts: List[str], task_type: str) -> List[List[float]]:
+        response = self.client.models.embed_content(
+            model=self.embedding_model,
+            contents=texts,
+            config=EmbedContentConfig(task_type=task_type, output_dimensionality=self.embedding_dim),
+        )
+        return [embedding.values for embedding in response.embeddings]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "RETRIEVAL_DOCUMENT")
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return self._embed(queries, "RETRIEVAL_QUERY")
+
+
+class LocalProvider(ModelProvider):
+    """CPU-only provider for offline and air-gapped deployments: no network and no per-token cost.
+
+    Attributes come from the rule table in track_rules. Embeddings hash
+    words and genre/mood labels into signed buckets (feature hashing), so
+    "sad country songs" lands near tracks labelled country and melancholic
+    and "songs by kygo" near tracks whose text contains "kygo".
+    """
+    name = "local"
+    extraction_model = "local-rules-1"
+    embedding_model = "local-hashing-1"
+    LABEL_WEIGHT = 2.0
+
+    def extract(self, tracks: List[Dict[str, Any]]) -> List[Optional[Dict[str, str]]]:
+        return [classify_track(str(track["artist"]), str(track["song"])) for track in tracks]
+
+    def _hash(self, feature: str) -> Tuple[int, float]:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return value % self.embedding_dim, 1.0 if value >> 63 else -1.0
+
+    def _vector(self, features: Iterable[Tuple[str, float]]) -> List[float]:
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        for feature, weight in features:
+            index, sign = self._hash(feature)
+            vector[index] += sign * weight
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    @staticmethod
+    def _words(text: str) -> List[Tuple[str, float]]:
+        return [(f"w:{word}", 1.0) for word in normalize_text(text).split()]
+
+    def _labels(self, genres: Iterable[str], moods: Iterable[str]) -> List[Tuple[str, float]]:
+        return [(f"g:{genre}", self.LABEL_WEIGHT) for genre in genres] + [
+            (f"m:{mood}", self.LABEL_WEIGHT) for mood in moods
+        ]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            features = self._words(text)
+            match = _TRACK_TEXT.match(text)
+            if match:
+                features = self._words(f"{match.group('artist')} {match.group('song')}")
+                labels = classify_track(match.group("artist"), match.group("song"))
+                features += self._labels([labels["primary_genre"]], [labels["mood"]])
+            vectors.append(self._vector(features))
+        return vectors
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        vectors = []
+        for query in queries:
+            parsed = parse_query(query)
+            vectors.append(self._vector(self._words(query) + self._labels(parsed.genres, parsed.moods)))
+        return vectors
+
+
+class FakeProvider(ModelProvider):
+    """Deterministic stand-in for the model APIs that only adds latency, for benchmarks and tests"""
+    name = "fake"
+    extraction_model = "fake-extract"
+    embedding_model = "fake-embed"
+
+    def __init__(
+        self,
+        embedding_dim: int,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 0.0,
+        per_item_ms: float = 0.0,
+    ):
+        super().__init__(embedding_dim)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_item_ms = per_item_ms
+        self.extract_calls = 0
+        self.embed_calls = 0
+
+    def _sleep(self, items: int = 1):
+        delay = self.latency_ms + self.per_item_ms * items + random.uniform(0, self.jitter_ms)
+        time.sleep(delay / 1000)
+
+    @staticmethod
+    def _digest(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _attributes(self, track_text: str) -> Dict[str, str]:
+        digest = self._digest(track_text)
+        return {"primary_genre": GENRE_LABELS[digest[0] % len(GENRE_LABELS)], "mood": MOOD_LABELS[digest[1] % len(MOOD_LABELS)]}
+
+    def extract(self, tracks: List[Dict[str, Any]]) -> List[Optional[Dict[str, str]]]:
+        """Return a stable genre/mood pair per track, paying the latency once per request"""
+        self.extract_calls += 1
+        self._sleep(len(tracks))
+        return [self._attributes(track["track_text"]) for track in tracks]
+
+    def _vector(self, text: str) -> List[float]:
+        rng = np.random.default_rng(int.from_bytes(self._digest(text)[:8], "little"))
+        vector = rng.standard_normal(self.embedding_dim, dtype=np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Return stable pseudo-random unit vectors, paying the latency once per request"""
+        self.embed_calls += 1
+        self._sleep(len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return self.embed_documents(queries)
+
+
+def create_provider(name: str, embedding_dim: int, fake_latency_ms: float = 50.0) -> ModelProvider:
+    """Provider for MODEL_PROVIDER: gemini (default), local or fake"""
+    if name == "gemini":
+        return GeminiProvider(embedding_dim)
+    if name == "local":
+        return LocalProvider(embedding_dim)
+    if name == "fake":
+        return FakeProvider(embedding_dim, latency_ms=fake_latency_ms)
+    raise ValueError(f"MODEL_PROVIDER must be one of {', '.join(MODEL_PROVIDERS)}")
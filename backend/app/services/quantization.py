@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+from typing import List, Dict, Sequence
+
+import numpy as np
+
+VECTOR_STORAGE_MODES = ("float", "int8", "binary")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length; reduced-dimension embeddings are not normalized by the API"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """Symmetric int8 quantization of unit vectors (components lie in [-1, 1])"""
+    return np.clip(np.rint(normalize(vectors) * 127), -127, 127).astype(np.int8)
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """One bit per dimension (sign), packed into bytes"""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def to_storage(vectors: np.ndarray, storage: str) -> List:
+    """Convert float embeddings into the representation written to Milvus for ``storage``"""
+    if storage == "int8":
+        return list(quantize_int8(vectors))
+    if storage == "binary":
+        return [row.tobytes() for row in binarize(vectors)]
+    return normalize(vectors).tolist()
+
+
+def rescore(query: Sequence[float], candidates: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each full-precision candidate to the query"""
+    return normalize(candidates) @ normalize(np.asarray(query))
+
+
+class FullPrecisionVectors:
+    """On-disk float32 copies of stored embeddings, used to re-score quantized search candidates"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def put(self, ids: List[str], vectors: np.ndarray):
+        rows = [(track_id, vector.tobytes()) for track_id, vector in zip(ids, normalize(vectors))]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO vectors (id, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def get(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for track_id, blob in self._conn.execute(
+                    f"SELECT id, vector FROM vectors WHERE id IN ({placeholders})", chunk
+                ):
+                    found[track_id] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM vectors WHERE id = ?", [(track_id,) for track_id in ids])
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
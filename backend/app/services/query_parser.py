@@ -0,0 +1,158 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Optional, Set
+
+from .model_cache import normalize_text
+
+# Query words mapped onto the extraction vocabulary (see the LangExtract prompt)
+GENRE_TERMS = {
+    "pop": "pop-rock",
+    "rock": "pop-rock",
+    "pop rock": "pop-rock",
+    "indie": "indie-folk",
+    "folk": "indie-folk",
+    "indie folk": "indie-folk",
+    "acoustic": "indie-folk",
+    "country": "country",
+    "electronic": "electronic",
+    "edm": "electronic",
+    "dance": "electronic",
+    "alternative": "alternative",
+    "alt": "alternative",
+    "hip hop": "alternative",
+    "rap": "alternative",
+    "bollywood": "bollywood",
+    "hindi": "bollywood",
+    "indian": "bollywood",
+}
+MOOD_TERMS = {
+    "sad": "melancholic",
+    "melancholic": "melancholic",
+    "melancholy": "melancholic",
+    "heartbreak": "melancholic",
+    "depressing": "melancholic",
+    "happy": "upbeat",
+    "upbeat": "upbeat",
+    "cheerful": "upbeat",
+    "feel good": "upbeat",
+    "chill": "chill",
+    "relaxing": "chill",
+    "calm": "chill",
+    "mellow": "chill",
+    "nostalgic": "nostalgic",
+    "throwback": "nostalgic",
+    "romantic": "romantic",
+    "energetic": "energetic",
+    "hype": "energetic",
+    "workout": "energetic",
+    "party": "energetic",
+}
+
+
+def _phrase_pattern(phrases: Iterable[str]) -> "re.Pattern":
+    # Longest first so "pop rock" wins over "pop"; whole words only
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in ordered) + r")\b")
+
+
+GENRE_PATTERN = _phrase_pattern(GENRE_TERMS)
+MOOD_PATTERN = _phrase_pattern(MOOD_TERMS)
+
+# One-word artist names that are also ordinary query words ("Low", "Train", "Yes") only
+# count when the query says "by <artist>"
+COMMON_WORDS = frozenset("""
+    a about after again all also always am an and any are around as at away back bad band be beautiful
+    because before best better big black blue boy boys but by can city come could cry dark day days did
+    do down dream dreams early easy end every everything fast feel fire for free friday from fun get girl
+    girls give go gold good great happy hard have he heart her here high him his home hot how i if in
+    into is it just kids kind last least let life light like little live long love low made make man
+    many me more morning most much music my never new next night no not now of off old on once one only
+    or our out over people play please power queen rain real red right road run sad same say see she
+    should show sky slow so some something song songs soul sound star stars still stop summer sun sunday
+    take than that the their them then there these they thing things this time to together tonight too
+    train true two up us very want was way we were what when where who why wild will with without
+    woman women world yeah year years yes yesterday you young your
+""".split()) | {term for term in (*GENRE_TERMS, *MOOD_TERMS) if " " not in term}
+
+
+def quote(value: str) -> str:
+    """Milvus string literal"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+@dataclass
+class ParsedQuery:
+    """Scalar constraints recognised in a chat query"""
+    genres: List[str] = field(default_factory=list)
+    moods: List[str] = field(default_factory=list)
+    artists: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.genres or self.moods or self.artists)
+
+    def to_filter(self) -> str:
+        """Milvus boolean expression; values within a field are OR-ed, fields are AND-ed"""
+        clauses = []
+        for field_name, values in (("primary_genre", self.genres), ("mood", self.moods), ("artist", self.artists)):
+            if values:
+                clauses.append(f"{field_name} in [{', '.join(quote(value) for value in values)}]")
+        return " and ".join(clauses)
+
+    def matches(self, track: Dict[str, Any]) -> bool:
+        """Same predicate as to_filter(), for in-memory tracks"""
+        return (
+            (not self.genres or track.get("primary_genre") in self.genres)
+            and (not self.moods or track.get("mood") in self.moods)
+            and (not self.artists or track.get("artist") in self.artists)
+        )
+
+
+class ArtistMatcher:
+    """Artist names of a library keyed by their normalized form, for matching against chat queries.
+
+    Built once per change to the set of artists; matching a query costs
+    O(query words x longest name in words) regardless of the library size.
+    """
+
+    def __init__(self, artists: Iterable[str]):
+        self.names: Dict[str, List[str]] = {}
+        self.max_words = 0
+        for artist in set(artists):
+            name = normalize_text(artist)
+            if name:
+                self.names.setdefault(name, []).append(artist)
+                self.max_words = max(self.max_words, name.count(" ") + 1)
+
+    def match(self, words: List[str]) -> List[str]:
+        """Artists named in a normalized query, preferring the longest name at each position"""
+        found: Set[str] = set()
+        start = 0
+        while start < len(words):
+            for length in range(min(self.max_words, len(words) - start), 0, -1):
+                name = " ".join(words[start:start + length])
+                if name not in self.names:
+                    continue
+                if length == 1 and name in COMMON_WORDS and (start == 0 or words[start - 1] != "by"):
+                    continue
+                found.update(self.names[name])
+                start += length
+                break
+            else:
+                start += 1
+        return sorted(found)
+
+
+def parse_query(query: str, artists: Optional[ArtistMatcher] = None) -> ParsedQuery:
+    """Pull genre, mood and known-artist constraints out of a query like "sad country songs".
+
+    ``artists`` holds the artist names present in the library; they match on
+    normalized whole words so "songs by death cab for cutie" finds "Death Cab for Cutie".
+    """
+    text = normalize_text(query)
+    parsed = ParsedQuery(
+        genres=sorted({GENRE_TERMS[match] for match in GENRE_PATTERN.findall(text)}),
+        moods=sorted({MOOD_TERMS[match] for match in MOOD_PATTERN.findall(text)}),
+    )
+    if artists is not None:
+        parsed.artists = artists.match(text.split())
+    return parsed
@@ -0,0 +1,102 @@
+import re
+from typing import List, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Rule table for the rule-based analyzer, tuned to the sample Spotify corpus.
+# Artists map straight to a genre; anything else is "alternative".
+GENRE_ARTISTS: Dict[str, List[str]] = {
+    "pop-rock": ["coldplay", "onerepublic"],
+    "country": [
+        "morgan wallen", "luke combs", "chris stapleton", "dan + shay", "cody johnson", "brett young",
+        "florida georgia line", "dylan gossett",
+    ],
+    "electronic": ["kygo"],
+    "bollywood": ["noor chahal", "rahul vaidya", "arijit singh", "aur", "capt"],
+    "indie-folk": [
+        "death cab for cutie", "big red machine", "the japanese house", "declan mckenna", "geowulf", "harbour",
+        "del water gap",
+    ],
+}
+DEFAULT_GENRE = "alternative"
+
+# Song-title keywords (substring match), in priority order: the first mood with a hit wins
+MOOD_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ("melancholic", [
+        "scientist", "fix you", "yellow", "apologize", "secrets", "beautiful crazy", "tennessee whiskey",
+        "speechless", "realize", "collide", "by your side",
+    ]),
+    ("upbeat", [
+        "clocks", "viva la vida", "paradise", "sky full of stars", "adventure", "counting stars", "good life",
+        "stole the show", "for life", "whatever",
+    ]),
+    ("nostalgic", ["last night", "7 summers", "more than my hometown", "coal", "dirt", "lucky"]),
+    ("romantic", ["speechless", "tequila", "in case you didn't know", "lucky", "by your side"]),
+]
+# Mood when no keyword matches
+GENRE_DEFAULT_MOODS = {"electronic": "energetic"}
+DEFAULT_MOOD = "chill"
+
+
+def _compile_artist_lookup() -> Dict[str, str]:
+    lookup: Dict[str, str] = {}
+    for genre, artists in GENRE_ARTISTS.items():
+        for artist in artists:
+            lookup.setdefault(artist, genre)
+    return lookup
+
+
+def _compile_mood_matcher() -> "re.Pattern":
+    # One anchored pattern with an alternative per mood, each a lookahead over the whole title.
+    # Alternatives are tried in order, so the group that matches is the highest-priority mood present.
+    alternatives = [
+        "(?=.*?(" + "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)) + "))"
+        for _, keywords in MOOD_KEYWORDS
+    ]
+    return re.compile("^(?:" + "|".join(alternatives) + ")", re.DOTALL)
+
+
+ARTIST_GENRES = _compile_artist_lookup()
+MOOD_MATCHER = _compile_mood_matcher()
+MOODS = [mood for mood, _ in MOOD_KEYWORDS]
+# Per-mood alternations for classify_frame; plain patterns so Arrow-backed columns match them natively
+MOOD_PATTERNS = ["|".join(re.escape(keyword) for keyword in keywords) for _, keywords in MOOD_KEYWORDS]
+# Every label classify_frame can produce, as categorical codes
+GENRE_LABELS = list(dict.fromkeys([*GENRE_ARTISTS, DEFAULT_GENRE]))
+MOOD_LABELS = list(dict.fromkeys([*MOODS, *GENRE_DEFAULT_MOODS.values(), DEFAULT_MOOD]))
+
+
+def classify_track(artist: str, song: str) -> Dict[str, str]:
+    """Genre from the artist lookup, mood from the keyword matcher"""
+    genre = ARTIST_GENRES.get(artist.lower(), DEFAULT_GENRE)
+    match = MOOD_MATCHER.match(song.lower())
+    if match:
+        mood = MOODS[match.lastindex - 1]
+    else:
+        mood = GENRE_DEFAULT_MOODS.get(genre, DEFAULT_MOOD)
+    return {"primary_genre": genre, "mood": mood}
+
+
+def classify_frame(df: pd.DataFrame, artist_column: str = "artist", song_column: str = "song") -> pd.DataFrame:
+    """Label every row of ``df`` at once; returns categorical primary_genre and mood columns aligned to its index"""
+    # Artists repeat heavily, so look up each distinct name once and broadcast by code
+    artist_codes, artists = pd.factorize(df[artist_column].astype(str).str.lower())
+    genre_of_artist = [GENRE_LABELS.index(ARTIST_GENRES.get(artist, DEFAULT_GENRE)) for artist in artists]
+    genre_codes = np.asarray(genre_of_artist, dtype=np.int8)[artist_codes]
+
+    # One column scan per mood; np.select keeps the first (highest-priority) hit
+    songs = df[song_column].astype(str).str.lower()
+    hits = [songs.str.contains(pattern, regex=True).to_numpy(dtype=bool) for pattern in MOOD_PATTERNS]
+    default_mood_of_genre = np.asarray(
+        [MOOD_LABELS.index(GENRE_DEFAULT_MOODS.get(genre, DEFAULT_MOOD)) for genre in GENRE_LABELS], dtype=np.int8
+    )
+    mood_codes = np.select(hits, range(len(MOODS)), default=default_mood_of_genre[genre_codes]).astype(np.int8)
+
+    return pd.DataFrame(
+        {
+            "primary_genre": pd.Categorical.from_codes(genre_codes, GENRE_LABELS),
+            "mood": pd.Categorical.from_codes(mood_codes, MOOD_LABELS),
+        },
+        index=df.index,
+    )
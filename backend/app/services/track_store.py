@@ -0,0 +1,124 @@
+from typing import List, Dict, Any, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .query_parser import ArtistMatcher
+
+TRACK_COLUMNS = ["artist", "song", "primary_genre", "mood"]
+
+
+def _encode(values: Iterable[Any], missing: str):
+    """Categorical codes plus the category labels they index"""
+    categorical = pd.Categorical(pd.Series(values, dtype=object).fillna(missing).astype(str))
+    return np.asarray(categorical.codes), list(categorical.categories)
+
+
+def _postings(codes: np.ndarray, labels: List[str]) -> Dict[str, np.ndarray]:
+    """Row ids per label, each ascending (insertion order)"""
+    order = np.argsort(codes, kind="stable").astype(np.int32)
+    bounds = np.cumsum(np.bincount(codes, minlength=len(labels)))[:-1]
+    return dict(zip(labels, np.split(order, bounds)))
+
+
+class TrackStore:
+    """Read-only columnar track table for the rule-based app.
+
+    Artist, genre and mood are stored as categorical codes and songs as one
+    string array, with inverted indexes from each genre, mood and artist to
+    ascending row ids. Lookups touch only the postings involved, and counts
+    come from posting lengths, so no request scans the whole library.
+    """
+
+    def __init__(self, artists: Iterable[Any], songs: Iterable[Any], genres: Iterable[Any], moods: Iterable[Any]):
+        self.artist_codes, self.artist_names = _encode(artists, "Unknown")
+        self.genre_codes, self.genre_names = _encode(genres, "unknown")
+        self.mood_codes, self.mood_names = _encode(moods, "unknown")
+        self.songs = pd.array(pd.Series(songs, dtype=object).fillna("").astype(str), dtype="string")
+
+        self.artist_index = _postings(self.artist_codes, self.artist_names)
+        self.genre_index = _postings(self.genre_codes, self.genre_names)
+        self.mood_index = _postings(self.mood_codes, self.mood_names)
+        self.artist_matcher = ArtistMatcher(self.artist_names)
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "TrackStore":
+        return cls(*([record.get(column) for record in records] for column in TRACK_COLUMNS))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TrackStore":
+        return cls(*(df[column] for column in TRACK_COLUMNS))
+
+    def __len__(self) -> int:
+        return len(self.songs)
+
+    def rows(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Tracks at the given row ids, as dicts"""
+        ids = np.asarray(ids, dtype=np.int64)
+        return [
+            {
+                "artist": self.artist_names[artist],
+                "song": song,
+                "primary_genre": self.genre_names[genre],
+                "mood": self.mood_names[mood],
+            }
+            for artist, song, genre, mood in zip(
+                self.artist_codes[ids].tolist(),
+                self.songs[ids].tolist(),
+                self.genre_codes[ids].tolist(),
+                self.mood_codes[ids].tolist(),
+            )
+        ]
+
+    @staticmethod
+    def _union(index: Dict[str, np.ndarray], values: Sequence[str]) -> np.ndarray:
+        postings = [index[value] for value in values if value in index]
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+        if len(postings) == 1:
+            return postings[0]
+        return np.unique(np.concatenate(postings))
+
+    def select(
+        self,
+        genres: Sequence[str] = (),
+        moods: Sequence[str] = (),
+        artists: Sequence[str] = (),
+        limit: Optional[int] = None,
+    ) -> np.ndarray:
+        """Row ids in insertion order; values within a field are OR-ed, fields are AND-ed"""
+        clauses = [
+            self._union(index, values)
+            for index, values in ((self.genre_index, genres), (self.mood_index, moods), (self.artist_index, artists))
+            if values
+        ]
+        if not clauses:
+            return np.arange(len(self) if limit is None else min(limit, len(self)))
+        clauses.sort(key=len)
+        ids = clauses[0]
+        for other in clauses[1:]:
+            ids = ids[np.isin(ids, other, assume_unique=True)]
+        return ids[:limit]
+
+    def first_per_genre(self, genres: int) -> np.ndarray:
+        """First track of each of the first ``genres`` genres"""
+        return np.asarray([postings[0] for postings in self.genre_index.values() if len(postings)][:genres])
+
+    def most_common_genre(self) -> Optional[str]:
+        return max(self.genre_index, key=lambda genre: len(self.genre_index[genre]), default=None)
+
+    def snapshot(self, top_artists: int = 10) -> Dict[str, Any]:
+        """Statistics in the /stats response shape"""
+        if self._snapshot is None:
+            artist_counts = np.fromiter((len(ids) for ids in self.artist_index.values()), dtype=np.int64)
+            top = np.argsort(-artist_counts, kind="stable")[:top_artists]
+            self._snapshot = {
+                "total_tracks": len(self),
+                "genres": {genre: len(ids) for genre, ids in self.genre_index.items() if len(ids)},
+                "moods": {mood: len(ids) for mood, ids in self.mood_index.items() if len(ids)},
+                "top_artists": [
+                    {"artist": self.artist_names[i], "count": int(artist_counts[i])} for i in top.tolist()
+                ],
+            }
+        return self._snapshot
@@ -0,0 +1,30 @@
+from typing import Tuple
+
+import pandas as pd
+
+from .model_cache import normalize_column
+
+
+def prepare_tracks(df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int]:
+    """Clean a CSV frame with column operations before any model call.
+
+    Artist and song are trimmed, rows missing either are dropped, and repeats
+    of the same normalized artist/song pair keep only their first row. The
+    result has ``artist``, ``song``, ``track_key`` (see batch_extraction.track_key)
+    and ``track_text`` columns. Returns it with the blank and duplicate row counts.
+    """
+    if 'artist' not in df.columns or 'song' not in df.columns:
+        raise ValueError("CSV must contain 'artist' and 'song' columns")
+
+    frame = pd.DataFrame({
+        "artist": df["artist"].fillna("").astype(str).str.strip(),
+        "song": df["song"].fillna("").astype(str).str.strip(),
+    })
+    blank = (frame["artist"] == "") | (frame["song"] == "")
+    frame = frame[~blank]
+    frame = frame.assign(track_key=normalize_column(frame["artist"]) + " - " + normalize_column(frame["song"]))
+
+    duplicate = frame["track_key"].duplicated()
+    frame = frame[~duplicate]
+    frame = frame.assign(track_text="Artist: " + frame["artist"] + ", Song: " + frame["song"])
+    return frame.reset_index(drop=True), int(blank.sum()), int(duplicate.sum())
@@ -1,12 +1,18 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 import pandas as pd
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import io
-import json
-from openai import OpenAI
-import os
+
+from .services.libraries import DEFAULT_LIBRARY, LIBRARY_ID_PATTERN
+from .services.metrics import STAGE_ITEMS, COLLECTION_TRACKS, set_gauge, stage
+from .services.query_parser import parse_query
+from .services.track_store import TrackStore
+from .services.track_rules import classify_track, classify_frame
+from .services.track_table import prepare_tracks
 
 app = FastAPI(title="Music Taste Analyzer", version="1.0.0")
 
@@ -20,7 +26,7 @@ app.add_middleware(
 )
 
 # Pre-loaded music data from your Spotify corpus
-music_data = [
+SAMPLE_TRACKS = [
     {"artist": "Coldplay", "song": "Yellow", "primary_genre": "pop-rock", "mood": "melancholic"},
     {"artist": "Coldplay", "song": "The Scientist", "primary_genre": "pop-rock", "mood": "melancholic"},
     {"artist": "Coldplay", "song": "Clocks", "primary_genre": "pop-rock", "mood": "upbeat"},
@@ -90,8 +96,13 @@ music_data = [
     {"artist": "Big Red Machine", "song": "Phoenix", "primary_genre": "indie-folk", "mood": "melancholic"}
 ]
 
+# One columnar store with genre/mood/artist indexes per library, replaced on every ingest into it;
+# the default library starts with the sample tracks
+track_stores: Dict[str, TrackStore] = {DEFAULT_LIBRARY: TrackStore.from_records(SAMPLE_TRACKS)}
+
 class ChatRequest(BaseModel):
     query: str
+    library_id: str = Field(DEFAULT_LIBRARY, pattern=LIBRARY_ID_PATTERN)
 
 class TrackInfo(BaseModel):
     artist: str
@@ -108,6 +119,8 @@ class IngestResponse(BaseModel):
     message: str
     processed_tracks: int
     total_tracks: int
+    duplicate_tracks: int = 0
+    blank_rows: int = 0
 
 class StatsResponse(BaseModel):
     total_tracks: int
@@ -115,82 +128,53 @@ class StatsResponse(BaseModel):
     moods: Dict[str, int]
     top_artists: List[Dict[str, Any]]
 
+def library_store(library_id: str) -> TrackStore:
+    """The store of an uploaded library; 400 if nothing was uploaded to it"""
+    store = track_stores.get(library_id)
+    if store is None or not len(store):
+        raise HTTPException(status_code=400, detail="No music library uploaded yet")
+    return store
+
 def analyze_track_simple(artist: str, song: str) -> Dict[str, str]:
-    """Simple rule-based analysis for your specific corpus"""
-    artist_lower = artist.lower()
-    song_lower = song.lower()
-    
-    # Genre mapping based on your corpus
-    if artist_lower in ['coldplay', 'onerepublic']:
-        genre = 'pop-rock'
-    elif artist_lower in ['morgan wallen', 'luke combs', 'chris stapleton', 'dan + shay', 'cody johnson', 'brett young', 'florida georgia line', 'dylan gossett']:
-        genre = 'country'
-    elif artist_lower in ['kygo']:
-        genre = 'electronic'
-    elif artist_lower in ['noor chahal', 'rahul vaidya', 'arijit singh', 'aur', 'capt']:
-        genre = 'bollywood'
-    elif artist_lower in ['death cab for cutie', 'big red machine', 'the japanese house', 'declan mckenna', 'geowulf', 'harbour', 'del water gap']:
-        genre = 'indie-folk'
-    else:
-        genre = 'alternative'
-    
-    # Mood mapping based on song characteristics
-    melancholic_words = ['scientist', 'fix you', 'yellow', 'apologize', 'secrets', 'beautiful crazy', 'tennessee whiskey', 'speechless', 'realize', 'collide', 'by your side']
-    upbeat_words = ['clocks', 'viva la vida', 'paradise', 'sky full of stars', 'adventure', 'counting stars', 'good life', 'stole the show', 'for life', 'whatever']
-    nostalgic_words = ['last night', '7 summers', 'more than my hometown', 'coal', 'dirt', 'lucky']
-    romantic_words = ['speechless', 'tequila', 'in case you didn\'t know', 'lucky', 'by your side']
-    
-    if any(word in song_lower for word in melancholic_words):
-        mood = 'melancholic'
-    elif any(word in song_lower for word in upbeat_words):
-        mood = 'upbeat'
-    elif any(word in song_lower for word in nostalgic_words):
-        mood = 'nostalgic'
-    elif any(word in song_lower for word in romantic_words):
-        mood = 'romantic'
-    elif genre == 'electronic':
-        mood = 'energetic'
-    else:
-        mood = 'chill'
-    
-    return {"primary_genre": genre, "mood": mood}
+    """Simple rule-based analysis for your specific corpus (rule table in services/track_rules.py)"""
+    return classify_track(artist, song)
 
 @app.get("/")
 async def root():
     return {"message": "Music Taste Analyzer API - Simple Version"}
 
 @app.post("/ingest", response_model=IngestResponse)
-async def ingest_music(file: UploadFile = File(...)):
-    """Upload and process music library CSV file"""
-    global music_data
-    
+async def ingest_music(
+    file: UploadFile = File(...),
+    library_id: str = Query(DEFAULT_LIBRARY, pattern=LIBRARY_ID_PATTERN),
+):
+    """Upload and process music library CSV file, replacing that library"""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
     try:
         content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        with stage("csv_parse"):
+            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        STAGE_ITEMS.labels(stage="csv_parse").inc(len(df))
         
         if 'artist' not in df.columns or 'song' not in df.columns:
             raise HTTPException(status_code=400, detail="CSV must contain 'artist' and 'song' columns")
         
-        music_data = []
-        for _, row in df.iterrows():
-            artist = row['artist']
-            song = row['song']
-            analysis = analyze_track_simple(artist, song)
-            
-            music_data.append({
-                "artist": artist,
-                "song": song,
-                "primary_genre": analysis["primary_genre"],
-                "mood": analysis["mood"]
-            })
+        # Trim, drop blank rows and repeated artist/song pairs, then label every row at once
+        tracks, blank_rows, duplicate_tracks = prepare_tracks(df)
+        with stage("extract", len(tracks)):
+            labels = classify_frame(tracks)
+        with stage("index", len(tracks)):
+            store = TrackStore.from_frame(tracks.join(labels))
+        track_stores[library_id] = store
         
         return IngestResponse(
             message="Music library processed successfully",
-            processed_tracks=len(music_data),
-            total_tracks=len(df)
+            processed_tracks=len(store),
+            total_tracks=len(df),
+            duplicate_tracks=duplicate_tracks,
+            blank_rows=blank_rows
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
@@ -198,33 +182,18 @@ async def ingest_music(file: UploadFile = File(...)):
 @app.post("/chat", response_model=ChatResponse)
 async def chat_query(request: ChatRequest):
     """Process natural language queries about music taste"""
-    if not music_data:
-        raise HTTPException(status_code=400, detail="No music library uploaded yet")
-    
+    store = library_store(request.library_id)
     query_lower = request.query.lower()
-    relevant_tracks = []
     
-    # Simple keyword matching for your corpus
-    if 'country' in query_lower:
-        relevant_tracks = [track for track in music_data if track['primary_genre'] == 'country'][:5]
-    elif 'pop' in query_lower or 'rock' in query_lower:
-        relevant_tracks = [track for track in music_data if track['primary_genre'] == 'pop-rock'][:5]
-    elif 'electronic' in query_lower:
-        relevant_tracks = [track for track in music_data if track['primary_genre'] == 'electronic'][:5]
-    elif 'sad' in query_lower or 'melancholic' in query_lower:
-        relevant_tracks = [track for track in music_data if track['mood'] == 'melancholic'][:5]
-    elif 'happy' in query_lower or 'upbeat' in query_lower:
-        relevant_tracks = [track for track in music_data if track['mood'] == 'upbeat'][:5]
-    elif 'chill' in query_lower:
-        relevant_tracks = [track for track in music_data if track['mood'] == 'chill'][:5]
-    else:
-        # Default to showing some variety
-        genres = list(set([track['primary_genre'] for track in music_data]))
+    # Genre, mood and artist constraints from the query, combined ("sad country songs")
+    parsed = parse_query(request.query, store.artist_matcher)
+    with stage("search", 1):
         relevant_tracks = []
-        for genre in genres[:3]:
-            genre_tracks = [track for track in music_data if track['primary_genre'] == genre]
-            if genre_tracks:
-                relevant_tracks.append(genre_tracks[0])
+        if parsed:
+            relevant_tracks = store.rows(store.select(parsed.genres, parsed.moods, parsed.artists, limit=5))
+        if not relevant_tracks:
+            # No constraints, or nothing matches them: default to showing some variety
+            relevant_tracks = store.rows(store.first_per_genre(3))
     
     # Generate response
     if relevant_tracks:
@@ -248,33 +217,19 @@ async def chat_query(request: ChatRequest):
     return ChatResponse(
         response=response,
         relevant_tracks=track_objects,
-        insights=[f"You have {len(music_data)} total tracks", f"Most common genre: {max(set([t['primary_genre'] for t in music_data]), key=[t['primary_genre'] for t in music_data].count)}"]
+        insights=[f"You have {len(store)} total tracks", f"Most common genre: {store.most_common_genre()}"]
     )
 
 @app.get("/stats", response_model=StatsResponse)
-async def get_stats():
-    """Get statistics about the music library"""
-    if not music_data:
-        raise HTTPException(status_code=400, detail="No music library uploaded yet")
-    
-    # Calculate stats
-    genres = {}
-    moods = {}
-    artists = {}
-    
-    for track in music_data:
-        genres[track['primary_genre']] = genres.get(track['primary_genre'], 0) + 1
-        moods[track['mood']] = moods.get(track['mood'], 0) + 1
-        artists[track['artist']] = artists.get(track['artist'], 0) + 1
-    
-    top_artists = [{"artist": artist, "count": count} for artist, count in sorted(artists.items(), key=lambda x: x[1], reverse=True)[:10]]
-    
-    return StatsResponse(
-        total_tracks=len(music_data),
-        genres=genres,
-        moods=moods,
-        top_artists=top_artists
-    )
+async def get_stats(library_id: str = Query(DEFAULT_LIBRARY, pattern=LIBRARY_ID_PATTERN)):
+    """Get statistics about a music library"""
+    return StatsResponse(**library_store(library_id).snapshot())
+
+@app.get("/metrics")
+async def metrics():
+    """Per-stage latency and throughput and tracks per library in the Prometheus text format"""
+    set_gauge(COLLECTION_TRACKS, {(library_id,): len(store) for library_id, store in track_stores.items()})
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,148 @@
+"""Load test: /chat latency while a large /ingest runs, against the fake model provider.
+
+Drives app.main in-process through httpx and reports /chat p50/p99 with the
+server idle and while an ingest of --tracks rows is in flight. The busy phase
+re-ingests the seeded library under a new prompt version, so every row is
+re-extracted, re-embedded and upserted while the collection size (and with it
+the cost of a search) stays constant. The run fails (exit status 1) when the
+busy p50 exceeds --max-p50-ratio times the idle p50.
+
+Measured with --tracks 1000 --requests 100 on Milvus Lite: idle p50 57-61 ms,
+p99 115-144 ms; during the ingest p50 106-136 ms (1.9-2.2x), p99 1.1-1.4 s.
+Latency does not stay flat. Upserted rows sit in growing segments that are searched by brute force
+until the ingest flushes them, and the flush itself (~0.5 s) stalls searches.
+Before ingests flushed, idle p50 was ~1.1 s because every search scanned the
+unsealed library.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chat_during_ingest --tracks 2000 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples):
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+    }
+
+
+def make_csv(count: int) -> bytes:
+    rows = ["artist,song"] + [f"Artist {i % 251},Song {i}" for i in range(count)]
+    return "\n".join(rows).encode("utf-8")
+
+
+async def ingest_and_wait(client: httpx.AsyncClient, csv_content: bytes) -> dict:
+    """Submit an ingest job and block until it finishes"""
+    response = await client.post("/ingest", files={"file": ("library.csv", csv_content, "text/csv")})
+    response.raise_for_status()
+    status_url = response.json()["status_url"]
+    while True:
+        status = (await client.get(status_url)).json()
+        if status["status"] == "completed":
+            return status
+        if status["status"] in ("failed", "cancelled"):
+            raise RuntimeError(status["error"])
+        await asyncio.sleep(0.05)
+
+
+async def chat_load(client: httpx.AsyncClient, requests: int, concurrency: int, stop: asyncio.Event = None):
+    samples = []
+    queries = ["what genre do I like?", "sad country songs", "something upbeat", "my chill music"]
+
+    async def worker(worker_id: int):
+        i = worker_id
+        while (stop is None and len(samples) < requests) or (stop is not None and not stop.is_set()):
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"query": queries[i % len(queries)]})
+            response.raise_for_status()
+            samples.append(time.perf_counter() - start)
+            i += concurrency
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples
+
+
+async def run(args):
+    from app.main import app, music_analyzer
+
+    await music_analyzer.initialize()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        library = make_csv(args.tracks)
+        await ingest_and_wait(client, library)
+
+        idle = await chat_load(client, args.requests, args.concurrency)
+
+        stop = asyncio.Event()
+        music_analyzer.PROMPT_VERSION = "benchmark"
+
+        async def ingest():
+            start = time.perf_counter()
+            await ingest_and_wait(client, library)
+            stop.set()
+            return time.perf_counter() - start
+
+        ingest_task = asyncio.create_task(ingest())
+        busy = await chat_load(client, args.requests, args.concurrency, stop=stop)
+        ingest_seconds = await ingest_task
+
+    await music_analyzer.cleanup()
+    idle, busy = summarize(idle), summarize(busy)
+    ratio = busy["p50_ms"] / idle["p50_ms"]
+    return {
+        "ingest_tracks": args.tracks,
+        "ingest_seconds": round(ingest_seconds, 2),
+        "chat_idle": idle,
+        "chat_during_ingest": busy,
+        "p50_ratio": round(ratio, 2),
+        "passed": ratio <= args.max_p50_ratio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-p50-ratio", type=float, default=3.0, help="allowed busy/idle /chat p50 ratio")
+    args = parser.parse_args()
+
+    # Run against a throwaway Milvus Lite file with the caches off so ingest and every /chat do real work
+    backend_dir = os.getcwd()
+    sys.path.insert(0, backend_dir)
+    workdir = tempfile.mkdtemp(prefix="bench_chat_")
+    os.chdir(workdir)
+    os.environ["MODEL_PROVIDER"] = "fake"
+    os.environ["FAKE_MODEL_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["MODEL_CACHE_PATH"] = ""
+    # Cached /chat answers never leave the event loop in-process and would starve the ingest
+    os.environ["QUERY_CACHE_SIZE"] = "0"
+    os.environ["RESULT_CACHE_SIZE"] = "0"
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if not result["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
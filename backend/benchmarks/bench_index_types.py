@@ -0,0 +1,174 @@
+"""Build time, memory, QPS and recall@k of Milvus index types against a FLAT baseline.
+
+For each library size the collection is filled once, then every index type
+is built in place with the same ensure_index() the app uses. Recall is
+measured against the exact FLAT results. Memory is reported two ways: an
+estimate of the index footprint from its parameters, and the resident set
+size of this process plus its children after loading (Linux only), which
+includes Milvus Lite. Against a Milvus server pass --uri; the RSS column is
+then omitted.
+
+Vectors come from the synthetic clustered generator in bench_quantization.
+
+Usage (from backend/):
+    python -m benchmarks.bench_index_types --sizes 1000 10000 50000 --dim 256
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pymilvus import MilvusClient, MilvusException
+
+from app.services.collection import (
+    ensure_collection, ensure_index, resolve_index, search_params, upsert_rows,
+)
+from .bench_quantization import make_library
+
+COLLECTION = "index_benchmark"
+
+
+def estimate_index_mb(index_type: str, params: Dict[str, Any], rows: int, dim: int) -> float:
+    """Approximate in-memory size of the vector index"""
+    raw = rows * dim * 4
+    if index_type == "IVF_FLAT":
+        size = raw + params["nlist"] * dim * 4 + rows * 8
+    elif index_type == "IVF_PQ":
+        m, nbits = params["m"], params["nbits"]
+        size = rows * m * nbits / 8 + params["nlist"] * dim * 4 + (2 ** nbits) * dim * 4 + rows * 8
+    elif index_type == "HNSW":
+        size = raw + rows * params["M"] * 2 * 8
+    else:
+        size = raw
+    return round(size / 2**20, 2)
+
+
+def local_rss_mb() -> Optional[float]:
+    """Resident memory of this process and its children (Milvus Lite), if /proc is available"""
+    if not os.path.isdir("/proc"):
+        return None
+    total_kb = 0
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            if int(pid) != os.getpid():
+                with open(f"/proc/{pid}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) != os.getpid():
+                        continue
+            with open(f"/proc/{pid}/status") as f:
+                total_kb += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration, ValueError, IndexError):
+            continue
+    return round(total_kb / 1024, 1) if total_kb else None
+
+
+def fill_collection(client: MilvusClient, docs: np.ndarray):
+    ensure_collection(client, COLLECTION, docs.shape[1], "float", "FLAT")
+    rows = [
+        {
+            "id": f"track_{i}",
+            "library_id": "default",
+            "track_info": f"track {i}",
+            "embedding": vector,
+            "artist": f"artist {i % 500}",
+            "song": f"song {i}",
+            "primary_genre": "unknown",
+            "mood": "unknown",
+            "content_hash": "",
+        }
+        for i, vector in enumerate(docs.tolist())
+    ]
+    upsert_rows(client, COLLECTION, rows)
+    client.flush(collection_name=COLLECTION)
+
+
+def run_queries(client: MilvusClient, queries: np.ndarray, index_type: str, top_k: int, nprobe: int, ef: int):
+    params = search_params(index_type, "COSINE", top_k, nprobe=nprobe, ef=ef)
+    found: List[List[str]] = []
+    start = time.perf_counter()
+    for query in queries.tolist():
+        hits = client.search(
+            collection_name=COLLECTION,
+            data=[query],
+            anns_field="embedding",
+            limit=top_k,
+            search_params=params,
+        )
+        found.append([hit["id"] for hit in hits[0]])
+    return found, len(queries) / (time.perf_counter() - start)
+
+
+def bench_size(client: MilvusClient, uri: str, rows: int, args) -> List[Dict[str, Any]]:
+    docs, queries = make_library(rows, args.queries, args.dim, min(64, rows))
+    start = time.perf_counter()
+    fill_collection(client, docs)
+    insert_seconds = time.perf_counter() - start
+    del docs
+
+    results = []
+    truth = None
+    for requested in ["FLAT"] + [t for t in args.index_types if t != "FLAT"]:
+        try:
+            index_type, params = resolve_index("float", requested, args.dim, uri=uri)
+        except ValueError as e:
+            results.append({"rows": rows, "dim": args.dim, "index_type": requested, "error": str(e)})
+            continue
+        start = time.perf_counter()
+        try:
+            ensure_index(client, COLLECTION, "float", index_type, params)
+            client.load_collection(collection_name=COLLECTION)
+        except MilvusException as e:
+            # Milvus Lite only implements some index types
+            results.append({"rows": rows, "dim": args.dim, "index_type": index_type, "error": e.message})
+            continue
+        build_seconds = time.perf_counter() - start
+
+        found, qps = run_queries(client, queries, index_type, args.top_k, args.nprobe, args.ef)
+        if truth is None:
+            truth = found
+        recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth) if t])
+        results.append({
+            "rows": rows,
+            "dim": args.dim,
+            "index_type": index_type,
+            "params": params,
+            "insert_seconds": round(insert_seconds, 2),
+            "build_seconds": round(build_seconds, 3),
+            "estimated_index_mb": estimate_index_mb(index_type, params, rows, args.dim),
+            "local_rss_mb": local_rss_mb() if args.uri is None else None,
+            "qps": round(qps, 1),
+            f"recall@{args.top_k}": round(float(recall), 4),
+        })
+    client.drop_collection(collection_name=COLLECTION)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef", type=int, default=64)
+    parser.add_argument("--index-types", nargs="+", default=["FLAT", "IVF_FLAT", "IVF_PQ", "HNSW"])
+    parser.add_argument("--uri", help="Milvus server URI (default: a temporary Milvus Lite file)")
+    args = parser.parse_args()
+
+    # Keep stdout clean for the JSON report; the app logs index rebuilds with print()
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(sys.stderr):
+        uri = args.uri or os.path.join(workdir, "bench.db")
+        client = MilvusClient(uri=uri)
+        results = []
+        for rows in args.sizes:
+            results.extend(bench_size(client, uri, rows, args))
+        client.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Compare the sequential ingest loop with IngestPipeline against the fake model provider.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ingest_pipeline --tracks 200 --latency-ms 20
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.providers import FakeProvider
+
+
+def make_tracks(count: int):
+    return [
+        {"artist": f"Artist {i % 97}", "song": f"Song {i}", "track_text": f"Artist: Artist {i % 97}, Song: Song {i}"}
+        for i in range(count)
+    ]
+
+
+def run_sequential(client: FakeProvider, tracks):
+    start = time.perf_counter()
+    for track in tracks:
+        client.extract([track])
+        client.embed_documents([track["track_text"]])
+    return time.perf_counter() - start
+
+
+def run_pipeline(client: FakeProvider, tracks, concurrency: int, extract_batch_size: int, batch_size: int):
+    # Use a dedicated pool so thread count follows the concurrency under test
+    with ThreadPoolExecutor(max_workers=concurrency * 2) as executor:
+        pipeline = IngestPipeline(
+            extract_fn=client.extract,
+            embed_fn=EmbeddingBatcher(client.embed_documents, batch_size=batch_size).embed,
+            concurrency=concurrency,
+            extract_batch_size=extract_batch_size,
+            embed_batch_size=batch_size,
+            embed_batch_max_wait=0.05,
+            executor=executor,
+        )
+        start = time.perf_counter()
+        result = asyncio.run(pipeline.run(tracks))
+        elapsed = time.perf_counter() - start
+    assert result.failed == 0
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--per-item-ms", type=float, default=0.5, help="extra latency per item in a request")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--extract-batch-size", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 100])
+    args = parser.parse_args()
+
+    tracks = make_tracks(args.tracks)
+    client = FakeProvider(args.dim, latency_ms=args.latency_ms, per_item_ms=args.per_item_ms)
+
+    baseline = run_sequential(client, tracks)
+    report = {"tracks": args.tracks, "latency_ms": args.latency_ms, "sequential_s": round(baseline, 3), "pipeline": []}
+    for extract_batch_size, batch_size in itertools.product(args.extract_batch_size, args.batch_size):
+        for concurrency in args.concurrency:
+            client.extract_calls = 0
+            client.embed_calls = 0
+            elapsed = run_pipeline(client, tracks, concurrency, extract_batch_size, batch_size)
+            report["pipeline"].append({
+                "concurrency": concurrency,
+                "extract_batch_size": extract_batch_size,
+                "embed_batch_size": batch_size,
+                "extract_requests": client.extract_calls,
+                "embed_requests": client.embed_calls,
+                "seconds": round(elapsed, 3),
+                "tracks_per_s": round(args.tracks / elapsed, 1),
+                "speedup": round(baseline / elapsed, 2),
+            })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
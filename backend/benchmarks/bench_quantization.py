@@ -0,0 +1,148 @@
+"""Recall@k vs memory and latency for reduced dimensions and int8/binary storage.
+
+Runs exact (brute-force) search in numpy, so it measures what quantization
+and truncation do to the ranking independently of the Milvus index in use.
+Ground truth is the top-k by cosine over full-dimension float32 vectors;
+each configuration is scored with and without full-precision re-ranking of
+top_k * rescore_factor candidates.
+
+Vectors are synthetic: clustered, with variance decaying across dimensions
+the way Matryoshka-trained embeddings (gemini-embedding-001) concentrate
+information in the leading dimensions. The "sample" library has one vector
+per row of sample_music_library.csv, the "synthetic" library --rows vectors.
+
+Usage (from backend/):
+    python -m benchmarks.bench_quantization --rows 100000
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.quantization import normalize, quantize_int8, binarize
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), "..", "..", "sample_music_library.csv")
+CHUNK_ROWS = 8192
+
+
+def make_library(rows: int, queries: int, dim: int, clusters: int, seed: int = 0):
+    """Clustered document vectors plus queries that are noisy copies of random documents"""
+    rng = np.random.default_rng(seed)
+    scale = (1.0 / (1.0 + np.arange(dim) / 32.0)).astype(np.float32)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32) * scale
+    docs = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, CHUNK_ROWS):
+        stop = min(rows, start + CHUNK_ROWS)
+        noise = rng.standard_normal((stop - start, dim), dtype=np.float32) * scale * 0.6
+        docs[start:stop] = normalize(centers[rng.integers(0, clusters, stop - start)] + noise)
+    picks = rng.integers(0, rows, queries)
+    query_noise = rng.standard_normal((queries, dim), dtype=np.float32) * scale * 0.3
+    return docs, normalize(docs[picks] + query_noise)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row, best first"""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def search(index: np.ndarray, queries: np.ndarray, storage: str, k: int) -> np.ndarray:
+    """Brute-force top-k over an index in the given storage representation"""
+    results = []
+    for query_start in range(0, len(queries), 64):
+        query_block = queries[query_start:query_start + 64]
+        if storage == "binary":
+            packed_queries = binarize(query_block)
+            scores = np.empty((len(query_block), len(index)), dtype=np.int32)
+            for row, packed in enumerate(packed_queries):
+                # Fewer differing bits is better, so negate the Hamming distance
+                scores[row] = -np.bitwise_count(np.bitwise_xor(index, packed)).sum(axis=1, dtype=np.int32)
+        elif storage == "int8":
+            query_codes = quantize_int8(query_block).astype(np.float32)
+            scores = np.concatenate([
+                query_codes @ index[start:start + CHUNK_ROWS].astype(np.float32).T
+                for start in range(0, len(index), CHUNK_ROWS)
+            ], axis=1)
+        else:
+            scores = query_block @ index.T
+        results.append(top_k(scores, k))
+    return np.concatenate(results)
+
+
+def rescore(full: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """Re-rank candidate indices by exact cosine against the stored float32 vectors"""
+    scores = np.einsum("qd,qcd->qc", queries, full[candidates])
+    return np.take_along_axis(candidates, top_k(scores, k), axis=1)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def bench_library(name: str, docs: np.ndarray, queries: np.ndarray, dims, k: int, rescore_factor: int):
+    truth = search(docs, queries, "float", k)
+    rows = []
+    for dim in dims:
+        full = docs if dim == docs.shape[1] else normalize(docs[:, :dim])
+        dim_queries = normalize(queries[:, :dim])
+        for storage in ("float", "int8", "binary"):
+            if storage == "int8":
+                index = quantize_int8(full)
+            elif storage == "binary":
+                index = binarize(full)
+            else:
+                index = full
+            fetch = k if storage == "float" else k * rescore_factor
+            start = time.perf_counter()
+            candidates = search(index, dim_queries, storage, fetch)
+            search_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            row = {
+                "library": name,
+                "rows": len(docs),
+                "dim": dim,
+                "storage": storage,
+                "index_mb": round(index.nbytes / 2**20, 2),
+                "search_ms_per_query": round(search_ms, 3),
+                f"recall@{k}": round(recall(candidates[:, :k], truth), 4),
+            }
+            if storage != "float":
+                start = time.perf_counter()
+                reranked = rescore(full, dim_queries, candidates, k)
+                row["rescore_ms_per_query"] = round((time.perf_counter() - start) * 1000 / len(queries), 3)
+                row[f"recall@{k}_rescored"] = round(recall(reranked, truth), 4)
+            rows.append(row)
+            del index
+        del full
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="size of the synthetic library")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, nargs="+", default=[3072, 1536, 768, 256])
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    full_dim = max(args.dims)
+    sample_rows = len(pd.read_csv(SAMPLE_CSV, usecols=["artist", "song"]))
+    results = []
+    for name, rows, queries in (
+        ("sample", sample_rows, min(args.queries, sample_rows)),
+        ("synthetic", args.rows, args.queries),
+    ):
+        docs, query_vectors = make_library(rows, queries, full_dim, min(args.clusters, rows))
+        results.extend(bench_library(name, docs, query_vectors, args.dims, args.top_k, args.rescore_factor))
+        del docs
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
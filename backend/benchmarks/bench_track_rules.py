@@ -0,0 +1,102 @@
+"""Rule-based track classification: original if/elif chain vs the compiled rule table.
+
+Writes a synthetic artist,song CSV (default one million rows) drawing on the
+rule artists, unknown artists and song titles that contain zero, one or
+several mood keywords, then labels it three ways:
+
+    legacy          the original analyze_track_simple(), row by row
+    classify_track  the compiled lookup and keyword matcher, row by row
+    classify_frame  the whole DataFrame in one call
+
+All three must produce identical labels; the report gives rows per second
+for each and the CSV load time.
+
+Usage (from backend/):
+    python -m benchmarks.bench_track_rules --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from app.services.track_rules import GENRE_ARTISTS, MOOD_KEYWORDS, classify_frame, classify_track
+from tests.legacy_track_rules import legacy_analyze_track_simple
+
+FILLER_WORDS = [
+    "love", "night", "river", "summer", "heart", "road", "fire", "light", "home", "dream", "rain", "gold",
+    "blue", "wild", "young", "alone", "dance", "stars", "time", "ocean",
+]
+
+
+def write_library(path: str, rows: int, seed: int):
+    rng = random.Random(seed)
+    known = [artist for artists in GENRE_ARTISTS.values() for artist in artists]
+    keywords = [keyword for _, words in MOOD_KEYWORDS for keyword in words]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("artist,song\n")
+        for i in range(rows):
+            if rng.random() < 0.6:
+                artist = rng.choice(known)
+                artist = rng.choice([artist, artist.title(), artist.upper()])
+            else:
+                artist = f"Artist {rng.randrange(50000)}"
+            words = rng.sample(FILLER_WORDS, rng.randint(1, 4))
+            for _ in range(rng.choice([0, 0, 1, 1, 2])):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+            song = " ".join(words).title()
+            f.write(f'"{artist}","{song.replace(chr(34), "")}"\n')
+
+
+def timed_rows(df: pd.DataFrame, classify) -> tuple:
+    start = time.perf_counter()
+    labels = [classify(artist, song) for artist, song in zip(df["artist"], df["song"])]
+    return labels, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "library.csv")
+        write_library(path, args.rows, args.seed)
+        start = time.perf_counter()
+        df = pd.read_csv(path, keep_default_na=False)
+        load_seconds = time.perf_counter() - start
+
+    legacy, legacy_seconds = timed_rows(df, legacy_analyze_track_simple)
+    compiled, compiled_seconds = timed_rows(df, classify_track)
+    start = time.perf_counter()
+    frame = classify_frame(df)
+    frame_seconds = time.perf_counter() - start
+
+    expected = pd.DataFrame(legacy, index=df.index).to_numpy()
+    report = {
+        "rows": len(df),
+        "csv_load_seconds": round(load_seconds, 3),
+        "identical_labels": bool(
+            (expected == pd.DataFrame(compiled, index=df.index).to_numpy()).all()
+            and (expected == frame[["primary_genre", "mood"]].astype(str).to_numpy()).all()
+        ),
+        "results": [],
+    }
+    for name, seconds in (
+        ("legacy", legacy_seconds), ("classify_track", compiled_seconds), ("classify_frame", frame_seconds),
+    ):
+        report["results"].append({
+            "method": name,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(len(df) / seconds),
+            "speedup": round(legacy_seconds / seconds, 2),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Memory and query cost of simple_main's track store vs the old list of dicts.
+
+For each library size, builds the same synthetic tracks both ways and reports
+bytes per track (tracemalloc, Python allocations including numpy buffers) and
+the mean latency of the /chat lookups: a filtered query ("sad country"), an
+artist query, the "most common genre" insight and the /stats counts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_track_store --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List
+
+from app.services.track_rules import GENRE_LABELS, MOOD_LABELS
+from app.services.track_store import TrackStore
+
+
+def make_tracks(rows: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "artist": f"Artist {rng.randrange(max(rows // 20, 1))}",
+            "song": f"Song {i}",
+            "primary_genre": rng.choice(GENRE_LABELS),
+            "mood": rng.choice(MOOD_LABELS),
+        }
+        for i in range(rows)
+    ]
+
+
+def allocated(build, source):
+    tracemalloc.start()
+    value = build(source)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def mean_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) / repeat * 1000, 4)
+
+
+def bench_size(rows: int, args) -> Dict[str, Any]:
+    source = make_tracks(rows, args.seed)
+    # Copy the strings so both layouts own their data
+    tracks, list_bytes = allocated(
+        lambda records: [{key: "%s" % value for key, value in t.items()} for t in records], source
+    )
+    store, store_bytes = allocated(TrackStore.from_records, source)
+    del source
+
+    artist = tracks[0]["artist"]
+    genres = [t["primary_genre"] for t in tracks]
+    list_queries = {
+        "genre_mood": lambda: [t for t in tracks if t["primary_genre"] == "country" and t["mood"] == "melancholic"][:5],
+        "artist": lambda: [t for t in tracks if t["artist"] == artist][:5],
+        "most_common_genre": lambda: Counter(t["primary_genre"] for t in tracks).most_common(1),
+        "stats": lambda: (Counter(genres), Counter(t["mood"] for t in tracks), Counter(t["artist"] for t in tracks)),
+    }
+    store_queries = {
+        "genre_mood": lambda: store.rows(store.select(["country"], ["melancholic"], limit=5)),
+        "artist": lambda: store.rows(store.select(artists=[artist], limit=5)),
+        "most_common_genre": store.most_common_genre,
+        "stats": lambda: (setattr(store, "_snapshot", None), store.snapshot()),
+    }
+    return {
+        "rows": rows,
+        "bytes_per_track": {"list": round(list_bytes / rows, 1), "store": round(store_bytes / rows, 1)},
+        "query_ms": {
+            name: {"list": mean_ms(list_queries[name], args.repeat), "store": mean_ms(store_queries[name], args.repeat)}
+            for name in list_queries
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps([bench_size(rows, args) for rows in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Load tests for the FastAPI apps: synthetic libraries, in-process and HTTP drivers, JSON reports
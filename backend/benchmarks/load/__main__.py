@@ -0,0 +1,99 @@
+"""Load-test matrix for /ingest, /chat and /stats across the apps and library sizes.
+
+Runs benchmarks.load.worker once per app, mode and library size, each in a
+fresh process and working directory, against the deterministic fake model
+provider. The results are collected into one JSON report tagged with the git
+commit, which benchmarks.load.compare diffs against another report.
+
+Usage (from backend/):
+    python -m benchmarks.load --apps main simple --rows 1000 10000 100000 --concurrency 1 8 32 --out before.json
+    python -m benchmarks.load --apps main --modes inprocess http --rows 1000000 --requests 500 --out big.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Dict, Any
+
+from .scenarios import APPS
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+        return commit + ("-dirty" if dirty.stdout.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_worker(app: str, mode: str, rows: int, args) -> Dict[str, Any]:
+    """Run one worker process; its stdout (the app's own prints) goes to our stderr"""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        out_path = out.name
+    command = [
+        sys.executable, "-m", "benchmarks.load.worker",
+        "--app", app, "--mode", mode, "--rows", str(rows), "--requests", str(args.requests),
+        "--concurrency", *map(str, args.concurrency), "--latency-ms", str(args.latency_ms),
+        "--dim", str(args.dim), "--seed", str(args.seed), "--out", out_path,
+    ]
+    if args.cache:
+        command.append("--cache")
+    try:
+        completed = subprocess.run(command, stdout=sys.stderr)
+        if completed.returncode != 0:
+            return {"app": app, "mode": mode, "rows": rows, "error": f"worker exited with {completed.returncode}"}
+        with open(out_path) as result:
+            return json.load(result)
+    finally:
+        os.unlink(out_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=["main", "simple", "langextract"])
+    parser.add_argument("--modes", nargs="+", choices=["inprocess", "http"], default=["inprocess"])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="fake model latency per call")
+    parser.add_argument("--dim", type=int, default=128, help="embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the query embedding and result caches on")
+    parser.add_argument("--out", help="write the report here instead of stdout")
+    args = parser.parse_args()
+
+    runs: List[Dict[str, Any]] = []
+    for app in args.apps:
+        # The built-in corpus app takes no uploads, so library size does not apply to it
+        sizes = args.rows if APPS[app].ingest else args.rows[:1]
+        for mode in args.modes:
+            for rows in sizes:
+                print(f"Running {app} {mode} rows={rows if APPS[app].ingest else '-'}", file=sys.stderr)
+                runs.append(run_worker(app, mode, rows, args))
+
+    report = {
+        "git_commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "runs": runs,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
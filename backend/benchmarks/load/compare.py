@@ -0,0 +1,66 @@
+"""Compare two benchmarks.load reports, e.g. from two commits.
+
+Matches results on app, mode, library size, endpoint and concurrency and
+prints the relative change of throughput, p50/p95/p99 latency and peak RSS,
+so regressions in the hot paths stand out.
+
+Usage (from backend/):
+    python -m benchmarks.load.compare before.json after.json
+"""
+import argparse
+import json
+from typing import Dict, Any, Optional, Tuple
+
+METRICS = ["throughput_rps", "rows_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"]
+
+
+def index(report: Dict[str, Any]) -> Dict[Tuple, Dict[str, Any]]:
+    """Results keyed by (app, mode, rows, endpoint, concurrency); failed runs are skipped"""
+    results = {}
+    for run in report["runs"]:
+        for result in run.get("results", []):
+            key = (run["app"], run["mode"], run["rows"], result["endpoint"], result.get("concurrency"))
+            results[key] = result
+    return results
+
+
+def change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return round((after - before) / before * 100, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before_report, after_report = json.load(before_file), json.load(after_file)
+    before, after = index(before_report), index(after_report)
+
+    comparisons = []
+    for key in sorted(set(before) & set(after), key=str):
+        app, mode, rows, endpoint, concurrency = key
+        entry = {"app": app, "mode": mode, "rows": rows, "endpoint": endpoint, "concurrency": concurrency}
+        for metric in METRICS:
+            if metric in before[key] or metric in after[key]:
+                entry[metric] = {
+                    "before": before[key].get(metric),
+                    "after": after[key].get(metric),
+                    "change_pct": change(before[key].get(metric), after[key].get(metric)),
+                }
+        comparisons.append(entry)
+
+    print(json.dumps({
+        "before": before_report.get("git_commit"),
+        "after": after_report.get("git_commit"),
+        "comparisons": comparisons,
+        "only_before": [list(key) for key in sorted(set(before) - set(after), key=str)],
+        "only_after": [list(key) for key in sorted(set(after) - set(before), key=str)],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Synthetic music libraries shaped like sample_music_library.csv.
+
+Rows are ``artist,song``. About a fifth of the rows use artists from the
+rule table in app/services/track_rules.py, so rule-based labelling and
+artist filters have something to match, and song titles mix mood keywords
+with filler words. A small share of rows repeat an earlier track with
+different casing or are blank, like real exports, so the dedup path runs
+too. Output depends only on the row count and seed.
+
+Usage (from backend/):
+    python -m benchmarks.load.library --rows 1000000 --out library_1m.csv
+"""
+import argparse
+import csv
+import io
+import random
+from typing import IO, List
+
+from app.services.track_rules import GENRE_ARTISTS, MOOD_KEYWORDS
+
+KNOWN_ARTISTS: List[str] = [artist.title() for artists in GENRE_ARTISTS.values() for artist in artists]
+MOOD_WORDS: List[str] = [keyword.title() for _, keywords in MOOD_KEYWORDS for keyword in keywords]
+FILLER_WORDS = [
+    "Night", "Summer", "River", "Heart", "Lights", "Road", "Home", "Fire", "Rain", "Gold", "Dreams",
+    "Stars", "Ocean", "Echo", "Midnight", "Highway", "Shadow", "Morning", "Wild", "Blue",
+]
+
+
+def write_library(out: IO[str], rows: int, seed: int = 0, duplicate_rate: float = 0.01, blank_rate: float = 0.001):
+    """Write ``rows`` data rows (plus the header) to a text stream"""
+    rng = random.Random(seed)
+    synthetic_artists = max(rows // 20, 1)
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["artist", "song"])
+    written: List[List[str]] = []
+    for i in range(rows):
+        roll = rng.random()
+        if roll < blank_rate:
+            writer.writerow(["", ""])
+            continue
+        if roll < blank_rate + duplicate_rate and written:
+            # Same track again, spelled the way another export would
+            artist, song = rng.choice(written)
+            writer.writerow([artist.upper(), f" {song.lower()} "])
+            continue
+        if rng.random() < 0.2:
+            artist = rng.choice(KNOWN_ARTISTS)
+        else:
+            artist = f"Artist {rng.randrange(synthetic_artists):05d}"
+        title = rng.choice(MOOD_WORDS) if rng.random() < 0.3 else " ".join(rng.sample(FILLER_WORDS, 2))
+        # The row index keeps titles unique, so the track count is predictable
+        song = f"{title} {i}"
+        writer.writerow([artist, song])
+        if len(written) < 10000:
+            written.append([artist, song])
+
+
+def make_library(rows: int, seed: int = 0, duplicate_rate: float = 0.01, blank_rate: float = 0.001) -> bytes:
+    """A whole library as CSV bytes, for sizes that comfortably fit in memory"""
+    out = io.StringIO()
+    write_library(out, rows, seed, duplicate_rate, blank_rate)
+    return out.getvalue().encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--blank-rate", type=float, default=0.001)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    with open(args.out, "w", encoding="utf-8", newline="") as out:
+        write_library(out, args.rows, args.seed, args.duplicate_rate, args.blank_rate)
+
+
+if __name__ == "__main__":
+    main()
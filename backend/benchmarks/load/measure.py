@@ -0,0 +1,49 @@
+import os
+import resource
+import statistics
+import sys
+from typing import List, Dict, Any, Optional
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles of one endpoint's requests; ``samples`` are seconds per request"""
+    summary: Dict[str, Any] = {
+        "requests": len(samples) + errors,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(samples) / seconds, 2) if seconds else None,
+    }
+    if samples:
+        summary.update(
+            p50_ms=round(percentile(samples, 50) * 1000, 2),
+            p95_ms=round(percentile(samples, 95) * 1000, 2),
+            p99_ms=round(percentile(samples, 99) * 1000, 2),
+            mean_ms=round(statistics.mean(samples) * 1000, 2),
+            max_ms=round(max(samples) * 1000, 2),
+        )
+    return summary
+
+
+def peak_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Peak resident set size of a process so far (this one by default), None where it cannot be read.
+
+    Reads VmHWM from /proc on Linux; otherwise only this process is
+    supported, through getrusage.
+    """
+    try:
+        with open(f"/proc/{pid or os.getpid()}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid is not None and pid != os.getpid():
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
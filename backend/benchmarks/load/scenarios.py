@@ -0,0 +1,120 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Callable, Optional
+
+import httpx
+
+from .measure import summarize
+
+# Mix of filtered (genre/mood/artist) and free-form questions, as the chat UI sends them
+QUERIES = [
+    "what genre do I like?",
+    "sad country songs",
+    "chill songs by Kygo",
+    "something upbeat for the road",
+    "melancholic indie folk",
+    "songs about summer nights",
+    "my most energetic tracks",
+    "romantic bollywood music",
+]
+CHAT_BATCH_SIZE = 8
+
+
+@dataclass
+class AppSpec:
+    """How to drive one of the FastAPI apps"""
+    module: str
+    # Polled until it answers 200 before any request is timed
+    ready_path: str
+    # "job": /ingest returns a job to poll; "sync": /ingest answers when done; None: no uploads (built-in corpus)
+    ingest: Optional[str]
+    endpoints: List[str] = field(default_factory=list)
+
+
+APPS: Dict[str, AppSpec] = {
+    "main": AppSpec("app.main", "/", "job", ["stats", "chat", "chat_batch"]),
+    "simple": AppSpec("app.simple_main", "/", "sync", ["stats", "chat"]),
+    "langextract": AppSpec("app.langextract_main", "/health/ready", None, ["chat"]),
+}
+
+REQUESTS: Dict[str, Callable[[int], Dict[str, Any]]] = {
+    "stats": lambda i: {"method": "GET", "url": "/stats"},
+    "chat": lambda i: {"method": "POST", "url": "/chat", "json": {"query": QUERIES[i % len(QUERIES)]}},
+    "chat_batch": lambda i: {
+        "method": "POST",
+        "url": "/chat/batch",
+        "json": {"queries": [QUERIES[(i + j) % len(QUERIES)] for j in range(CHAT_BATCH_SIZE)]},
+    },
+}
+
+
+async def wait_ready(client: httpx.AsyncClient, path: str, timeout: float = 600.0):
+    """Poll ``path`` until it answers 200; connection errors count as not ready yet"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get(path)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{path} was not ready after {timeout:.0f}s")
+        await asyncio.sleep(0.1)
+
+
+async def ingest(client: httpx.AsyncClient, spec: AppSpec, path: str) -> Dict[str, Any]:
+    """Upload a library CSV and wait until it is stored; one timed request"""
+    start = time.perf_counter()
+    with open(path, "rb") as library:
+        response = await client.post("/ingest", files={"file": ("library.csv", library, "text/csv")})
+    response.raise_for_status()
+    result = response.json()
+    if spec.ingest == "job":
+        while True:
+            status = (await client.get(result["status_url"])).json()
+            if status["status"] == "completed":
+                result = status["result"]
+                break
+            if status["status"] == "failed":
+                raise RuntimeError(status["error"])
+            await asyncio.sleep(0.05)
+    seconds = time.perf_counter() - start
+    return {
+        "requests": 1,
+        "errors": 0,
+        "seconds": round(seconds, 3),
+        "rows": result["total_tracks"],
+        "processed_tracks": result["processed_tracks"],
+        "rows_per_s": round(result["total_tracks"] / seconds, 1),
+    }
+
+
+async def load(client: httpx.AsyncClient, endpoint: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Send ``requests`` requests to an endpoint from ``concurrency`` workers and summarize them"""
+    make_request = REQUESTS[endpoint]
+    samples: List[float] = []
+    errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal errors, issued
+        while issued < requests:
+            index = issued
+            issued += 1
+            request_start = time.perf_counter()
+            try:
+                response = await client.request(**make_request(index))
+                ok = response.status_code < 400
+            except httpx.TransportError:
+                ok = False
+            if ok:
+                samples.append(time.perf_counter() - request_start)
+            else:
+                errors += 1
+            # In-process, a request that never suspends would otherwise keep the other workers waiting
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, errors, time.perf_counter() - start)
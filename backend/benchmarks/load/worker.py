@@ -0,0 +1,172 @@
+"""One load-test run: a single app and library size, in-process or over HTTP.
+
+Generates the library, starts the app against a throwaway working directory
+(fresh Milvus Lite file, stats and snapshots) with the fake model provider,
+ingests the library twice (cold, then with every track unchanged) and then
+sends --requests requests to each read endpoint at every --concurrency level.
+Prints one JSON document; `python -m benchmarks.load` runs a matrix of these
+in fresh processes.
+
+In-process runs drive the ASGI app through httpx in this process. HTTP runs
+start uvicorn in a subprocess and measure its peak RSS instead of ours.
+
+Usage (from backend/):
+    python -m benchmarks.load.worker --app main --rows 10000 --concurrency 1 8 --mode http
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+
+import httpx
+
+from .library import write_library
+from .measure import peak_rss_mb
+from .scenarios import APPS, AppSpec, ingest, load, wait_ready
+
+
+def configure_environment(args):
+    """Settings every app reads at import: fake models, no persistent model cache, optionally no query caches"""
+    os.environ["MODEL_PROVIDER"] = "fake"
+    os.environ["FAKE_MODEL_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["EMBEDDING_DIM"] = str(args.dim)
+    os.environ["MODEL_CACHE_PATH"] = ""
+    if not args.cache:
+        # Measure the search path on every request; cached answers also never yield in-process
+        os.environ["QUERY_CACHE_SIZE"] = "0"
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+
+
+@asynccontextmanager
+async def in_process(spec: AppSpec, backend_dir: str) -> AsyncIterator[Tuple[httpx.AsyncClient, Optional[int]]]:
+    sys.path.insert(0, backend_dir)
+    app = importlib.import_module(spec.module).app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            yield client, None
+
+
+@asynccontextmanager
+async def over_http(
+    spec: AppSpec, backend_dir: str, concurrency: int
+) -> AsyncIterator[Tuple[httpx.AsyncClient, Optional[int]]]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = {**os.environ, "PYTHONPATH": backend_dir}
+    with open("server.log", "wb") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{spec.module}:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            yield client, server.pid
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+async def run(args, backend_dir: str, library_path: Optional[str]) -> Dict[str, Any]:
+    spec = APPS[args.app]
+    results: List[Dict[str, Any]] = []
+    if args.mode == "inprocess":
+        server = in_process(spec, backend_dir)
+    else:
+        server = over_http(spec, backend_dir, max(args.concurrency))
+    # Startup covers importing the app (in-process) or launching uvicorn until the app answers ready
+    start = time.perf_counter()
+    async with server as (client, pid):
+        await wait_ready(client, spec.ready_path)
+        results.append({
+            "endpoint": "startup", "seconds": round(time.perf_counter() - start, 3), "peak_rss_mb": peak_rss_mb(pid),
+        })
+
+        if spec.ingest and library_path:
+            # app.main finds every track of the second upload unchanged (content hash short-circuit);
+            # app.simple_main rebuilds the library either way
+            for endpoint in ("ingest", "reingest"):
+                summary = await ingest(client, spec, library_path)
+                results.append({"endpoint": endpoint, **summary, "peak_rss_mb": peak_rss_mb(pid)})
+                print(f"{endpoint}: {summary['seconds']}s", file=sys.stderr)
+
+        for endpoint in spec.endpoints:
+            for concurrency in args.concurrency:
+                summary = await load(client, endpoint, args.requests, concurrency)
+                results.append({
+                    "endpoint": endpoint, "concurrency": concurrency, **summary, "peak_rss_mb": peak_rss_mb(pid),
+                })
+                print(f"{endpoint} x{concurrency}: {summary['seconds']}s", file=sys.stderr)
+        peak = peak_rss_mb(pid)
+
+    return {
+        "app": args.app,
+        "mode": args.mode,
+        "rows": args.rows if spec.ingest else None,
+        "latency_ms": args.latency_ms,
+        "dim": args.dim,
+        "cache": args.cache,
+        "peak_rss_mb": peak,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=sorted(APPS), default="main")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="fake model latency per call")
+    parser.add_argument("--dim", type=int, default=128, help="embedding dimension")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="keep the query embedding and result caches on")
+    parser.add_argument("--out", help="write the JSON here instead of stdout (apps print to stdout in-process)")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the Milvus files and server.log")
+    args = parser.parse_args()
+
+    backend_dir = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix=f"bench_load_{args.app}_")
+    os.chdir(workdir)
+    configure_environment(args)
+    library_path = None
+    if APPS[args.app].ingest:
+        library_path = os.path.join(workdir, "library.csv")
+        with open(library_path, "w", encoding="utf-8", newline="") as out:
+            write_library(out, args.rows, args.seed)
+
+    try:
+        result = json.dumps(asyncio.run(run(args, backend_dir, library_path)), indent=2)
+    finally:
+        os.chdir(backend_dir)
+        if args.keep_workdir:
+            print(f"Working directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(result + "\n")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""simple_main's rule-based classification before the rule table, the oracle for track_rules"""
+from typing import Dict
+
+
+def legacy_analyze_track_simple(artist: str, song: str) -> Dict[str, str]:
+    """analyze_track_simple as it was before the rule table, kept as the baseline"""
+    artist_lower = artist.lower()
+    song_lower = song.lower()
+
+    if artist_lower in ['coldplay', 'onerepublic']:
+        genre = 'pop-rock'
+    elif artist_lower in ['morgan wallen', 'luke combs', 'chris stapleton', 'dan + shay', 'cody johnson', 'brett young', 'florida georgia line', 'dylan gossett']:
+        genre = 'country'
+    elif artist_lower in ['kygo']:
+        genre = 'electronic'
+    elif artist_lower in ['noor chahal', 'rahul vaidya', 'arijit singh', 'aur', 'capt']:
+        genre = 'bollywood'
+    elif artist_lower in ['death cab for cutie', 'big red machine', 'the japanese house', 'declan mckenna', 'geowulf', 'harbour', 'del water gap']:
+        genre = 'indie-folk'
+    else:
+        genre = 'alternative'
+
+    melancholic_words = ['scientist', 'fix you', 'yellow', 'apologize', 'secrets', 'beautiful crazy', 'tennessee whiskey', 'speechless', 'realize', 'collide', 'by your side']
+    upbeat_words = ['clocks', 'viva la vida', 'paradise', 'sky full of stars', 'adventure', 'counting stars', 'good life', 'stole the show', 'for life', 'whatever']
+    nostalgic_words = ['last night', '7 summers', 'more than my hometown', 'coal', 'dirt', 'lucky']
+    romantic_words = ['speechless', 'tequila', 'in case you didn\'t know', 'lucky', 'by your side']
+
+    if any(word in song_lower for word in melancholic_words):
+        mood = 'melancholic'
+    elif any(word in song_lower for word in upbeat_words):
+        mood = 'upbeat'
+    elif any(word in song_lower for word in nostalgic_words):
+        mood = 'nostalgic'
+    elif any(word in song_lower for word in romantic_words):
+        mood = 'romantic'
+    elif genre == 'electronic':
+        mood = 'energetic'
+    else:
+        mood = 'chill'
+
+    return {"primary_genre": genre, "mood": mood}
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from app.services.batch_extraction import match_extractions, pack_tracks, track_key
+
+TRACKS = [
+    {"artist": "Coldplay", "song": "Yellow", "track_text": "Artist: Coldplay, Song: Yellow"},
+    {"artist": "Kygo", "song": "Stole the Show", "track_text": "Artist: Kygo, Song: Stole the Show"},
+    {"artist": "Morgan Wallen", "song": "Last Night", "track_text": "Artist: Morgan Wallen, Song: Last Night"},
+]
+
+
+def extraction(text, genre, mood, start=None, extraction_class="music_analysis"):
+    interval = SimpleNamespace(start_pos=start) if start is not None else None
+    return SimpleNamespace(
+        extraction_class=extraction_class,
+        extraction_text=text,
+        attributes={"primary_genre": genre, "mood": mood},
+        char_interval=interval,
+    )
+
+
+def labels(matched):
+    return [(attrs["primary_genre"], attrs["mood"]) if attrs else None for attrs in matched]
+
+
+def test_pack_tracks_offsets_point_at_each_line():
+    document, offsets = pack_tracks(TRACKS)
+    assert [document[offset:].split("\n", 1)[0] for offset in offsets] == [track["track_text"] for track in TRACKS]
+
+
+def test_track_key_ignores_case_and_punctuation():
+    assert track_key("Dan + Shay", "Tequila!") == track_key("dan shay", "tequila")
+
+
+def test_reordered_extractions_match_by_text():
+    _, offsets = pack_tracks(TRACKS)
+    matched = match_extractions(
+        [
+            extraction("Morgan Wallen - Last Night", "country", "nostalgic"),
+            extraction("Coldplay - Yellow", "pop-rock", "melancholic"),
+            extraction("Artist: Kygo, Song: Stole the Show", "electronic", "upbeat"),
+        ],
+        TRACKS,
+        offsets,
+    )
+    assert labels(matched) == [("pop-rock", "melancholic"), ("electronic", "upbeat"), ("country", "nostalgic")]
+
+
+def test_missing_extractions_leave_rows_unmatched():
+    _, offsets = pack_tracks(TRACKS)
+    matched = match_extractions([extraction("kygo - stole the show", "electronic", "upbeat")], TRACKS, offsets)
+    assert labels(matched) == [None, ("electronic", "upbeat"), None]
+
+
+def test_duplicated_extraction_does_not_overwrite_or_spill():
+    _, offsets = pack_tracks(TRACKS)
+    matched = match_extractions(
+        [
+            extraction("Coldplay - Yellow", "pop-rock", "melancholic"),
+            extraction("Coldplay - Yellow", "electronic", "upbeat"),
+        ],
+        TRACKS,
+        offsets,
+    )
+    assert labels(matched) == [("pop-rock", "melancholic"), None, None]
+
+
+def test_duplicate_rows_share_one_extraction():
+    tracks = TRACKS + [dict(TRACKS[0])]
+    _, offsets = pack_tracks(tracks)
+    matched = match_extractions([extraction("Coldplay - Yellow", "pop-rock", "melancholic")], tracks, offsets)
+    assert labels(matched) == [("pop-rock", "melancholic"), None, None, ("pop-rock", "melancholic")]
+
+
+def test_unparseable_text_falls_back_to_char_interval():
+    _, offsets = pack_tracks(TRACKS)
+    matched = match_extractions(
+        [extraction("an upbeat electronic track", "electronic", "upbeat", start=offsets[1] + 3)], TRACKS, offsets
+    )
+    assert labels(matched) == [None, ("electronic", "upbeat"), None]
+
+
+def test_other_extraction_classes_are_ignored():
+    _, offsets = pack_tracks(TRACKS)
+    matched = match_extractions(
+        [extraction("Coldplay - Yellow", "pop-rock", "melancholic", extraction_class="artist")], TRACKS, offsets
+    )
+    assert labels(matched) == [None, None, None]
@@ -0,0 +1,115 @@
+import pytest
+from pymilvus import MilvusClient
+
+from app.services.collection import (
+    content_hash, delete_ids, ensure_collection, fetch_all_ids, fetch_content_hashes, resolve_index, track_id,
+)
+from app.services.libraries import DEFAULT_LIBRARY, library_filter
+
+COLLECTION = "tracks"
+DIM = 8
+
+
+def open_collection(path, dim=DIM):
+    client = MilvusClient(uri=path)
+    created = ensure_collection(client, COLLECTION, dim)
+    return client, created
+
+
+def row(artist, song, version="1", library_id=DEFAULT_LIBRARY):
+    text = f"Artist: {artist}, Song: {song}"
+    return {
+        "id": track_id(artist, song, library_id),
+        "library_id": library_id,
+        "track_info": text,
+        "embedding": [0.1] * DIM,
+        "artist": artist,
+        "song": song,
+        "primary_genre": "pop-rock",
+        "mood": "chill",
+        "content_hash": content_hash(text, version),
+    }
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "milvus.db")
+
+
+def test_track_id_is_stable_across_spelling_and_content_hash_tracks_inputs():
+    assert track_id("Kygo", "Firestone") == track_id("KYGO", "firestone!")
+    assert track_id("Kygo", "Firestone") != track_id("Kygo", "Stay")
+    assert content_hash("text", "model", 1) == content_hash("text", "model", 1)
+    assert content_hash("text", "model", 1) != content_hash("text", "model", 2)
+
+
+def test_rows_and_hashes_survive_a_restart(path):
+    client, created = open_collection(path)
+    assert created
+    client.upsert(collection_name=COLLECTION, data=[row("Kygo", "Firestone"), row("Coldplay", "Yellow")])
+    client.close()
+
+    client, created = open_collection(path)
+    assert not created
+    ids = [track_id("Kygo", "Firestone"), track_id("Coldplay", "Yellow"), track_id("Sade", "By Your Side")]
+    assert fetch_content_hashes(client, COLLECTION, ids) == {
+        ids[0]: row("Kygo", "Firestone")["content_hash"],
+        ids[1]: row("Coldplay", "Yellow")["content_hash"],
+    }
+    client.close()
+
+
+def test_only_changed_rows_are_pending_and_missing_rows_are_pruned(path):
+    client, _ = open_collection(path)
+    client.upsert(collection_name=COLLECTION, data=[row("Kygo", "Firestone"), row("Coldplay", "Yellow")])
+
+    upload = {r["id"]: r for r in [row("Kygo", "Firestone"), row("Sade", "By Your Side", version="2")]}
+    stored = fetch_content_hashes(client, COLLECTION, list(upload))
+    pending = [r for r in upload.values() if stored.get(r["id"]) != r["content_hash"]]
+    assert [r["artist"] for r in pending] == ["Sade"]
+
+    client.upsert(collection_name=COLLECTION, data=pending)
+    deleted = sorted(fetch_all_ids(client, COLLECTION) - set(upload))
+    assert deleted == [track_id("Coldplay", "Yellow")]
+    delete_ids(client, COLLECTION, deleted)
+    assert fetch_all_ids(client, COLLECTION) == set(upload)
+    client.close()
+
+
+def test_changing_the_dimension_rebuilds_the_collection(path):
+    client, _ = open_collection(path)
+    client.upsert(collection_name=COLLECTION, data=[row("Kygo", "Firestone")])
+    client.close()
+
+    client, created = open_collection(path, dim=DIM * 2)
+    assert created
+    assert fetch_all_ids(client, COLLECTION) == set()
+    client.close()
+
+
+def test_same_track_in_two_libraries_is_stored_and_pruned_separately(path):
+    client, _ = open_collection(path)
+    client.upsert(collection_name=COLLECTION, data=[
+        row("Kygo", "Firestone", library_id="a"), row("Coldplay", "Yellow", library_id="a"),
+        row("Kygo", "Firestone", library_id="b"),
+    ])
+    assert track_id("Kygo", "Firestone", "a") != track_id("Kygo", "Firestone", "b")
+    assert track_id("Kygo", "Firestone") == track_id("Kygo", "Firestone", DEFAULT_LIBRARY)
+
+    a_ids = fetch_all_ids(client, COLLECTION, library_filter("a"))
+    b_ids = fetch_all_ids(client, COLLECTION, library_filter("b"))
+    assert a_ids == {track_id("Kygo", "Firestone", "a"), track_id("Coldplay", "Yellow", "a")}
+    assert b_ids == {track_id("Kygo", "Firestone", "b")}
+
+    delete_ids(client, COLLECTION, sorted(a_ids))
+    assert fetch_all_ids(client, COLLECTION, library_filter("a")) == set()
+    assert fetch_all_ids(client, COLLECTION, library_filter("b")) == b_ids
+    client.close()
+
+
+def test_ivf_pq_is_rejected_on_milvus_lite():
+    with pytest.raises(ValueError, match="IVF_PQ needs a Milvus server"):
+        resolve_index("float", "ivf_pq", 64, uri="./milvus_music.db")
+    index_type, params = resolve_index("float", "IVF_PQ", 64, uri="http://localhost:19530")
+    assert index_type == "IVF_PQ" and params["m"] == 4
+    assert resolve_index("float", "HNSW", 64, uri="./milvus_music.db")[0] == "HNSW"
@@ -0,0 +1,190 @@
+import asyncio
+
+from app.services.ingest_jobs import IngestJobManager
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_job_reports_progress_then_completes():
+    async def scenario():
+        manager = IngestJobManager()
+        release = asyncio.Event()
+
+        async def work(progress):
+            progress(2, 0, 4)
+            await release.wait()
+            progress(3, 1, 4)
+            return {"processed_tracks": 3}
+
+        job = manager.submit(work)
+        assert job.status == "queued" and manager.get(job.id) is job
+        statuses = []
+
+        async def follow():
+            async for snapshot in job.updates():
+                statuses.append((snapshot["status"], snapshot["processed_tracks"], snapshot["failed_tracks"]))
+
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.wait_for(follower, 1)
+        return job, statuses
+
+    job, statuses = run(scenario())
+    assert statuses[0] == ("running", 2, 0)
+    assert statuses[-1] == ("completed", 3, 1)
+    snapshot = job.snapshot()
+    assert snapshot["result"] == {"processed_tracks": 3}
+    assert snapshot["batches"] == 2 and snapshot["eta_seconds"] is None
+
+
+def test_failed_work_marks_the_job_failed():
+    async def scenario():
+        manager = IngestJobManager()
+
+        async def work(progress):
+            raise ValueError("CSV must contain 'artist' and 'song' columns")
+
+        job = manager.submit(work)
+        return job, [snapshot async for snapshot in job.updates()]
+
+    job, snapshots = run(scenario())
+    assert job.status == "failed" and job.done
+    assert snapshots[-1]["error"] == "CSV must contain 'artist' and 'song' columns"
+
+
+def test_at_most_max_concurrent_jobs_run_at_once():
+    async def scenario():
+        manager = IngestJobManager(max_concurrent=2)
+        running = []
+        peak = 0
+
+        async def work(progress):
+            nonlocal peak
+            running.append(1)
+            peak = max(peak, len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            return {}
+
+        jobs = [manager.submit(work) for _ in range(5)]
+        await asyncio.sleep(0)
+        queued = [job.status for job in jobs]
+        for job in jobs:
+            async for _ in job.updates():
+                pass
+        return peak, queued, jobs
+
+    peak, queued, jobs = run(scenario())
+    assert queued == ["running", "running", "queued", "queued", "queued"]
+    assert peak == 2 and all(job.status == "completed" for job in jobs)
+
+
+def test_only_finished_jobs_are_forgotten():
+    async def scenario():
+        manager = IngestJobManager(max_jobs=2)
+        release = asyncio.Event()
+
+        async def work(progress):
+            await release.wait()
+            return {}
+
+        first = manager.submit(work)
+        second = manager.submit(work)
+        third = manager.submit(work)
+        kept_while_running = list(manager.jobs)
+        release.set()
+        for job in (first, second, third):
+            async for _ in job.updates():
+                pass
+        fourth = manager.submit(work)
+        return [first.id, second.id, third.id], kept_while_running, list(manager.jobs), fourth.id
+
+    ids, kept_while_running, kept_after, fourth = run(scenario())
+    assert kept_while_running == ids
+    assert kept_after == [ids[2], fourth]
+
+
+def test_shutdown_cancels_running_and_queued_jobs():
+    async def scenario():
+        manager = IngestJobManager(max_concurrent=1)
+        started = asyncio.Event()
+
+        async def work(progress):
+            started.set()
+            await asyncio.Event().wait()
+
+        running = manager.submit(work)
+        queued = manager.submit(work)
+        await started.wait()
+
+        async def last_snapshot(job):
+            return [snapshot async for snapshot in job.updates()][-1]
+
+        followers = [asyncio.create_task(last_snapshot(job)) for job in (running, queued)]
+        await asyncio.sleep(0)
+        await manager.shutdown()
+        return running, queued, await asyncio.wait_for(asyncio.gather(*followers), 1)
+
+    running, queued, last = run(scenario())
+    assert running.status == queued.status == "cancelled"
+    assert [snapshot["status"] for snapshot in last] == ["cancelled", "cancelled"]
+    assert last[0]["error"] == "Ingest was cancelled"
+    assert running.finished_at is not None and queued.started_at is None
+
+
+def test_on_done_runs_however_the_job_ends(tmp_path):
+    async def scenario():
+        manager = IngestJobManager(max_concurrent=1)
+        uploads = []
+
+        def upload(name):
+            path = tmp_path / name
+            path.write_bytes(b"artist,song\n")
+            uploads.append(path)
+            return lambda: path.unlink()
+
+        async def finish(progress):
+            return {}
+
+        async def fail(progress):
+            raise ValueError("bad CSV")
+
+        async def hang(progress):
+            await asyncio.Event().wait()
+
+        jobs = [
+            manager.submit(finish, on_done=upload("completed.csv")),
+            manager.submit(fail, on_done=upload("failed.csv")),
+            manager.submit(hang, on_done=upload("running.csv")),
+            manager.submit(hang, on_done=upload("queued.csv")),
+        ]
+        for job in jobs[:2]:
+            async for _ in job.updates():
+                pass
+        await asyncio.sleep(0)
+        await manager.shutdown()
+        return [job.status for job in jobs], uploads
+
+    statuses, uploads = run(scenario())
+    assert statuses == ["completed", "failed", "cancelled", "cancelled"]
+    assert not any(path.exists() for path in uploads)
+
+
+def test_a_failing_cleanup_does_not_fail_the_job():
+    async def scenario():
+        manager = IngestJobManager()
+
+        async def work(progress):
+            return {"processed_tracks": 1}
+
+        def cleanup():
+            raise OSError("already removed")
+
+        job = manager.submit(work, on_done=cleanup)
+        return job, [snapshot async for snapshot in job.updates()]
+
+    job, snapshots = run(scenario())
+    assert job.status == "completed" and snapshots[-1]["result"] == {"processed_tracks": 1}
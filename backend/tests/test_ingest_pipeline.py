@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import ingest_pipeline
+from app.services.ingest_pipeline import IngestPipeline, call_with_retry
+from app.services.providers import FakeProvider
+
+DIM = 8
+
+
+class PoisonedProvider(FakeProvider):
+    """FakeProvider whose embedding requests fail whenever they include a poisoned text"""
+
+    def __init__(self, poisoned: str):
+        super().__init__(DIM, latency_ms=0)
+        self.poisoned = poisoned
+        self.embed_batches = []
+
+    def embed_documents(self, texts):
+        self.embed_batches.append(list(texts))
+        if any(self.poisoned in text for text in texts):
+            raise RuntimeError("invalid input")
+        return super().embed_documents(texts)
+
+
+def tracks(count):
+    return [{"artist": f"Artist {i}", "song": f"Song {i}", "track_text": f"Artist: Artist {i}, Song: Song {i}"}
+            for i in range(count)]
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Record backoff sleeps instead of waiting them out"""
+    recorded = []
+    sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args):
+        recorded.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(ingest_pipeline.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def test_only_the_bad_row_of_a_failing_batch_is_lost(delays):
+    provider = PoisonedProvider("Song 5")
+    pipeline = IngestPipeline(
+        provider.extract, provider.embed_documents, extract_batch_size=8, embed_batch_size=8, max_retries=2,
+    )
+    result = asyncio.run(pipeline.run(tracks(8)))
+
+    assert result.failed == 1
+    assert [entry["song"] for entry in result.entries] == [f"Song {i}" for i in range(8) if i != 5]
+    assert all(len(entry["embedding"]) == DIM for entry in result.entries)
+    # The full batch gets max_retries + 1 attempts; every split is sent once
+    sizes = [len(batch) for batch in provider.embed_batches]
+    assert sizes == [8, 8, 8, 4, 4, 2, 1, 1, 2]
+    assert len(delays) == 2
+
+
+def test_a_batch_without_bad_rows_is_embedded_in_one_request(delays):
+    provider = PoisonedProvider("nothing matches this")
+    pipeline = IngestPipeline(provider.extract, provider.embed_documents, extract_batch_size=8, embed_batch_size=8)
+    result = asyncio.run(pipeline.run(tracks(8)))
+
+    assert (len(result.entries), result.failed) == (8, 0)
+    assert provider.embed_batches == [[track["track_text"] for track in tracks(8)]]
+    assert delays == []
+
+
+def test_retries_stop_after_max_retries_with_capped_backoff(delays, monkeypatch):
+    monkeypatch.setattr(ingest_pipeline.random, "uniform", lambda low, high: high)
+    attempts = []
+    retries = []
+
+    def always_fail():
+        attempts.append(1)
+        raise RuntimeError("unavailable")
+
+    with pytest.raises(RuntimeError, match="unavailable"):
+        asyncio.run(call_with_retry(
+            always_fail, max_retries=4, base_delay=0.5, max_delay=2.0, on_retry=lambda: retries.append(1),
+        ))
+    assert len(attempts) == 5 and len(retries) == 4
+    assert delays == [0.5, 1.0, 2.0, 2.0]
+
+
+def test_backoff_is_jittered_below_the_exponential_delay(delays):
+    def always_fail():
+        raise RuntimeError("unavailable")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(call_with_retry(always_fail, max_retries=3, base_delay=1.0, max_delay=3.0))
+    for delay, cap in zip(delays, [1.0, 2.0, 3.0]):
+        assert cap / 2 <= delay <= cap
+
+
+def test_a_call_that_recovers_returns_its_result(delays):
+    outcomes = [RuntimeError("busy"), RuntimeError("busy"), "ok"]
+
+    def flaky(value):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return f"{outcome} {value}"
+
+    assert asyncio.run(call_with_retry(flaky, "done", max_retries=3, base_delay=0.01)) == "ok done"
+    assert len(delays) == 2
+
+
+def test_zero_retries_tries_once(delays):
+    attempts = []
+
+    def always_fail():
+        attempts.append(1)
+        raise RuntimeError("unavailable")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(call_with_retry(always_fail, max_retries=0))
+    assert len(attempts) == 1 and delays == []
+
+
+def test_a_failing_worker_stops_embedding_still_in_flight():
+    embed_calls = []
+
+    def extract(batch):
+        if batch[0]["song"] == "Song 1":
+            time.sleep(0.1)
+            return ["not an attribute dict"]
+        return [{"primary_genre": "pop", "mood": "chill"}]
+
+    def embed(texts):
+        embed_calls.append(texts)
+        raise RuntimeError("unavailable")
+
+    pipeline = IngestPipeline(
+        extract, embed, concurrency=1, embed_batch_size=1, embed_batch_max_wait=0, max_retries=20, retry_base_delay=0.05,
+    )
+
+    async def scenario():
+        with pytest.raises(TypeError):
+            await pipeline.run(tracks(2))
+        calls = len(embed_calls)
+        await asyncio.sleep(0.3)
+        return calls, asyncio.all_tasks() - {asyncio.current_task()}
+
+    calls, leftover = asyncio.run(scenario())
+    assert calls >= 1
+    assert len(embed_calls) == calls
+    assert not leftover
@@ -0,0 +1,26 @@
+import pytest
+
+from app.services.libraries import DEFAULT_LIBRARY, check_library_id, library_filter
+
+
+@pytest.mark.parametrize("library_id", ["default", "user_42", "Team-A", "a" * 64])
+def test_valid_library_ids_pass_through(library_id):
+    assert check_library_id(library_id) == library_id
+
+
+@pytest.mark.parametrize("library_id", ["", None, "a" * 65, "a b", 'a" or library_id != "', "a\"", "lib/1", "ünï"])
+def test_invalid_library_ids_are_rejected(library_id):
+    with pytest.raises(ValueError, match="library_id"):
+        check_library_id(library_id)
+
+
+def test_filter_scopes_expressions_to_one_library():
+    assert library_filter(DEFAULT_LIBRARY) == 'library_id == "default"'
+    assert library_filter("a", 'mood == "chill" or mood == "calm"') == (
+        'library_id == "a" and (mood == "chill" or mood == "calm")'
+    )
+
+
+def test_filter_rejects_ids_that_could_escape_the_expression():
+    with pytest.raises(ValueError):
+        library_filter('a" or library_id != "a')
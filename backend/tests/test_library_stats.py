@@ -0,0 +1,82 @@
+import json
+
+from app.services.library_stats import LibraryStats, LibraryStatsSet
+
+ROWS = [
+    {"artist": "Coldplay", "primary_genre": "pop-rock", "mood": "melancholic"},
+    {"artist": "Coldplay", "primary_genre": "pop-rock", "mood": "upbeat"},
+    {"artist": "Kygo", "primary_genre": "electronic", "mood": "upbeat"},
+    {"artist": "", "primary_genre": None, "mood": None},
+]
+
+
+def test_add_then_remove_round_trips_to_empty():
+    stats = LibraryStats()
+    stats.add(ROWS)
+    stats.remove(ROWS)
+    assert stats.total == 0
+    assert not stats.genres and not stats.moods and not stats.artists
+    assert stats.snapshot() == {"total_tracks": 0, "genres": {}, "moods": {}, "top_artists": []}
+
+
+def test_partial_remove_matches_a_recount():
+    stats = LibraryStats.from_rows(ROWS)
+    stats.remove(ROWS[1:3])
+    assert stats.to_dict() == LibraryStats.from_rows([ROWS[0], ROWS[3]]).to_dict()
+    assert stats.artists == {"Coldplay": 1, "Unknown": 1}
+
+
+def test_update_is_remove_old_then_add_new():
+    stats = LibraryStats.from_rows(ROWS)
+    updated = {**ROWS[2], "mood": "energetic"}
+    stats.remove([ROWS[2]])
+    stats.add([updated])
+    assert stats.to_dict() == LibraryStats.from_rows([*ROWS[:2], updated, ROWS[3]]).to_dict()
+
+
+def test_snapshot_is_rebuilt_after_a_change():
+    stats = LibraryStats.from_rows(ROWS[:1])
+    assert stats.snapshot()["total_tracks"] == 1
+    stats.add(ROWS[1:2])
+    assert stats.snapshot()["total_tracks"] == 2
+    assert stats.snapshot()["top_artists"] == [{"artist": "Coldplay", "count": 2}]
+
+
+def test_artist_matcher_follows_the_set_of_artists():
+    stats = LibraryStats.from_rows(ROWS[:2])
+    matcher = stats.artist_matcher
+    stats.add(ROWS[1:2])
+    assert stats.artist_matcher is matcher  # same artists, no rebuild
+    stats.add(ROWS[2:3])
+    assert "kygo" in stats.artist_matcher.names
+    stats.remove(ROWS[2:3])
+    assert "kygo" not in stats.artist_matcher.names
+
+
+def test_dict_round_trip():
+    stats = LibraryStats.from_rows(ROWS)
+    assert LibraryStats.from_dict(json.loads(json.dumps(stats.to_dict()))).to_dict() == stats.to_dict()
+
+
+def test_stats_set_saves_and_skips_libraries_being_ingested(tmp_path):
+    path = str(tmp_path / "stats.json")
+    stats = LibraryStatsSet.from_batches([[{**row, "library_id": "a"} for row in ROWS], [{**ROWS[0], "library_id": "b"}]])
+    stats.ingesting.add("b")
+    stats.save(path, stats.payload("tag-1"))
+
+    loaded, stale = LibraryStatsSet.load(path, "tag-1")
+    assert loaded.snapshot("a") == stats.snapshot("a")
+    assert stale == ["b"]
+    assert LibraryStatsSet.load(path, "tag-2") is None
+
+
+def test_stats_set_keeps_the_newest_payload(tmp_path):
+    path = str(tmp_path / "stats.json")
+    stats = LibraryStatsSet()
+    older = stats.payload("tag")
+    stats.get("a").add(ROWS)
+    newer = stats.payload("tag")
+    stats.save(path, newer)
+    stats.save(path, older)
+    loaded, _ = LibraryStatsSet.load(path, "tag")
+    assert loaded.snapshot("a")["total_tracks"] == len(ROWS)
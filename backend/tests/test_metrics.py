@@ -0,0 +1,28 @@
+from prometheus_client import REGISTRY, generate_latest
+
+from app.services.metrics import COLLECTION_TRACKS, set_gauge, stage, timed
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stage_times_calls_and_counts_items():
+    calls = sample("music_stage_duration_seconds_count", stage="test_stage")
+    items = sample("music_stage_items_total", stage="test_stage")
+    with stage("test_stage", items=3):
+        pass
+    embed = timed(lambda batch: [len(text) for text in batch], "test_stage")
+    assert embed(["a", "bb"]) == [1, 2]
+
+    assert sample("music_stage_duration_seconds_count", stage="test_stage") == calls + 2
+    assert sample("music_stage_items_total", stage="test_stage") == items + 5
+
+
+def test_set_gauge_replaces_every_series():
+    set_gauge(COLLECTION_TRACKS, {("a",): 3, ("b",): 1})
+    set_gauge(COLLECTION_TRACKS, {("a",): 4})
+
+    assert sample("music_collection_tracks", library_id="a") == 4
+    assert REGISTRY.get_sample_value("music_collection_tracks", {"library_id": "b"}) is None
+    assert b'music_collection_tracks{library_id="a"} 4.0' in generate_latest()
@@ -0,0 +1,74 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import model_cache
+from app.services.model_cache import ModelCache, normalize_text
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # A strictly increasing clock so last_access orders every read and write
+    clock = itertools.count(1)
+    monkeypatch.setattr(model_cache, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    cache = ModelCache(str(tmp_path / "cache.db"), max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_normalize_text_collapses_case_and_punctuation():
+    assert normalize_text("  Artist: Dan + Shay, Song: TEQUILA!! ") == "artist dan shay song tequila"
+
+
+def test_keys_are_normalized_text(cache):
+    cache.put_attributes(["Artist: Kygo, Song: Firestone"], [{"primary_genre": "electronic", "mood": "chill"}], "m", "1")
+    assert cache.get_attributes(["artist:  KYGO,  song: firestone!"], "m", "1") == [
+        {"primary_genre": "electronic", "mood": "chill"}
+    ]
+
+
+def test_keys_include_model_prompt_version_and_dimension(cache):
+    cache.put_attributes(["a"], [{"primary_genre": "country", "mood": "chill"}], "m", "1")
+    cache.put_embeddings(["a"], [[0.5, -0.25]], "e", 2)
+    assert cache.get_attributes(["a"], "m", "2") == [None]
+    assert cache.get_attributes(["a"], "other", "1") == [None]
+    assert cache.get_embeddings(["a"], "e", 3) == [None]
+    assert cache.get_embeddings(["a"], "e", 2) == [[0.5, -0.25]]
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.put_embeddings(["a", "b", "c"], [[1.0], [2.0], [3.0]], "e", 1)
+    cache.get_embeddings(["a"], "e", 1)  # "b" is now the least recently used
+    cache.put_embeddings(["d"], [[4.0]], "e", 1)
+    assert cache.get_embeddings(["a", "b", "c", "d"], "e", 1) == [[1.0], None, [3.0], [4.0]]
+    assert cache.stats()["entries"] == 3
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ModelCache(path)
+    cache.put_embeddings(["a"], [[1.0]], "e", 1)
+    cache.close()
+    reopened = ModelCache(path)
+    assert reopened.get_embeddings(["a"], "e", 1) == [[1.0]]
+    reopened.close()
+
+
+def test_cached_wrappers_only_send_misses_to_the_model(cache):
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [None if text == "bad" else [float(len(text))] for text in texts]
+
+    embed_cached = cache.cached_embed(embed, "e", 1)
+    assert embed_cached(["a", "bb", "bad"]) == [[1.0], [2.0], None]
+    assert embed_cached(["A!", "bb", "bad"]) == [[1.0], [2.0], None]
+    assert calls == [["a", "bb", "bad"], ["bad"]]  # failures are not cached
+
+    extract_cached = cache.cached_extract(lambda tracks: [{"primary_genre": "x", "mood": "y"} for _ in tracks], "m", "1")
+    extract_cached([{"track_text": "t"}])
+    assert cache.stats()["extraction"]["misses"] == 1
+    extract_cached([{"track_text": "t"}])
+    assert cache.stats()["extraction"]["hits"] == 1
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.config import Settings
+from app.services.music_analyzer import MusicAnalyzer
+from app.services.providers import FakeProvider
+
+DIM = 16
+LIBRARY_A = b"artist,song\nKygo,Firestone\nColdplay,Yellow\nSade,By Your Side\n"
+LIBRARY_B = b"artist,song\nMorgan Wallen,Last Night\n"
+
+
+def run_with_analyzer(tmp_path, scenario):
+    """Run ``scenario(analyzer, provider)`` against a fake provider and a Milvus Lite file"""
+    settings = Settings(
+        model_provider="fake",
+        embedding_dim=DIM,
+        milvus_uri=str(tmp_path / "milvus.db"),
+        stats_path=str(tmp_path / "stats.json"),
+        cache_path="",
+        embed_batch_max_wait=0.01,
+    )
+    provider = FakeProvider(DIM, latency_ms=0)
+
+    async def main():
+        analyzer = MusicAnalyzer(settings, provider)
+        await analyzer.initialize()
+        try:
+            await scenario(analyzer, provider)
+        finally:
+            await analyzer.cleanup()
+
+    asyncio.run(main())
+
+
+def artists(result):
+    return sorted(track["artist"] for track in result["relevant_tracks"])
+
+
+def test_libraries_are_searched_and_counted_separately(tmp_path):
+    async def scenario(analyzer, provider):
+        await analyzer.ingest_csv(LIBRARY_A, library_id="a")
+        await analyzer.ingest_csv(LIBRARY_B, library_id="b")
+
+        assert artists(await analyzer.query_music_taste("anything", top_k=10, library_id="a")) == [
+            "Coldplay", "Kygo", "Sade",
+        ]
+        assert artists(await analyzer.query_music_taste("anything", top_k=10, library_id="b")) == ["Morgan Wallen"]
+        assert (await analyzer.get_library_stats("a"))["total_tracks"] == 3
+        assert (await analyzer.get_library_stats("b"))["total_tracks"] == 1
+        assert (await analyzer.get_library_stats("c"))["total_tracks"] == 0
+
+        # Pruning a library only removes its own tracks
+        result = await analyzer.ingest_csv(b"artist,song\nKygo,Firestone\n", prune=True, library_id="a")
+        assert result["deleted_tracks"] == 2
+        assert artists(await analyzer.query_music_taste("anything", top_k=10, library_id="a")) == ["Kygo"]
+        assert artists(await analyzer.query_music_taste("anything", top_k=10, library_id="b")) == ["Morgan Wallen"]
+
+    run_with_analyzer(tmp_path, scenario)
+
+
+def test_invalid_library_id_is_rejected(tmp_path):
+    async def scenario(analyzer, provider):
+        with pytest.raises(ValueError, match="library_id"):
+            await analyzer.query_music_taste("anything", library_id='a" or library_id != "')
+        with pytest.raises(ValueError, match="library_id"):
+            await analyzer.ingest_csv(LIBRARY_A, library_id="")
+
+    run_with_analyzer(tmp_path, scenario)
+
+
+def test_ingest_invalidates_cached_results_of_that_library_only(tmp_path):
+    async def scenario(analyzer, provider):
+        await analyzer.ingest_csv(LIBRARY_A, library_id="a")
+        await analyzer.ingest_csv(LIBRARY_B, library_id="b")
+        first_a = await analyzer.query_music_taste("Something Chill", top_k=10, library_id="a")
+        first_b = await analyzer.query_music_taste("something chill", top_k=10, library_id="b")
+        calls = provider.embed_calls
+
+        # Repeated wording is served from the result cache without a model call
+        assert await analyzer.query_music_taste("something chill!", top_k=10, library_id="a") is first_a
+        assert provider.embed_calls == calls
+
+        await analyzer.ingest_csv(b"artist,song\nDaft Punk,One More Time\n", library_id="a")
+        calls = provider.embed_calls
+        second_a = await analyzer.query_music_taste("something chill", top_k=10, library_id="a")
+        assert second_a is not first_a
+        assert "Daft Punk" in artists(second_a)
+        # The query embedding itself is still cached
+        assert provider.embed_calls == calls
+        assert await analyzer.query_music_taste("something chill", top_k=10, library_id="b") is first_b
+
+    run_with_analyzer(tmp_path, scenario)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from app.services.quantization import FullPrecisionVectors, binarize, normalize, quantize_int8, rescore, to_storage
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((50, 64)).astype(np.float32) * 3
+
+
+def test_normalize_gives_unit_rows_and_leaves_zero_rows_alone(vectors):
+    normalized = normalize(np.vstack([vectors, np.zeros(64)]))
+    assert np.allclose(np.linalg.norm(normalized[:-1], axis=1), 1.0, atol=1e-6)
+    assert not normalized[-1].any()
+
+
+def test_int8_codes_preserve_direction(vectors):
+    codes = quantize_int8(vectors)
+    assert codes.dtype == np.int8 and codes.min() >= -127
+    cosine = np.sum(normalize(codes.astype(np.float32)) * normalize(vectors), axis=1)
+    assert cosine.min() > 0.999
+
+
+def test_binary_codes_pack_one_sign_bit_per_dimension(vectors):
+    codes = binarize(vectors)
+    assert codes.shape == (50, 8) and codes.dtype == np.uint8
+    assert np.array_equal(np.unpackbits(codes, axis=1).astype(bool), vectors > 0)
+
+
+def test_to_storage_per_mode(vectors):
+    assert np.allclose(to_storage(vectors, "float"), normalize(vectors))
+    assert all(row.dtype == np.int8 and row.shape == (64,) for row in to_storage(vectors, "int8"))
+    assert all(isinstance(row, bytes) and len(row) == 8 for row in to_storage(vectors, "binary"))
+
+
+def test_rescore_ranks_candidates_by_exact_cosine(vectors):
+    query = vectors[0]
+    scores = rescore(query, vectors)
+    expected = normalize(vectors) @ normalize(query)
+    assert np.allclose(scores, expected, atol=1e-6)
+    assert np.argmax(scores) == 0 and scores[0] == pytest.approx(1.0, abs=1e-6)
+
+
+def test_rescoring_quantized_candidates_recovers_the_exact_top_k(vectors):
+    query = vectors[0] + 0.5 * vectors[1]
+    exact = np.argsort(-(normalize(vectors) @ normalize(query)))[:5]
+    # Candidate set as a binary search with rescore_factor 4 would return it
+    hamming = np.unpackbits(binarize(vectors) ^ binarize(query[None, :]), axis=1).sum(axis=1)
+    candidates = np.argsort(hamming, kind="stable")[:20]
+    reranked = candidates[np.argsort(-rescore(query, vectors[candidates]))][:5]
+    assert set(reranked) <= set(candidates)
+    assert list(reranked) == [index for index in exact if index in candidates][:5]
+
+
+def test_full_precision_vectors_round_trip(tmp_path, vectors):
+    store = FullPrecisionVectors(str(tmp_path / "full.db"))
+    ids = [f"t{i}" for i in range(len(vectors))]
+    store.put(ids, vectors)
+    found = store.get(ids + ["missing"])
+    assert set(found) == set(ids)
+    assert np.allclose(np.stack([found[i] for i in ids]), normalize(vectors))
+    store.delete(ids[:10])
+    assert set(store.get(ids)) == set(ids[10:])
+    store.close()
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import query_cache
+from app.services.query_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(query_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("q", [1.0])
+    clock.now += 9
+    assert cache.get("q") == [1.0]
+    clock.now += 2
+    assert cache.get("q") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_dropped_first(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_clear_and_hit_rate(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 0, "max_entries": 2, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_zero_size_disables_the_cache(clock):
+    cache = TTLCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
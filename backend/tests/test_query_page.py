@@ -0,0 +1,77 @@
+import re
+
+from app.services.collection import query_page
+
+_AFTER = re.compile(r'id > "((?:[^"\\]|\\.)*)"')
+_GENRE = re.compile(r'primary_genre == "([^"]*)"')
+
+
+class FakeClient:
+    """Answers the filters query_page builds, returning each page in a scrambled order like Milvus may"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+
+    def query(self, collection_name, filter, output_fields, limit, **kwargs):
+        self.filters.append(filter)
+        after = _AFTER.search(filter)
+        genre = _GENRE.search(filter)
+        matching = sorted(
+            (row for row in self.rows
+             if (not after or row["id"] > after.group(1).replace('\\"', '"').replace("\\\\", "\\"))
+             and (not genre or row["primary_genre"] == genre.group(1))),
+            key=lambda row: row["id"],
+        )[:limit]
+        return [{field: row[field] for field in output_fields} for row in reversed(matching)]
+
+
+def rows(count, genre="country"):
+    return [{"id": f"{genre}-{i:03d}", "primary_genre": genre, "artist": f"Artist {i}"} for i in range(count)]
+
+
+def read_all(client, limit, expression=""):
+    pages, cursor = [], None
+    while True:
+        page, cursor = query_page(client, "tracks", ["id", "artist"], after=cursor, limit=limit, expression=expression)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+def test_pages_are_in_id_order_and_cover_every_row_once():
+    client = FakeClient(rows(10))
+    pages = read_all(client, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert [row["id"] for page in pages for row in page] == [row["id"] for row in rows(10)]
+
+
+def test_exact_multiple_of_limit_ends_with_an_empty_page():
+    pages = read_all(FakeClient(rows(6)), limit=3)
+    assert [len(page) for page in pages] == [3, 3, 0]
+
+
+def test_short_first_page_has_no_cursor():
+    page, cursor = query_page(FakeClient(rows(2)), "tracks", ["id"], limit=5)
+    assert len(page) == 2 and cursor is None
+
+
+def test_empty_collection():
+    assert query_page(FakeClient([]), "tracks", ["id"], limit=5) == ([], None)
+
+
+def test_expression_is_combined_with_the_cursor():
+    client = FakeClient(rows(4, "country") + rows(4, "pop"))
+    pages = read_all(client, limit=3, expression='primary_genre == "pop"')
+    assert [row["id"] for page in pages for row in page] == [row["id"] for row in rows(4, "pop")]
+    assert client.filters[0] == '(primary_genre == "pop")'
+    assert client.filters[1] == 'id > "pop-002" and (primary_genre == "pop")'
+
+
+def test_cursor_with_quotes_is_escaped():
+    client = FakeClient([{"id": 'a"1', "primary_genre": "pop", "artist": "x"}, {"id": 'a"2', "primary_genre": "pop", "artist": "y"}])
+    page, cursor = query_page(client, "tracks", ["id"], limit=1)
+    assert cursor == 'a"1'
+    page, cursor = query_page(client, "tracks", ["id"], after=cursor, limit=1)
+    assert page == [{"id": 'a"2'}]
+    assert client.filters[-1] == r'id > "a\"1"'
@@ -0,0 +1,51 @@
+from app.services.query_parser import ArtistMatcher, ParsedQuery, parse_query
+
+ARTISTS = ArtistMatcher(["Death Cab", "Death Cab for Cutie", "Kygo", "Kygo & Friends", "Low", "Train", "Sade"])
+
+
+def test_genre_and_mood_terms_map_onto_the_extraction_vocabulary():
+    parsed = parse_query("Some sad indie folk and pop rock songs")
+    assert parsed.genres == ["indie-folk", "pop-rock"]
+    assert parsed.moods == ["melancholic"]
+    assert parsed.artists == []
+
+
+def test_longest_artist_name_wins_over_its_prefix():
+    assert parse_query("songs by Death Cab for Cutie", ARTISTS).artists == ["Death Cab for Cutie"]
+    assert parse_query("death cab songs", ARTISTS).artists == ["Death Cab"]
+    assert parse_query("kygo & friends remixes", ARTISTS).artists == ["Kygo & Friends"]
+    assert parse_query("kygo remixes", ARTISTS).artists == ["Kygo"]
+
+
+def test_artist_names_match_whole_words_only():
+    assert parse_query("kygoesque tracks", ARTISTS).artists == []
+    assert parse_query("tracks like sade's", ARTISTS).artists == ["Sade"]
+
+
+def test_several_artists_in_one_query():
+    assert parse_query("mix kygo with sade and death cab for cutie", ARTISTS).artists == [
+        "Death Cab for Cutie", "Kygo", "Sade",
+    ]
+
+
+def test_common_word_artists_need_by():
+    assert parse_query("low energy chill songs", ARTISTS).artists == []
+    assert parse_query("songs for a long train ride", ARTISTS).artists == []
+    assert parse_query("songs by low", ARTISTS).artists == ["Low"]
+    assert parse_query("anything by Train", ARTISTS).artists == ["Train"]
+
+
+def test_names_that_normalize_alike_all_match():
+    matcher = ArtistMatcher(["AUR", "Aur", "aur."])
+    assert parse_query("aur songs", matcher).artists == ["AUR", "Aur", "aur."]
+
+
+def test_to_filter_and_matches_agree():
+    parsed = ParsedQuery(genres=["country"], moods=["nostalgic", "upbeat"], artists=['Dan "+" Shay'])
+    assert parsed.to_filter() == (
+        r'primary_genre in ["country"] and mood in ["nostalgic", "upbeat"] and artist in ["Dan \"+\" Shay"]'
+    )
+    assert parsed.matches({"primary_genre": "country", "mood": "upbeat", "artist": 'Dan "+" Shay'})
+    assert not parsed.matches({"primary_genre": "country", "mood": "chill", "artist": 'Dan "+" Shay'})
+    assert not ParsedQuery()
+    assert ParsedQuery().to_filter() == ""
@@ -0,0 +1,25 @@
+from fastapi.testclient import TestClient
+
+from app.simple_main import app
+
+client = TestClient(app)
+
+
+def chat(query):
+    response = client.post("/chat", json={"query": query})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_matching_filter_narrows_the_tracks():
+    tracks = chat("sad country songs")["relevant_tracks"]
+    assert tracks and all((t["primary_genre"], t["mood"]) == ("country", "melancholic") for t in tracks)
+
+
+def test_filter_without_matches_falls_back_to_general_recommendations():
+    general = chat("what do I listen to?")
+    unmatched = chat("upbeat country songs")
+
+    assert unmatched["relevant_tracks"] == general["relevant_tracks"]
+    assert len({t["primary_genre"] for t in unmatched["relevant_tracks"]}) > 1
+    assert not unmatched["response"].startswith("I couldn't find")
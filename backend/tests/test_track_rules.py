@@ -0,0 +1,43 @@
+import itertools
+import random
+
+import pandas as pd
+import pytest
+
+from app.services.track_rules import GENRE_ARTISTS, MOOD_KEYWORDS, classify_frame, classify_track
+from tests.legacy_track_rules import legacy_analyze_track_simple
+
+ARTISTS = [artist for artists in GENRE_ARTISTS.values() for artist in artists]
+KEYWORDS = [keyword for _, keywords in MOOD_KEYWORDS for keyword in keywords]
+
+
+def cases():
+    """Every rule artist in several spellings plus unknown ones, against titles with 0, 1 or 2 keywords"""
+    rng = random.Random(7)
+    artists = ARTISTS + [artist.upper() for artist in ARTISTS] + [artist.title() for artist in ARTISTS]
+    artists += ["Unknown Band", "coldplay tribute", "", "Kygo!"]
+    titles = ["Untitled", "", "Clocks (Live)", "FIX YOU - acoustic", "Lucky by your side"]
+    titles += [f"The {keyword} song" for keyword in KEYWORDS]
+    titles += [f"{first} and {second}" for first, second in itertools.permutations(KEYWORDS, 2) if rng.random() < 0.1]
+    return [(artist, title) for artist in artists for title in titles]
+
+
+def test_classify_track_matches_the_legacy_rules():
+    for artist, song in cases():
+        assert classify_track(artist, song) == legacy_analyze_track_simple(artist, song), (artist, song)
+
+
+@pytest.mark.parametrize("dtype", [object, "string", "string[pyarrow]"])
+def test_classify_frame_matches_the_legacy_rules(dtype):
+    rows = cases()
+    frame = pd.DataFrame(rows, columns=["artist", "song"], index=range(100, 100 + len(rows))).astype(dtype)
+    labels = classify_frame(frame)
+    assert list(labels.index) == list(frame.index)
+    expected = [legacy_analyze_track_simple(artist, song) for artist, song in rows]
+    assert labels["primary_genre"].astype(str).tolist() == [row["primary_genre"] for row in expected]
+    assert labels["mood"].astype(str).tolist() == [row["mood"] for row in expected]
+
+
+def test_classify_frame_on_an_empty_frame():
+    labels = classify_frame(pd.DataFrame({"artist": [], "song": []}))
+    assert labels.empty and list(labels.columns) == ["primary_genre", "mood"]
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from app.services.batch_extraction import track_key
+from app.services.track_table import prepare_tracks
+
+
+def test_trims_and_drops_blank_rows():
+    df = pd.DataFrame({
+        "artist": ["  Coldplay ", "", None, "Kygo", "   "],
+        "song": ["Yellow  ", "Nowhere", "Fix You", None, "Firestone"],
+    })
+    frame, blank, duplicates = prepare_tracks(df)
+
+    assert list(frame["artist"]) == ["Coldplay"]
+    assert list(frame["song"]) == ["Yellow"]
+    assert (blank, duplicates) == (4, 0)
+
+
+def test_keeps_first_row_of_each_normalized_track():
+    df = pd.DataFrame({
+        "artist": ["Coldplay", "coldplay", "COLDPLAY!", "Kygo", "Coldplay"],
+        "song": ["Yellow", "yellow", " Yellow ", "Firestone", "Fix You"],
+    })
+    frame, blank, duplicates = prepare_tracks(df)
+
+    assert list(zip(frame["artist"], frame["song"])) == [
+        ("Coldplay", "Yellow"), ("Kygo", "Firestone"), ("Coldplay", "Fix You"),
+    ]
+    assert (blank, duplicates) == (0, 2)
+    assert list(frame.index) == [0, 1, 2]
+
+
+def test_key_and_text_columns_match_row_helpers():
+    df = pd.DataFrame({"artist": ["Dan + Shay", "Kygo"], "song": ["Tequila", "Stole the Show"], "year": [2018, 2015]})
+    frame, _, _ = prepare_tracks(df)
+
+    assert list(frame.columns) == ["artist", "song", "track_key", "track_text"]
+    assert list(frame["track_key"]) == [track_key("Dan + Shay", "Tequila"), track_key("Kygo", "Stole the Show")]
+    assert list(frame["track_text"]) == ["Artist: Dan + Shay, Song: Tequila", "Artist: Kygo, Song: Stole the Show"]
+
+
+def test_non_string_values_are_kept_as_text():
+    frame, _, _ = prepare_tracks(pd.DataFrame({"artist": ["Blink"], "song": [182]}))
+
+    assert list(frame["song"]) == ["182"]
+    assert list(frame["track_text"]) == ["Artist: Blink, Song: 182"]
+
+
+def test_missing_columns_raise():
+    with pytest.raises(ValueError, match="'artist' and 'song'"):
+        prepare_tracks(pd.DataFrame({"artist": ["Coldplay"], "title": ["Yellow"]}))
@@ -1,7 +1,8 @@
 'use client'
 
 import { useState, useRef, useEffect } from 'react'
-import axios from 'axios'
+
+const API_URL = 'http://localhost:8000'
 
 interface TrackInfo {
   artist: string
@@ -11,17 +12,36 @@ interface TrackInfo {
   similarity_score?: number
 }
 
-interface ChatResponse {
-  response: string
-  relevant_tracks: TrackInfo[]
-  insights: string[]
-}
-
 interface Message {
   type: 'user' | 'assistant'
   content: string
   tracks?: TrackInfo[]
   insights?: string[]
+  pending?: boolean
+}
+
+// Calls onEvent with the name and parsed data of each server-sent event in a fetch response body
+async function readEvents(body: ReadableStream<Uint8Array>, onEvent: (event: string, data: any) => void) {
+  const reader = body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) return
+    buffer += decoder.decode(value, { stream: true })
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      let event = 'message'
+      let data = ''
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+      }
+      onEvent(event, data ? JSON.parse(data) : null)
+    }
+  }
 }
 
 export default function ChatInterface() {
@@ -54,23 +74,41 @@ export default function ChatInterface() {
     setMessages(prev => [...prev, { type: 'user', content: userMessage }])
     setIsLoading(true)
 
+    // Update the assistant message being streamed, which is always the last one
+    const updateAnswer = (update: Partial<Message>) => {
+      setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], ...update }])
+    }
+
     try {
-      const response = await axios.post<ChatResponse>('http://localhost:8000/chat', {
-        query: userMessage
+      const response = await fetch(`${API_URL}/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ query: userMessage })
       })
-
-      // Add assistant response
-      setMessages(prev => [...prev, {
-        type: 'assistant',
-        content: response.data.response,
-        tracks: response.data.relevant_tracks,
-        insights: response.data.insights
-      }])
+      if (!response.ok || !response.body) throw new Error(`Chat failed with status ${response.status}`)
+
+      setMessages(prev => [...prev, { type: 'assistant', content: '', pending: true }])
+
+      // Render the tracks as soon as they arrive, then fill in the answer and insights
+      let finished = false
+      await readEvents(response.body, (event, data) => {
+        if (event === 'tracks') updateAnswer({ tracks: data })
+        else if (event === 'response') updateAnswer({ content: data })
+        else if (event === 'insights') updateAnswer({ insights: data })
+        else if (event === 'done') {
+          finished = true
+          updateAnswer({ pending: false })
+        }
+        else if (event === 'error') throw new Error(data.detail)
+      })
+      // A stream cut off before `done` (server restart, proxy timeout) is a failed answer
+      if (!finished) throw new Error('Chat stream ended before the answer was complete')
     } catch (error: any) {
-      setMessages(prev => [...prev, {
+      const failure: Message = {
         type: 'assistant',
         content: 'Sorry, I encountered an error processing your request. Make sure the backend is running and your music library is uploaded.'
-      }])
+      }
+      setMessages(prev => prev[prev.length - 1].pending ? [...prev.slice(0, -1), failure] : [...prev, failure])
     } finally {
       setIsLoading(false)
     }
@@ -99,7 +137,11 @@ export default function ChatInterface() {
                 ? 'bg-primary-500 text-white' 
                 : 'bg-white text-gray-800 shadow-sm border'
             }`}>
-              <p className="text-sm">{message.content}</p>
+              {message.content ? (
+                <p className="text-sm">{message.content}</p>
+              ) : message.pending && (
+                <p className="text-sm text-gray-500">{message.tracks ? 'Writing an answer...' : 'Searching your library...'}</p>
+              )}
               
               {/* Show relevant tracks */}
               {message.tracks && message.tracks.length > 0 && (
@@ -134,7 +176,7 @@ export default function ChatInterface() {
           </div>
         ))}
 
-        {isLoading && (
+        {isLoading && !messages[messages.length - 1].pending && (
           <div className="flex justify-start">
             <div className="bg-white text-gray-800 shadow-sm border px-4 py-2 rounded-lg">
               <div className="flex items-center space-x-2">
@@ -7,15 +7,38 @@ interface FileUploadProps {
   onUploadSuccess: () => void
 }
 
+const API_URL = 'http://localhost:8000'
+
 interface UploadResponse {
   message: string
   processed_tracks: number
   total_tracks: number
+  duplicate_tracks?: number
+  blank_rows?: number
+}
+
+interface IngestJobResponse {
+  job_id: string
+  status: string
+  status_url: string
+  events_url: string
+}
+
+interface IngestProgress {
+  status: string
+  total_tracks: number
+  processed_tracks: number
+  failed_tracks: number
+  tracks_per_second: number
+  eta_seconds: number | null
+  result: UploadResponse | null
+  error: string | null
 }
 
 export default function FileUpload({ onUploadSuccess }: FileUploadProps) {
   const [isUploading, setIsUploading] = useState(false)
   const [uploadResult, setUploadResult] = useState<UploadResponse | null>(null)
+  const [progress, setProgress] = useState<IngestProgress | null>(null)
   const [error, setError] = useState<string | null>(null)
   const fileInputRef = useRef<HTMLInputElement>(null)
 
@@ -31,13 +54,14 @@ export default function FileUpload({ onUploadSuccess }: FileUploadProps) {
     setIsUploading(true)
     setError(null)
     setUploadResult(null)
+    setProgress(null)
 
     const formData = new FormData()
     formData.append('file', file)
 
     try {
-      const response = await axios.post<UploadResponse>(
-        'http://localhost:8000/ingest',
+      const response = await axios.post<IngestJobResponse>(
+        `${API_URL}/ingest`,
         formData,
         {
           headers: {
@@ -46,18 +70,53 @@ export default function FileUpload({ onUploadSuccess }: FileUploadProps) {
         }
       )
 
-      setUploadResult(response.data)
-      onUploadSuccess()
+      followJob(response.data.events_url)
     } catch (err: any) {
       setError(
         err.response?.data?.detail || 
         'Failed to upload file. Make sure the backend is running.'
       )
-    } finally {
       setIsUploading(false)
     }
   }
 
+  const followJob = (eventsUrl: string) => {
+    const events = new EventSource(`${API_URL}${eventsUrl}`)
+
+    events.addEventListener('progress', (event) => {
+      setProgress(JSON.parse((event as MessageEvent).data))
+    })
+
+    events.addEventListener('completed', (event) => {
+      const job: IngestProgress = JSON.parse((event as MessageEvent).data)
+      events.close()
+      setProgress(job)
+      setUploadResult(job.result)
+      setIsUploading(false)
+      onUploadSuccess()
+    })
+
+    const onFailed = (event: Event) => {
+      const job: IngestProgress = JSON.parse((event as MessageEvent).data)
+      events.close()
+      setError(`Processing error: ${job.error}`)
+      setIsUploading(false)
+    }
+    events.addEventListener('failed', onFailed)
+    events.addEventListener('cancelled', onFailed)
+
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED) return
+      events.close()
+      setError('Lost connection while processing. Make sure the backend is running.')
+      setIsUploading(false)
+    }
+  }
+
+  const percentComplete = progress && progress.total_tracks > 0
+    ? Math.round(((progress.processed_tracks + progress.failed_tracks) / progress.total_tracks) * 100)
+    : 0
+
   const triggerFileInput = () => {
     fileInputRef.current?.click()
   }
@@ -91,9 +150,26 @@ export default function FileUpload({ onUploadSuccess }: FileUploadProps) {
 
       {/* Loading State */}
       {isUploading && (
-        <div className="flex items-center justify-center space-x-2 text-primary-600">
-          <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-primary-600"></div>
-          <span>Analyzing your music taste...</span>
+        <div className="space-y-2">
+          <div className="flex items-center justify-center space-x-2 text-primary-600">
+            <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-primary-600"></div>
+            <span>Analyzing your music taste...</span>
+          </div>
+          {progress && progress.total_tracks > 0 && (
+            <div className="space-y-1">
+              <div className="w-full bg-gray-200 rounded-full h-2">
+                <div
+                  className="bg-primary-600 h-2 rounded-full transition-all"
+                  style={{ width: `${percentComplete}%` }}
+                ></div>
+              </div>
+              <p className="text-sm text-gray-600 text-center">
+                {progress.processed_tracks + progress.failed_tracks} of {progress.total_tracks} tracks
+                {progress.tracks_per_second > 0 && ` · ${progress.tracks_per_second.toFixed(1)} tracks/s`}
+                {progress.eta_seconds !== null && ` · about ${Math.ceil(progress.eta_seconds)}s left`}
+              </p>
+            </div>
+          )}
         </div>
       )}
 
@@ -107,6 +183,11 @@ export default function FileUpload({ onUploadSuccess }: FileUploadProps) {
               <p className="text-sm text-green-700">
                 Successfully processed {uploadResult.processed_tracks} out of {uploadResult.total_tracks} tracks
               </p>
+              {(uploadResult.duplicate_tracks || uploadResult.blank_rows) ? (
+                <p className="text-sm text-green-700">
+                  Skipped {uploadResult.duplicate_tracks ?? 0} duplicate and {uploadResult.blank_rows ?? 0} blank rows
+                </p>
+              ) : null}
             </div>
           </div>
         </div>